@@ -0,0 +1,379 @@
+"""Benchmarks of the request and decoding hot path against MockExchange.
+
+    $ python benchmarks/bench.py --output run.json
+    $ python benchmarks/bench.py --quick --compare run.json
+
+Results are written as JSON: the environment under "meta" and one object of
+numbers per benchmark under "results". With --compare, the relative change
+of every number against a previous run is printed as well.
+"""
+from __future__ import print_function, division
+
+import os
+import sys
+import hmac
+import json
+import time
+import random
+import hashlib
+import argparse
+import platform
+import tempfile
+import subprocess
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from poloniex import PoloniexPublic, Poloniex, TokenBucket  # noqa: E402
+from poloniex.signing import Signer                         # noqa: E402
+from poloniex.replay import (recording_session,              # noqa: E402
+                             replay_session)
+from poloniex.ticker import Snapshot, diff                   # noqa: E402
+from poloniex.utils import AutoCastDict                      # noqa: E402
+from mock_exchange import MockExchange                      # noqa: E402
+
+try:
+    import tracemalloc
+except ImportError:                          # python 2
+    tracemalloc = None
+
+_UNLIMITED = 10 ** 6
+
+
+def _public(exchange, **kwargs):
+    kwargs.setdefault('semaphore', TokenBucket(_UNLIMITED))
+    return PoloniexPublic(public_url=exchange.url + '/public', **kwargs)
+
+
+def _timed(fn, repeat):
+    """Return the best time of `repeat` runs of fn()."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.time()
+        fn()
+        best = min(best, time.time() - started)
+    return best
+
+
+def _peak(fn):
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_calls(exchange, calls):
+    """End to end calls per second of a small public command."""
+    polo = _public(exchange)
+    polo.returnTicker()                             # warm up the connection
+    elapsed = _timed(lambda: [polo.returnTicker() for _ in range(calls)], 1)
+    return {'calls': calls, 'calls_per_second': calls / elapsed}
+
+
+def bench_decode(exchange, repeat):
+    """Time and memory to fetch and decode the large payloads."""
+    polo = _public(exchange)
+    cases = [
+        ('order_book_all', 'returnOrderBook',
+         lambda: polo.returnOrderBook('all')),
+        ('trade_history', 'returnTradeHistory',
+         lambda: polo.returnTradeHistory('BTC_LTC', 0, 2 ** 32)),
+        ('trade_history_columnar', 'returnTradeHistory',
+         lambda: polo.returnTradeHistory('BTC_LTC', 0, 2 ** 32,
+                                         columnar=True)),
+        ('trade_history_stream', 'returnTradeHistory',
+         lambda: sum(1 for _ in polo.streamTradeHistory('BTC_LTC', 0,
+                                                        2 ** 32))),
+        ('chart_data', 'returnChartData',
+         lambda: polo.returnChartData('BTC_LTC', 1800)),
+        ('chart_data_columnar', 'returnChartData',
+         lambda: polo.returnChartData('BTC_LTC', 1800, columnar=True))]
+    results = {}
+    for name, command, call in cases:
+        megabytes = len(exchange.payloads[command]) / 1e6
+        elapsed = _timed(call, repeat)
+        results[name] = {'megabytes': megabytes, 'seconds': elapsed,
+                         'seconds_per_mb': elapsed / megabytes,
+                         'peak_bytes': _peak(call)}
+    return results
+
+
+def _busiest(arrivals):
+    """Return the most arrivals within one second."""
+    busiest, first = 0, 0
+    for last, arrival in enumerate(arrivals):
+        while arrival - arrivals[first] >= 1.0:
+            first += 1
+        busiest = max(busiest, last - first + 1)
+    return busiest
+
+
+def bench_limiter(exchange, limit, threads, seconds):
+    """How closely `threads` contending callers are held to `limit` calls
+    per second. The first second also spends the initial burst of the
+    bucket, so the steady state is measured after it."""
+    polo = _public(exchange, semaphore=TokenBucket(limit))
+    started = time.time()
+    ends = started + seconds
+    del exchange.arrivals[:]
+
+    def worker():
+        while time.time() < ends:
+            polo.returnTicker()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    arrivals = sorted(exchange.arrivals)
+    steady = [arrival for arrival in arrivals if arrival >= started + 1.0]
+    span = steady[-1] - steady[0] if len(steady) > 1 else 0
+    return {'limit': limit, 'threads': threads, 'calls': len(arrivals),
+            'busiest_window': _busiest(arrivals),
+            'steady_calls_per_second': (len(steady) - 1) / span
+            if span else None,
+            'steady_busiest_window': _busiest(steady),
+            'steady_overshoot': _busiest(steady) / limit - 1}
+
+
+def bench_private(exchange, threads, calls, latency, keys=1):
+    """Throughput of concurrent private calls over a `latency` seconds
+    round trip, signed with `keys` API keys, counting only the calls that
+    succeeded; failed calls and the stale nonces seen by the exchange are
+    counted apart."""
+    polo = Poloniex('key', 'secret', private_url=exchange.url + '/tradingApi',
+                    semaphore=TokenBucket(_UNLIMITED),
+                    keys=[('key{}'.format(i), 'secret')
+                          for i in range(1, keys)])
+    exchange.latency, exchange.nonce_errors = latency, 0
+    failures = []
+
+    def worker():
+        for _ in range(calls):
+            try:
+                polo.returnBalances()
+            except Exception as e:
+                failures.append(e)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.time()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.time() - started
+    exchange.latency = 0.0
+    return {'threads': threads, 'keys': keys, 'latency': latency,
+            'calls_per_second': (threads * calls - len(failures)) / elapsed,
+            'failures': len(failures),
+            'nonce_errors': exchange.nonce_errors}
+
+
+def bench_signing(iterations):
+    """Signatures per second of a typical order body, keying a new HMAC
+    each time as the client used to, and copying a pre-keyed one."""
+    apikey, secret = 'K' * 35, 'f' * 128
+    body = ('command=buy&nonce=1514764800000&currencyPair=BTC_LTC'
+            '&rate=0.01234567&amount=12.5&postOnly=1')
+
+    def fresh():
+        for _ in range(iterations):
+            hmac.new(secret.encode('utf-8'), body.encode('utf-8'),
+                     hashlib.sha512).hexdigest()
+
+    signer = Signer(apikey, secret)
+
+    def keyed():
+        for _ in range(iterations):
+            signer.sign(body)
+
+    before, after = _timed(fresh, 3), _timed(keyed, 3)
+    return {'fresh_per_second': iterations / before,
+            'signer_per_second': iterations / after,
+            'speedup': before / after}
+
+
+def bench_replay(exchange, calls):
+    """Calls per second of a public command replayed from a recording,
+    without a network round trip, next to the live rate."""
+    path = os.path.join(tempfile.mkdtemp(), 'traffic.log')
+    recorder = _public(exchange, session=recording_session(path))
+    started = time.time()
+    for _ in range(calls):
+        recorder.returnTicker()
+    live = calls / (time.time() - started)
+    recorder.close()
+    polo = _public(exchange, session=replay_session(path))
+    elapsed = _timed(lambda: [polo.returnTicker() for _ in range(calls)], 3)
+    os.remove(path)
+    return {'calls': calls, 'live_calls_per_second': live,
+            'replay_calls_per_second': calls / elapsed}
+
+
+_STARTUP = '''
+import sys, time, json
+started = time.time()
+import poloniex
+imported = time.time()
+polo = poloniex.PoloniexPublic(public_url=sys.argv[1])
+created = time.time()
+polo.returnTicker()
+called = time.time()
+print(json.dumps({'import_seconds': imported - started,
+                  'client_seconds': created - imported,
+                  'first_call_seconds': called - created,
+                  'total_seconds': called - started,
+                  'modules': len(sys.modules)}))
+'''
+
+
+def bench_startup(exchange, repeat):
+    """Cold start of a fresh interpreter: the time to import the package,
+    to create a client and to make a first call, best of `repeat` runs, and
+    the number of modules loaded by then."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    runs = [json.loads(subprocess.check_output(
+        [sys.executable, '-c', _STARTUP, exchange.url + '/public'], env=env))
+        for _ in range(repeat)]
+    return dict((name, min(run[name] for run in runs)) for name in runs[0])
+
+
+def _tickers(pairs, polls, moving):
+    """`polls` successive returnTicker bodies of `pairs` markets, of which
+    a fraction `moving` changes between two polls."""
+    rng = random.Random(0)
+    names = ['BTC_C{:03d}'.format(index) for index in range(pairs)]
+    last = dict((name, rng.uniform(1e-6, 0.1)) for name in names)
+    bodies = []
+    for _ in range(polls):
+        for name in rng.sample(names, int(pairs * moving)):
+            last[name] *= rng.uniform(0.99, 1.01)
+        bodies.append(json.dumps(dict(
+            (name, {'id': index, 'last': '{:.8f}'.format(last[name]),
+                    'lowestAsk': '{:.8f}'.format(last[name] * 1.001),
+                    'highestBid': '{:.8f}'.format(last[name] * 0.999),
+                    'percentChange': '0.01000000', 'baseVolume': '12.5',
+                    'quoteVolume': '1250.0', 'isFrozen': '0',
+                    'high24hr': '{:.8f}'.format(last[name] * 1.05),
+                    'low24hr': '{:.8f}'.format(last[name] * 0.95)})
+            for index, name in enumerate(names))))
+    return bodies
+
+
+def bench_ticker(pairs, polls, moving=0.05):
+    """Seconds per poll to decode a returnTicker body and find the markets
+    that changed: casting everything and comparing the dicts, and keeping
+    raw Snapshots instead."""
+    bodies = _tickers(pairs, polls, moving)
+
+    def dicts():
+        previous = None
+        for body in bodies:
+            current = json.loads(body, object_hook=AutoCastDict)
+            if previous is not None:
+                [pair for pair, row in current.items()
+                 if any(row[key] != previous[pair][key] for key in row)]
+            previous = current
+
+    def snapshots():
+        previous = None
+        for body in bodies:
+            current = Snapshot(json.loads(body), 0)
+            if previous is not None:
+                diff(previous, current, AutoCastDict)
+            previous = current
+
+    before, after = _timed(dicts, 3), _timed(snapshots, 3)
+    return {'pairs': pairs, 'moving': moving,
+            'dicts_seconds_per_poll': before / polls,
+            'snapshot_seconds_per_poll': after / polls,
+            'speedup': before / after}
+
+
+def run(quick=False, only=None):
+    sizes = (dict(pairs=20, trades=5000, years=1) if quick else
+             dict(pairs=100, trades=50000, years=3))
+    benchmarks = [
+        ('calls', lambda exchange: bench_calls(exchange,
+                                               100 if quick else 1000)),
+        ('decode', lambda exchange: bench_decode(exchange,
+                                                 1 if quick else 3)),
+        ('limiter', lambda exchange: bench_limiter(
+            exchange, 6, 16, 2 if quick else 5)),
+        ('private', lambda exchange: bench_private(
+            exchange, 8, 5 if quick else 25, 0.02)),
+        ('private_keys', lambda exchange: bench_private(
+            exchange, 8, 5 if quick else 25, 0.02, keys=4)),
+        ('signing', lambda exchange: bench_signing(
+            10000 if quick else 100000)),
+        ('ticker', lambda exchange: bench_ticker(
+            200 if quick else 500, 10 if quick else 50)),
+        ('replay', lambda exchange: bench_replay(
+            exchange, 200 if quick else 2000)),
+        ('startup', lambda exchange: bench_startup(
+            exchange, 3 if quick else 10))]
+    results = {}
+    with MockExchange(**sizes) as exchange:
+        for name, benchmark in benchmarks:
+            if only is None or name in only:
+                results[name] = benchmark(exchange)
+    return {'meta': {'python': platform.python_version(),
+                     'implementation': platform.python_implementation(),
+                     'platform': platform.platform(), 'time': time.time(),
+                     'quick': quick, 'sizes': sizes},
+            'results': results}
+
+
+def _numbers(tree, prefix=''):
+    for key, value in sorted(tree.items()):
+        if isinstance(value, dict):
+            for item in _numbers(value, prefix + key + '.'):
+                yield item
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield prefix + key, value
+
+
+def compare(baseline, current):
+    """Return (name, baseline, current, relative change) for the numbers
+    present in both runs."""
+    before = dict(_numbers(baseline['results']))
+    return [(name, before[name], value,
+             (value - before[name]) / before[name] if before[name] else None)
+            for name, value in _numbers(current['results']) if name in before]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller payloads and shorter runs')
+    parser.add_argument('--only', action='append',
+                        choices=['calls', 'decode', 'limiter', 'private',
+                                 'private_keys', 'signing', 'ticker',
+                                 'replay', 'startup'])
+    parser.add_argument('--output', help='write the results to this file')
+    parser.add_argument('--compare', help='previous results to compare with')
+    args = parser.parse_args(argv)
+
+    report = run(args.quick, args.only)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for name, before, after, change in compare(baseline, report):
+            print('{:50} {:>14.6g} {:>14.6g} {:>+8.1%}'.format(
+                name, before, after, change or 0), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Local mock of the Poloniex HTTP API serving large, realistic payloads."""
+import json
+import time
+import random
+import datetime
+import threading
+
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import urlparse, parse_qs
+
+
+def order_book_all(rng, pairs=100, depth=50):
+    """A returnOrderBook('all') answer: `pairs` books of `depth` levels."""
+    books = {}
+    for index in range(pairs):
+        mid = rng.uniform(1e-6, 0.1)
+        books['BTC_C{:03d}'.format(index)] = {
+            'asks': [['{:.8f}'.format(mid * (1 + 0.001 * (level + 1))),
+                      round(rng.uniform(0.1, 1000), 8)]
+                     for level in range(depth)],
+            'bids': [['{:.8f}'.format(mid * (1 - 0.001 * (level + 1))),
+                      round(rng.uniform(0.1, 1000), 8)]
+                     for level in range(depth)],
+            'isFrozen': '0', 'seq': rng.randint(1, 10 ** 8)}
+    return books
+
+
+def trade_history(rng, count=50000, start=1500000000):
+    """A returnTradeHistory answer holding `count` trades, newest first."""
+    trades = []
+    date = start + count
+    for trade_id in range(count, 0, -1):
+        date -= rng.randint(0, 2)
+        rate = rng.uniform(0.01, 0.02)
+        amount = rng.uniform(0.001, 50)
+        trades.append({
+            'globalTradeID': 10 ** 8 + trade_id, 'tradeID': trade_id,
+            'date': datetime.datetime.utcfromtimestamp(date).strftime(
+                '%Y-%m-%d %H:%M:%S'),
+            'type': rng.choice(('buy', 'sell')),
+            'rate': '{:.8f}'.format(rate), 'amount': '{:.8f}'.format(amount),
+            'total': '{:.8f}'.format(rate * amount)})
+    return trades
+
+
+def chart_data(rng, years=3, period=1800, start=1400000000):
+    """A returnChartData answer covering `years` years of candles."""
+    candles = []
+    price = 0.015
+    for date in range(start, start + years * 365 * 86400, period):
+        close = price * rng.uniform(0.98, 1.02)
+        candles.append({
+            'date': date, 'high': max(price, close) * 1.01,
+            'low': min(price, close) * 0.99, 'open': price, 'close': close,
+            'volume': rng.uniform(0, 100), 'quoteVolume': rng.uniform(0, 1e4),
+            'weightedAverage': (price + close) / 2})
+        price = close
+    return candles
+
+
+class _Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1                 # send the headers and body together
+
+    def log_message(self, *args):
+        pass
+
+    def _answer(self, body):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        exchange = self.server.exchange
+        query = parse_qs(urlparse(self.path).query)
+        exchange.hit()
+        self._answer(exchange.public(query.get('command', [''])[0]))
+
+    def do_POST(self):
+        exchange = self.server.exchange
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        exchange.hit()
+        self._answer(exchange.private(self.headers.get('Key'),
+                                      int(form.get('nonce', ['0'])[0])))
+
+
+class MockExchange(object):
+
+    """Threaded HTTP server on localhost answering the public commands with
+    pre-encoded payloads and every private command with a balance, after
+    `latency` seconds. Stale nonces get the exchange's error. The arrival
+    time of every request is kept in `arrivals`."""
+
+    def __init__(self, latency=0.0, pairs=100, depth=50, trades=50000,
+                 years=3, period=1800, seed=0):
+        rng = random.Random(seed)
+        self.latency = latency
+        self.payloads = dict(
+            (command, json.dumps(data).encode('utf-8')) for command, data in (
+                ('returnTicker', {'BTC_LTC': {'last': '0.0251',
+                                              'lowestAsk': '0.02589999'}}),
+                ('returnOrderBook', order_book_all(rng, pairs, depth)),
+                ('returnTradeHistory', trade_history(rng, trades)),
+                ('returnChartData', chart_data(rng, years, period))))
+        self.arrivals = []
+        self.nonce_errors = 0
+        self._nonces = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self._server.server_address[1])
+
+    def hit(self):
+        with self._lock:
+            self.arrivals.append(time.time())
+        if self.latency:
+            time.sleep(self.latency)
+
+    def public(self, command):
+        return self.payloads.get(command, b'{"error": "Invalid command."}')
+
+    def private(self, key, nonce):
+        with self._lock:
+            last = self._nonces.get(key, 0)
+            if nonce <= last:
+                self.nonce_errors += 1
+                return json.dumps({'error': 'Nonce must be greater than {}. '
+                                            'You provided {}.'.format(
+                                                last, nonce)}).encode('utf-8')
+            self._nonces[key] = nonce
+        return b'{"BTC": "1.00000000", "LTC": "0.00000000"}'
+
+    def start(self):
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.exchange = self
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -1,2 +1,30 @@
+import sys as _sys
+import importlib as _importlib
+
 from .exceptions import *
 from .poloniex import *
+from .concurrency import TokenBucket, RateLimiter, SharedTokenBucket
+
+# classes of modules the clients do not need themselves, imported on first
+# access
+_LAZY = {'TTLCache': '.cache', 'RetryPolicy': '.retry',
+         'CircuitBreaker': '.retry', 'Metrics': '.metrics',
+         'Histogram': '.metrics', 'OrderManager': '.orders',
+         'TickerFeed': '.ticker', 'AdaptiveInterval': '.ticker'}
+
+__all__ = sorted([name for name in globals() if not name.startswith('_')]
+                 + list(_LAZY))
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(
+            'module {!r} has no attribute {!r}'.format(__name__, name))
+    value = getattr(_importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+if _sys.version_info < (3, 7):          # no module __getattr__ before 3.7
+    for _name in _LAZY:
+        __getattr__(_name)
@@ -0,0 +1,243 @@
+import json as _json
+import time as _time
+import asyncio as _asyncio
+import itertools as _itertools
+
+try:
+    import aiohttp as _aiohttp
+except ImportError:                                   # aiohttp is optional
+    _aiohttp = None
+
+from six.moves.urllib.parse import urlencode as _urlencode
+
+from . import columnar as _columnar
+from .concurrency import LimiterStats
+from .poloniex import (PoloniexPublic, Poloniex, _PUBLIC_URL, _PRIVATE_URL,
+                       _NONCE_ERROR, _sanitize)
+from .utils import AutoCastDict as _AutoCastDict
+from .utils import NUMERIC_MODES as _NUMERIC_MODES
+from .exceptions import (PoloniexCredentialsException,
+                         PoloniexCommandException)
+
+
+def _sync_only(name, instead):
+    raise TypeError('{} needs a synchronous client; with asyncio, use {} '
+                    'instead'.format(name, instead))
+
+
+class AsyncTokenBucket(object):
+    """Asyncio-native token bucket: tokens refill continuously at `limit` per
+    `period` seconds and callers over budget reserve their tokens in arrival
+    order, then sleep on the event loop until they are refilled.
+    """
+
+    def __init__(self, limit=6, period=1.0, capacity=None):
+        if limit <= 0 or period <= 0:
+            raise ValueError("token bucket limit and period must be > 0")
+        self.rate = float(limit) / period
+        self.capacity = float(capacity or limit)
+        self._tokens = self.capacity
+        self._stamp = _time.monotonic()
+        self.stats = LimiterStats()
+
+    async def acquire(self, cost=1):
+        """Take `cost` tokens from the bucket, waiting until available."""
+        # no await before the reservation, so this is atomic on the loop
+        now = _time.monotonic()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        wait = max(0.0, (cost - self._tokens) / self.rate)
+        self._tokens -= cost
+        self.stats.record(wait)
+        if wait > 0:
+            await _asyncio.sleep(wait)
+        return True
+
+
+class AsyncPoloniexPublic(PoloniexPublic):
+
+    """Asyncio client to connect to Poloniex public APIs.
+
+    Requests share one aiohttp connection pool of `pool_size` connections,
+    created on first use inside the running loop, and are rate limited by
+    `semaphore`, an AsyncTokenBucket by default. Use it as an async context
+    manager, or call close(), to release the pool."""
+
+    # the aiohttp session, created by _session() rather than by the
+    # property of the synchronous clients
+    session = None
+
+    def __init__(self, public_url=_PUBLIC_URL, limit=6, session=None,
+                 semaphore=None, pool_size=100, object_hook=_AutoCastDict,
+                 numeric=None):
+        """Initialize the asyncio Poloniex client."""
+        if _aiohttp is None:
+            raise ImportError('the asyncio clients require aiohttp')
+        self._public_url = public_url
+        self.numeric = numeric or 'float'
+        self.parse_float = None
+        if numeric is not None:
+            object_hook, self.parse_float = _NUMERIC_MODES[numeric]
+        self.object_hook = object_hook
+        self.semaphore = semaphore or AsyncTokenBucket(limit)
+        self.session = session
+        self.pool_size = pool_size
+        self.timer = None
+
+    def _session(self):
+        if self.session is None:
+            self.session = _aiohttp.ClientSession(
+                connector=_aiohttp.TCPConnector(limit=self.pool_size))
+        return self.session
+
+    async def close(self):
+        """Close the underlying connection pool."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    # close() is a coroutine, a plain with block could not await it
+
+    def __enter__(self):
+        raise TypeError('use "async with" on the asyncio clients')
+
+    def __exit__(self, *exc_info):
+        raise TypeError('use "async with" on the asyncio clients')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, t, v, tb):
+        await self.close()
+
+    async def _request(self, command, private, object_hook, method, url,
+                       **kwargs):
+        """Perform a rate limited request and decode its JSON answer."""
+        acquire_for = getattr(self.semaphore, 'acquire_for', None)
+        if acquire_for is None:
+            await self.semaphore.acquire()
+        else:
+            await acquire_for(command, private)
+        async with self._session().request(method, url, **kwargs) as resp:
+            body = await resp.read()
+            try:
+                if object_hook is None:
+                    respdata = _json.loads(body.decode('utf-8'),
+                                           object_hook=self.object_hook,
+                                           parse_float=self.parse_float)
+                else:
+                    respdata = _json.loads(body.decode('utf-8'),
+                                           object_hook=object_hook)
+            except ValueError:
+                resp.raise_for_status()
+                raise Exception('No JSON object could be decoded')
+
+            # same check order as the synchronous clients
+            if 'error' in respdata:
+                error = PoloniexCommandException(respdata['error'])
+                error.status_code = resp.status
+                raise error
+
+            resp.raise_for_status()
+            return respdata
+
+    async def _public(self, command, _object_hook=None, **params):
+        """Invoke the 'command' public API with optional params."""
+        params = _sanitize(params)
+        params['command'] = command
+        return await self._request(command, False, _object_hook, 'GET',
+                                   self._public_url, params=params)
+
+    async def _columns(self, fields, fixed_point, command, **params):
+        if not fields:
+            return await self._public(command, **params)
+        if fixed_point is None:
+            fixed_point = self.numeric == 'fixed'
+        decoder = _columnar.ColumnDecoder(fields, fixed_point)
+        await self._public(command, _object_hook=decoder, **params)
+        return decoder.result()
+
+    # streaming and batches rely on blocking reads and worker threads
+
+    def streamOrderBook(self, *args, **kwargs):
+        _sync_only('streamOrderBook', 'await returnOrderBook()')
+
+    def streamTradeHistory(self, *args, **kwargs):
+        _sync_only('streamTradeHistory', 'await returnTradeHistory()')
+
+    def streamChartData(self, *args, **kwargs):
+        _sync_only('streamChartData', 'await returnChartData()')
+
+    def batch(self, *args, **kwargs):
+        _sync_only('batch', 'asyncio.gather() on the calls')
+
+
+class AsyncPoloniex(AsyncPoloniexPublic, Poloniex):
+
+    """Asyncio client to connect to Poloniex private APIs.
+
+    Nonces are allocated and the body signed without yielding to the loop,
+    so concurrent calls never share a nonce, and the calls of one key are
+    sent one at a time, in nonce order, since requests sent side by side
+    may reach the exchange out of order; calls of different keys run
+    concurrently. A call rejected for a stale nonce (used by another
+    process, say) is retried up to `nonce_retries` times with a fresh
+    one."""
+
+    def __init__(self, apikey=None, secret=None,
+                 public_url=_PUBLIC_URL,
+                 private_url=_PRIVATE_URL,
+                 limit=6, session=None, semaphore=None, pool_size=100,
+                 nonce_iter=None, nonce_retries=3,
+                 object_hook=_AutoCastDict, keys=None, numeric=None):
+        """Initialize the asyncio Poloniex private client. Additional
+        (apikey, secret) pairs may be given as `keys`, as with Poloniex."""
+        super(AsyncPoloniex, self).__init__(public_url, limit, session,
+                                            semaphore, pool_size, object_hook,
+                                            numeric)
+        self._private_url = private_url
+        self._init_keys(apikey, secret, keys, nonce_iter, None)
+        self.nonce_retries = nonce_retries
+        # key -> asyncio.Lock, created in the running loop
+        self._send_locks = {}
+
+    async def _private(self, command, _object_hook=None, **params):
+        """Invoke the 'command' private API with optional params."""
+        key = next(self._key_cycle)
+        if not key.apikey or not key.secret:
+            raise PoloniexCredentialsException('missing apikey/secret')
+
+        params = _sanitize(params)
+        params['command'] = command
+        lock = self._send_locks.get(key)
+        if lock is None:
+            lock = self._send_locks[key] = _asyncio.Lock()
+        for attempt in _itertools.count():
+            try:
+                async with lock:
+                    params['nonce'] = next(key.nonce_iter)
+                    body = _urlencode(params)
+                    headers = key.signer.headers(body)
+                    headers['Content-Type'] = \
+                        'application/x-www-form-urlencoded'
+                    return await self._request(command, True, _object_hook,
+                                               'POST', self._private_url,
+                                               data=body, headers=headers)
+            except PoloniexCommandException as e:
+                stale = _NONCE_ERROR.search(str(e))
+                if stale is None or attempt >= self.nonce_retries:
+                    raise
+                key.skip_to(max(int(stale.group(1)), params['nonce']))
+
+    async def returnDeposits(self, start=0, end=2**32-1):
+        """Returns your deposit history within a range, specified by the
+        "start" and "end" POST parameters, both of which should be given as
+        UNIX timestamps."""
+        return (await self.returnDepositsWithdrawals(start, end))['deposits']
+
+    async def returnWithdrawals(self, start=0, end=2**32-1):
+        """Returns your withdrawal history within a range, specified by the
+        "start" and "end" POST parameters, both of which should be given as
+        UNIX timestamps."""
+        return (await self.returnDepositsWithdrawals(start, end))['withdrawals']
@@ -0,0 +1,132 @@
+import os as _os
+import json as _json
+import time as _time
+import collections as _collections
+
+from concurrent import futures as _futures
+
+from .columnar import parse_time as _parse_time
+from .exceptions import PoloniexCommandException
+
+_replace = getattr(_os, 'replace', _os.rename)
+
+# most trades returned by a single public returnTradeHistory call
+TRADE_HISTORY_CAP = 50000
+
+
+class Backfill(object):
+
+    """Iterator over the rows of a [start, end) time range fetched in chunks.
+
+    `fetch(start, end)` returns the rows between two inclusive timestamps.
+    Chunks of `chunk` seconds are fetched in parallel by `workers` threads,
+    the client's rate limiter keeping them within budget, and a chunk
+    returning `cap` rows or more is split in half and fetched again. Rows
+    are yielded in time order, without duplicates across chunk edges.
+    After each chunk is consumed its end is saved to the `checkpoint` file,
+    so an interrupted backfill resumes where it stopped."""
+
+    def __init__(self, fetch, start, end, chunk, key, when, cap=None,
+                 workers=4, checkpoint=None, retries=3, backoff=1.0,
+                 min_span=1):
+        self.fetch = fetch
+        self.start, self.end = int(start), int(end)
+        self.chunk = max(int(chunk), min_span)
+        self.key, self.when = key, when
+        self.cap = cap
+        self.workers = workers
+        self.checkpoint = checkpoint
+        self.retries, self.backoff = retries, backoff
+        self.min_span = min_span
+
+    def resume_point(self):
+        """Return the timestamp the backfill (re)starts from."""
+        if self.checkpoint and _os.path.exists(self.checkpoint):
+            with open(self.checkpoint) as f:
+                return max(self.start, _json.load(f)['next'])
+        return self.start
+
+    def _save(self, position):
+        if self.checkpoint:
+            tmp = self.checkpoint + '.tmp'
+            with open(tmp, 'w') as f:
+                _json.dump({'next': position, 'end': self.end}, f)
+            _replace(tmp, self.checkpoint)
+
+    def _fetch(self, start, end):
+        for attempt in range(self.retries + 1):
+            try:
+                return list(self.fetch(start, end - 1))
+            except PoloniexCommandException:
+                raise                       # the request itself is wrong
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                _time.sleep(self.backoff * 2 ** attempt)
+
+    def __iter__(self):
+        spans = _collections.deque(
+            (a, min(a + self.chunk, self.end))
+            for a in range(self.resume_point(), self.end, self.chunk))
+        pool = _futures.ThreadPoolExecutor(self.workers)
+        pending = _collections.deque()
+
+        def submit(a, b):
+            return (a, b, pool.submit(self._fetch, a, b))
+
+        try:
+            edge = set()
+            while spans or pending:
+                while spans and len(pending) < 2 * self.workers:
+                    pending.append(submit(*spans.popleft()))
+                a, b, future = pending.popleft()
+                rows = future.result()
+                if self.cap and len(rows) >= self.cap and b - a > self.min_span:
+                    middle = (a + b) // 2
+                    pending.appendleft(submit(middle, b))
+                    pending.appendleft(submit(a, middle))
+                    continue
+                keys = set()
+                for row in sorted(rows, key=self.key):
+                    key = self.key(row)
+                    if key in edge or not a <= self.when(row) < b:
+                        continue
+                    keys.add(key)
+                    yield row
+                edge = keys
+                self._save(b)
+        finally:
+            for _, _, future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+
+def backfill_trades(client, currencyPair, start, end, chunk=6 * 3600,
+                    private=False, limit=10000, **kwargs):
+    """Backfill the public trade history of a market over [start, end), or
+    your own trades with `private` set, fetched `limit` at a time."""
+    if private:
+        def fetch(a, b):
+            return client.returnTradeHistory(currencyPair, a, b, limit=limit)
+        cap = limit
+    else:
+        public = getattr(client, 'returnTradeHistoryPublic',
+                         client.returnTradeHistory)
+
+        def fetch(a, b):
+            return public(currencyPair, a, b)
+        cap = TRADE_HISTORY_CAP
+    return Backfill(fetch, start, end, chunk,
+                    key=lambda trade: trade['tradeID'],
+                    when=lambda trade: _parse_time(trade['date']),
+                    cap=cap, **kwargs)
+
+
+def backfill_chart_data(client, currencyPair, period, start, end, chunk=None,
+                        **kwargs):
+    """Backfill the candles of a market over [start, end)."""
+    def fetch(a, b):
+        return client.returnChartData(currencyPair, period, a, b)
+    return Backfill(fetch, start, end, chunk or 5000 * period,
+                    key=lambda candle: candle['date'],
+                    when=lambda candle: candle['date'], **kwargs)
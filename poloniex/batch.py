@@ -0,0 +1,154 @@
+import time as _time
+import threading as _threading
+import collections as _collections
+
+import six as _six
+
+from .lazy import lazy_import as _lazy_import
+from .exceptions import PoloniexCommandException
+
+_futures = _lazy_import('concurrent.futures')
+
+BatchResult = _collections.namedtuple(
+    'BatchResult', ['index', 'method', 'kwargs', 'result', 'error'])
+
+# commands with an 'all' variant, and the keyword arguments that must match
+# for per-market calls to be served by a single 'all' call
+_ALL_VARIANTS = {'returnOrderBook': ('depth',), 'returnOpenOrders': ()}
+_DEFAULTS = {'returnOrderBook': {'depth': '50'}}
+
+
+def _pick(pair):
+    def pick(result):
+        if pair not in result:
+            raise PoloniexCommandException('Invalid currency pair.')
+        return result[pair]
+    return pick
+
+
+def _whole(result):
+    return result
+
+
+class Batch(object):
+
+    """Run many client calls on a bounded pool of `workers` threads, all of
+    them going through the client's rate limiter, and iterate over their
+    BatchResult as they complete. Failures are reported per item in
+    `error` instead of being raised.
+
+    Identical read-only calls are sent once, and at least `collapse`
+    per-market calls of a command with an 'all' variant (returnOrderBook,
+    returnOpenOrders) are served by a single 'all' call. Items not done
+    when `deadline` seconds have passed, or cancelled with cancel(), are
+    yielded with a TimeoutError or CancelledError."""
+
+    def __init__(self, client, calls, workers=8, deadline=None, collapse=3):
+        self.client = client
+        self.calls = [(method, dict(kwargs or {})) for method, kwargs in calls]
+        self.workers = workers
+        self.deadline = deadline
+        self.collapse = collapse
+        self._cancelled = _threading.Event()
+        self._futures = []
+
+    def _jobs(self):
+        """Group the calls into (method, kwargs, [(index, extract)]) jobs."""
+        jobs = _collections.OrderedDict()
+        groups = _collections.defaultdict(list)
+        for index, (method, kwargs) in enumerate(self.calls):
+            if not isinstance(method, _six.string_types):
+                jobs[index] = (method, kwargs, [(index, _whole)])
+                continue
+            key = (method, tuple(sorted(kwargs.items())))
+            if method in _ALL_VARIANTS:
+                params = dict(_DEFAULTS.get(method, {}), **kwargs)
+                pair = params.get('currencyPair', 'all')
+                shared = tuple((name, params.get(name))
+                               for name in _ALL_VARIANTS[method])
+                if pair != 'all':
+                    groups[(method, shared)].append((index, pair, kwargs))
+                    continue
+                if set(kwargs) <= set(_ALL_VARIANTS[method] +
+                                      ('currencyPair',)):
+                    # the very call per-market ones would collapse into
+                    key = ('all', method, shared)
+            if method.startswith('return') and key in jobs:
+                jobs[key][2].append((index, _whole))
+            else:
+                jobs[key if method.startswith('return') else index] = (
+                    method, kwargs, [(index, _whole)])
+        for (method, shared), members in groups.items():
+            picked = [(index, _pick(pair)) for index, pair, _ in members]
+            key = ('all', method, shared)
+            if key in jobs:
+                # an 'all' call is made anyway, it serves them for free
+                jobs[key][2].extend(picked)
+            elif len(members) >= self.collapse:
+                jobs[key] = (method, dict(shared, currencyPair='all'),
+                             picked)
+            else:
+                for index, _, kwargs in members:
+                    jobs[index] = (method, kwargs, [(index, _whole)])
+        return list(jobs.values())
+
+    def _run(self, method, kwargs):
+        if self._cancelled.is_set():
+            raise _futures.CancelledError()
+        if isinstance(method, _six.string_types):
+            method = getattr(self.client, method)
+        return method(**kwargs)
+
+    def cancel(self):
+        """Cancel every call not started yet."""
+        self._cancelled.set()
+        for future in self._futures:
+            future.cancel()
+
+    def _results(self, members, outcome, error):
+        for index, extract in members:
+            method, kwargs = self.calls[index]
+            result = None
+            if error is None:
+                try:
+                    result = extract(outcome)
+                except Exception as e:
+                    error = e
+            yield BatchResult(index, method, kwargs, result, error)
+
+    def __iter__(self):
+        jobs = self._jobs()
+        ends = None if self.deadline is None else _time.time() + self.deadline
+        pool = _futures.ThreadPoolExecutor(self.workers)
+        members = {}
+        try:
+            for method, kwargs, job_members in jobs:
+                future = pool.submit(self._run, method, kwargs)
+                members[future] = job_members
+                self._futures.append(future)
+            timeout = None if ends is None else max(0, ends - _time.time())
+            try:
+                for future in _futures.as_completed(members, timeout):
+                    if future.cancelled():
+                        outcome, error = None, _futures.CancelledError()
+                    else:
+                        error = future.exception()
+                        outcome = None if error else future.result()
+                    for result in self._results(members.pop(future),
+                                                outcome, error):
+                        yield result
+            except _futures.TimeoutError:
+                pass
+            for future, job_members in list(members.items()):
+                future.cancel()
+                error = (_futures.CancelledError() if self._cancelled.is_set()
+                         else _futures.TimeoutError())
+                for result in self._results(job_members, None, error):
+                    yield result
+        finally:
+            self.cancel()
+            pool.shutdown(wait=False)
+
+    def results(self):
+        """Wait for every call and return the results in call order."""
+        return sorted(self, key=lambda result: result.index)
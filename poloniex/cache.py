@@ -0,0 +1,103 @@
+import threading as _threading
+import collections as _collections
+
+import six as _six
+
+from .concurrency import _monotonic
+
+# seconds each slow-changing public command may be served from the cache
+DEFAULT_TTLS = {'returnCurrencies': 3600.0, 'return24hVolume': 30.0,
+                'returnTicker': 1.0, 'returnLoanOrders': 1.0}
+
+
+class _Call(object):
+
+    """Response of a request in flight, shared by every waiting caller."""
+
+    def __init__(self):
+        self.done = _threading.Event()
+        self.value = self.error = None
+
+
+class TTLCache(object):
+
+    """Cache of public API responses, used through the `cache` argument of
+    the clients.
+
+    Every command gets its own time to live (`ttls`, commands without one
+    are never cached) and the least recently used responses are evicted
+    beyond `maxsize` entries. Concurrent callers of a request already in
+    flight wait for its response instead of sending their own. Clients
+    decoding numbers differently (see their `numeric` mode) may share a
+    cache: responses are kept apart by `decoding`."""
+
+    def __init__(self, ttls=None, maxsize=256, clock=_monotonic):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.maxsize = maxsize
+        self._clock = clock
+        self._lock = _threading.Lock()
+        self._entries = _collections.OrderedDict()
+        self._inflight = {}
+        self.hits = self.misses = self.coalesced = 0
+
+    @staticmethod
+    def key(command, params, decoding=None):
+        return (decoding, command) + tuple(sorted(_six.iteritems(params)))
+
+    def caches(self, command):
+        return self.ttls.get(command, 0) > 0
+
+    def get(self, command, params, load, decoding=None):
+        """Return the cached response to the command, or the one of the same
+        request in flight, or call `load` to fetch and cache it. `decoding`
+        identifies how load() decodes the response."""
+        key = self.key(command, params, decoding)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.pop(key)
+                self._entries[key] = entry          # most recently used
+                self.hits += 1
+                return entry[1]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            value = load()
+        except BaseException as e:
+            # KeyboardInterrupt and the like included: nothing is cached
+            call.error = e
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+            raise
+        with self._lock:
+            del self._inflight[key]
+            expires = self._clock() + self.ttls[command]
+            self._entries.pop(key, None)
+            self._entries[key] = (expires, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        call.value = value
+        call.done.set()
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return '<TTLCache entries={} hits={} misses={} coalesced={}>'.format(
+            len(self), self.hits, self.misses, self.coalesced)
@@ -0,0 +1,91 @@
+import six as _six
+import array as _array
+import calendar as _calendar
+
+from .utils import to_fixed as _to_fixed
+
+try:
+    import numpy as _np
+except ImportError:                                   # numpy is optional
+    _np = None
+
+# (name, kind) of every column; kind selects the converter and the storage
+CHART_FIELDS = (('date', 'time'), ('high', 'price'), ('low', 'price'),
+                ('open', 'price'), ('close', 'price'), ('volume', 'price'),
+                ('quoteVolume', 'price'), ('weightedAverage', 'price'))
+
+TRADE_FIELDS = (('globalTradeID', 'int'), ('tradeID', 'int'),
+                ('date', 'time'), ('type', 'side'), ('rate', 'price'),
+                ('amount', 'price'), ('total', 'price'))
+
+# trade sides are stored as signed bytes so volumes can be signed vectorially
+BUY, SELL = 1, -1
+
+
+def parse_time(value):
+    """Convert a 'YYYY-MM-DD HH:MM:SS' UTC string (or an epoch) into an
+    integer UNIX timestamp."""
+    if not isinstance(value, _six.string_types):
+        return int(value)
+    return _calendar.timegm((int(value[0:4]), int(value[5:7]),
+                             int(value[8:10]), int(value[11:13]),
+                             int(value[14:16]), int(value[17:19])))
+
+
+def _parse_side(value):
+    return BUY if value == 'buy' else SELL
+
+
+_CONVERTERS = {'int': int, 'time': parse_time, 'side': _parse_side,
+               'price': float}
+_TYPECODES = {'int': 'q', 'time': 'q', 'side': 'b', 'price': 'd'}
+_DTYPES = {'q': '<i8', 'b': 'i1', 'd': '<f8'}
+
+
+def dtype(fields, fixed_point=False):
+    """Return the (name, typecode) pairs describing the columns of fields.
+    Prices are int64 scaled by 1e8 when fixed_point is set."""
+    return [(name, 'q' if fixed_point and kind == 'price'
+             else _TYPECODES[kind]) for name, kind in fields]
+
+
+class ColumnDecoder(object):
+
+    """JSON object hook that appends every row straight into per-column
+    arrays instead of building one mapping per row.
+
+    Objects lacking the `date` field (e.g. an error payload) are returned
+    untouched, rows are replaced with None."""
+
+    def __init__(self, fields, fixed_point=False):
+        self.fields = fields
+        self.fixed_point = fixed_point
+        self._columns = [(name, (_to_fixed if fixed_point and kind == 'price'
+                                 else _CONVERTERS[kind]),
+                          _array.array(code))
+                         for (name, kind), (_, code)
+                         in zip(fields, dtype(fields, fixed_point))]
+
+    def __call__(self, obj):
+        if 'date' not in obj:
+            return obj
+        get = obj.get
+        for name, convert, column in self._columns:
+            column.append(convert(get(name, 0)))
+        return None
+
+    def __len__(self):
+        return len(self._columns[0][2]) if self._columns else 0
+
+    def result(self, use_numpy=True):
+        """Return the decoded rows as a NumPy structured array, or as a
+        dict of array.array columns when NumPy is missing or not wanted."""
+        if not (use_numpy and _np is not None):
+            return dict((name, column) for name, _, column in self._columns)
+        table = _np.empty(len(self), dtype=[
+            (name, _DTYPES[column.typecode])
+            for name, _, column in self._columns])
+        if len(table):
+            for name, _, column in self._columns:
+                table[name] = _np.frombuffer(column, dtype=column.typecode)
+        return table
@@ -1,6 +1,17 @@
+import os
+import mmap
+import time
+import heapq
+import struct
+import itertools
 import threading
 import six
 
+try:
+    import fcntl
+except ImportError:                                   # not on POSIX
+    fcntl = None
+
 
 # Timer's implementation class is hidden on Python2
 Timer = getattr(threading, "{0}Timer".format("_" if six.PY2 else ""))
@@ -104,3 +115,332 @@ class Semaphore(object):
 
     def __exit__(self, t, v, tb):
         self.release()
+
+
+_monotonic = getattr(time, "monotonic", time.time)
+
+
+class LimiterStats(object):
+    """Wait-time statistics collected by a rate limiter."""
+
+    def __init__(self):
+        self.acquired = self.delayed = self.rejected = 0
+        self.total_wait = self.max_wait = 0.0
+
+    def record(self, wait):
+        """Account for a granted acquisition that had to wait `wait` seconds."""
+        self.acquired += 1
+        if wait > 0:
+            self.delayed += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    @property
+    def mean_wait(self):
+        return self.total_wait / self.acquired if self.acquired else 0.0
+
+    def __repr__(self):
+        return ('<LimiterStats acquired={} delayed={} rejected={} '
+                'mean_wait={:.4f}s max_wait={:.4f}s>').format(
+                    self.acquired, self.delayed, self.rejected,
+                    self.mean_wait, self.max_wait)
+
+
+class TokenBucket(object):
+    """Token bucket rate limiter with the same interface as Semaphore.
+    Tokens refill continuously at `limit` per `period` seconds up to
+    `capacity`, so no timer thread is needed and calls are never delayed
+    while budget is left. Callers over budget reserve their tokens in
+    arrival order and sleep exactly until they are refilled.
+    """
+
+    # refilled by the passing of time rather than by a clear() timer
+    self_refilling = True
+
+    def __init__(self, limit=6, period=1.0, capacity=None, clock=_monotonic):
+        if limit <= 0 or period <= 0:
+            raise ValueError("token bucket limit and period must be > 0")
+        self.rate = float(limit) / period
+        self.capacity = float(capacity or limit)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._stamp = clock()
+        self.stats = LimiterStats()
+
+    def acquire(self, blocking=True, timeout=None, cost=1):
+        """Take `cost` tokens from the bucket, sleeping until they are
+        available. With blocking set to false, or if the tokens will not be
+        available within `timeout` seconds, return false without taking
+        anything. Return true otherwise.
+        """
+        if not blocking and timeout is not None:
+            raise ValueError("can't specify timeout for non-blocking acquire")
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity,
+                               self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            wait = max(0.0, (cost - self._tokens) / self.rate)
+            if wait > 0 and (not blocking or
+                             (timeout is not None and wait > timeout)):
+                self.stats.rejected += 1
+                return False
+            self._tokens -= cost
+            self.stats.record(wait)
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    __enter__ = acquire
+
+    def release(self):
+        """Tokens are given back by the passing of time, nothing to do."""
+
+    def clear(self):
+        """Refill the bucket to its full capacity."""
+        with self._lock:
+            self._tokens, self._stamp = self.capacity, self._clock()
+
+    def __exit__(self, t, v, tb):
+        self.release()
+
+
+class RateLimiter(object):
+    """Rate limiter keeping separate token buckets for the public and the
+    private endpoints and charging every command its own cost (1 token by
+    default). It can be passed as the `semaphore` of a client.
+    Ready-made buckets, e.g. SharedTokenBucket, may be given as `public`
+    and `private`, possibly the same one for a single shared budget.
+    """
+
+    self_refilling = True
+
+    def __init__(self, limit=6, private_limit=None, costs=None, period=1.0,
+                 clock=_monotonic, public=None, private=None):
+        self.public = public or TokenBucket(limit, period, clock=clock)
+        self.private = private or TokenBucket(private_limit or limit, period,
+                                              clock=clock)
+        self.costs = dict(costs or {})
+
+    def acquire_for(self, command, private=False, blocking=True, timeout=None):
+        """Acquire the budget needed to run `command`."""
+        bucket = self.private if private else self.public
+        return bucket.acquire(blocking, timeout, self.costs.get(command, 1))
+
+    def acquire(self, blocking=True, timeout=None):
+        return self.public.acquire(blocking, timeout)
+
+    __enter__ = acquire
+
+    def release(self):
+        """Tokens are given back by the passing of time, nothing to do."""
+
+    def clear(self):
+        self.public.clear()
+        self.private.clear()
+
+    @property
+    def stats(self):
+        return {'public': self.public.stats, 'private': self.private.stats}
+
+    def __exit__(self, t, v, tb):
+        self.release()
+
+
+class SharedTokenBucket(object):
+    """Token bucket whose state lives in a memory-mapped file, so that every
+    process on the host opening the same `path` shares one budget.
+
+    The state is the theoretical arrival time of the generic cell rate
+    algorithm, updated under an fcntl lock: each caller reserves its slot
+    in lock order and sleeps until it comes, which queues processes fairly
+    without a broker. The file outlives processes and reboots, so the state
+    is kept in wall clock time: monotonic clocks have no common origin
+    across boots. Only available on POSIX systems.
+    """
+
+    self_refilling = True
+
+    # theoretical arrival time and number of tokens handed out by the fleet
+    _STATE = struct.Struct('<dq')
+
+    def __init__(self, path, limit=6, period=1.0, capacity=None):
+        if fcntl is None:
+            raise RuntimeError("SharedTokenBucket requires fcntl (POSIX)")
+        if limit <= 0 or period <= 0:
+            raise ValueError("token bucket limit and period must be > 0")
+        self.path = path
+        self.limit, self.period, self.capacity = limit, period, capacity
+        self.interval = float(period) / limit
+        self.tolerance = ((capacity or limit) - 1) * self.interval
+        self.stats = LimiterStats()
+        self._open()
+
+    def _open(self):
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'a+b')
+        fcntl.lockf(self._file, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._file.fileno()).st_size < self._STATE.size:
+                self._file.truncate(self._STATE.size)
+        finally:
+            fcntl.lockf(self._file, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._file.fileno(), self._STATE.size)
+
+    def __getstate__(self):
+        return (self.path, self.limit, self.period, self.capacity)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def acquire(self, blocking=True, timeout=None, cost=1):
+        """Reserve `cost` tokens and sleep until they are available.
+        Behaves like TokenBucket.acquire.
+        """
+        if not blocking and timeout is not None:
+            raise ValueError("can't specify timeout for non-blocking acquire")
+        with self._lock:
+            fcntl.lockf(self._file, fcntl.LOCK_EX)
+            try:
+                tat, total = self._STATE.unpack_from(self._map)
+                now = time.time()
+                wait = max(0.0, tat - self.tolerance - now)
+                if wait > 0 and (not blocking or
+                                 (timeout is not None and wait > timeout)):
+                    self.stats.rejected += 1
+                    return False
+                tat = max(tat, now) + cost * self.interval
+                self._STATE.pack_into(self._map, 0, tat, total + cost)
+                self.stats.record(wait)
+            finally:
+                fcntl.lockf(self._file, fcntl.LOCK_UN)
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    __enter__ = acquire
+
+    def release(self):
+        """Tokens are given back by the passing of time, nothing to do."""
+
+    def clear(self):
+        """Forget every pending reservation, refilling the bucket."""
+        with self._lock:
+            fcntl.lockf(self._file, fcntl.LOCK_EX)
+            try:
+                total = self._STATE.unpack_from(self._map)[1]
+                self._STATE.pack_into(self._map, 0, 0.0, total)
+            finally:
+                fcntl.lockf(self._file, fcntl.LOCK_UN)
+
+    @property
+    def total(self):
+        """Number of tokens handed out to every process sharing the file."""
+        return self._STATE.unpack_from(self._map)[1]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __exit__(self, t, v, tb):
+        self.release()
+
+
+class _Job(object):
+
+    __slots__ = ('interval', 'function', 'repeat', 'cancelled')
+
+    def __init__(self, interval, function, repeat):
+        self.interval = interval
+        self.function = function
+        self.repeat = repeat
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler(object):
+
+    """Runs callbacks every `interval` seconds, or once, from a single
+    daemon thread started on first use, keeping the jobs in a heap ordered
+    by due time. The thread sleeps until the next job is due, and for good
+    when there is none.
+
+    schedule() returns a job whose cancel() drops it; a callback may also
+    return Scheduler.CANCEL to stop repeating. Exceptions raised by
+    callbacks are counted in `errors` and the job goes on."""
+
+    CANCEL = object()
+
+    def __init__(self, clock=_monotonic):
+        self._clock = clock
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition(threading.Lock())
+        self._thread = None
+        self.errors = 0
+
+    def schedule(self, interval, function, repeat=True):
+        job = _Job(interval, function, repeat)
+        with self._condition:
+            self._push(self._clock() + interval, job)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run,
+                                                name='PoloniexScheduler')
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+        return job
+
+    def _push(self, due, job):
+        heapq.heappush(self._heap, (due, next(self._counter), job))
+
+    def __len__(self):
+        """Number of pending jobs, cancelled ones included until due."""
+        return len(self._heap)
+
+    def _next(self):
+        """Wait for the next due job and pop it."""
+        with self._condition:
+            while True:
+                while self._heap and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                due = self._heap[0][0]
+                wait = due - self._clock()
+                if wait <= 0:
+                    return due, heapq.heappop(self._heap)[2]
+                self._condition.wait(wait)
+
+    def _run(self):
+        while True:
+            due, job = self._next()
+            try:
+                result = job.function()
+            except Exception:
+                self.errors += 1
+                result = None
+            if result is self.CANCEL or not job.repeat:
+                job.cancel()
+            if not job.cancelled:
+                with self._condition:
+                    # keep the rate, unless we fell a whole interval behind
+                    self._push(max(due + job.interval,
+                                   self._clock()), job)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def shared_scheduler():
+    """Return the Scheduler shared by every client, created on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
@@ -0,0 +1,127 @@
+import re as _re
+import sys as _sys
+import six as _six
+import decimal as _decimal
+
+from six.moves.urllib.parse import quote_plus as _quote_plus
+
+from .lazy import lazy_import as _lazy_import
+
+# calendar imports datetime, only needed for dates and datetimes
+_calendar = _lazy_import('calendar')
+
+# values sent as they are, without percent-encoding
+_SAFE = _re.compile(r'[A-Za-z0-9_.\-]*\Z')
+
+
+def _text(value):
+    return value
+
+
+def _integer(value):
+    return str(value)
+
+
+def _boolean(value):
+    return '1' if value else '0'
+
+
+def _float(value):
+    """Shortest representation that reads back as the same float, never in
+    scientific notation, which the exchange rejects."""
+    text = float.__repr__(value)         # also for subclasses like numpy's
+    if text in ('inf', '-inf', 'nan'):
+        raise ValueError('cannot send {} to Poloniex'.format(text))
+    if 'e' in text:
+        text = format(_decimal.Decimal(text), 'f')
+    return text
+
+
+def _decimal_(value):
+    if not value.is_finite():
+        raise ValueError('cannot send {!r} to Poloniex'.format(value))
+    return format(value, 'f')
+
+
+def _datetime_(value):
+    """UNIX timestamp of a datetime, naive ones being taken as UTC."""
+    return str(_calendar.timegm(value.utctimetuple()))
+
+
+def _date(value):
+    """UNIX timestamp of midnight UTC of a date."""
+    return str(_calendar.timegm(value.timetuple()))
+
+
+# exact type -> encoder, filled in with the subclasses met along the way
+_ENCODERS = {bool: _boolean, float: _float, _decimal.Decimal: _decimal_}
+for _type in _six.string_types:
+    _ENCODERS[_type] = _text
+for _type in _six.integer_types:
+    _ENCODERS[_type] = _integer
+
+# checked in order, so subclasses come before their bases
+_BASES = [bool, _decimal.Decimal, float, _six.string_types,
+          _six.integer_types]
+
+
+def _encoder(kind):
+    # a date can only be passed once datetime is loaded: it is not imported
+    # here, and its encoders are found the first time one is met
+    datetime = _sys.modules.get('datetime')
+    if datetime is not None and issubclass(kind, datetime.date):
+        return _datetime_ if issubclass(kind, datetime.datetime) else _date
+    for base in _BASES:
+        if issubclass(kind, base):
+            return _ENCODERS[base if isinstance(base, type) else base[0]]
+    if kind.__module__ == 'numpy' and hasattr(kind, 'item'):
+        return lambda value: encode(value.item())      # NumPy scalars
+    return _six.text_type
+
+
+def encode(value):
+    """Return the wire format of a parameter value: numbers in plain
+    decimal notation, booleans as 1 or 0, dates and datetimes as UTC UNIX
+    timestamps, NumPy scalars as their Python equivalent."""
+    try:
+        return _ENCODERS[type(value)](value)
+    except KeyError:
+        encoder = _ENCODERS[type(value)] = _encoder(type(value))
+        return encoder(value)
+
+
+def encode_params(params):
+    """Drop the None values of a dict and encode the others."""
+    return dict((key, encode(value))
+                for key, value in _six.iteritems(params)
+                if value is not None)
+
+
+def _quote(text):
+    return text if _SAFE.match(text) else _quote_plus(_six.ensure_str(text))
+
+
+# parameter names and commands are few, their encoding is kept
+_NAMES = {}
+_COMMANDS = {}
+
+
+def form(params, prefix=''):
+    """URL-encode a dict of encoded values after an already encoded
+    `prefix`. Safe values, such as numbers and currency pairs, are not
+    quoted at all."""
+    parts = [prefix] if prefix else []
+    for key, value in _six.iteritems(params):
+        name = _NAMES.get(key)
+        if name is None:
+            name = _NAMES[key] = _quote(key) + '='
+        parts.append(name + _quote(value))
+    return '&'.join(parts)
+
+
+def command(name):
+    """Return the encoded command parameter of a command."""
+    encoded = _COMMANDS.get(name)
+    if encoded is None:
+        encoded = _COMMANDS[name] = 'command=' + _quote(name)
+    return encoded
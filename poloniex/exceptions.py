@@ -9,5 +9,27 @@ class PoloniexCredentialsException(PoloniexException, RuntimeError):
 
 
 class PoloniexCommandException(PoloniexException, RuntimeError):
-    """Error in command execution."""
+    """Error in command execution. The HTTP answer carrying the error, if
+    any, is kept in `response` and its status in `status_code`."""
+    response = None
+    status_code = None
+
+
+class PoloniexSequenceException(PoloniexException, RuntimeError):
+    """Gap in the sequence of incremental updates that could not be resynced."""
+    pass
+
+
+class PoloniexNonceException(PoloniexCommandException):
+    """The exchange already saw a greater nonce for this key."""
+    pass
+
+
+class PoloniexCircuitOpenException(PoloniexException, RuntimeError):
+    """The command failed too often recently and is not being attempted."""
+    pass
+
+
+class PoloniexReplayException(PoloniexException, LookupError):
+    """No recorded response matches the request being replayed."""
     pass
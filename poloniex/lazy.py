@@ -0,0 +1,40 @@
+import sys as _sys
+import threading as _threading
+import importlib as _importlib
+
+
+class LazyModule(object):
+
+    """Stand-in for a module, imported on the first access to one of its
+    attributes. Its namespace is then copied over, so later accesses cost
+    no more than on the module itself."""
+
+    def __init__(self, name, package=None):
+        self.__dict__['_LazyModule__name'] = name
+        self.__dict__['_LazyModule__package'] = package
+        self.__dict__['_LazyModule__lock'] = _threading.Lock()
+
+    def _load(self):
+        with self.__lock:
+            module = _importlib.import_module(self.__name, self.__package)
+            self.__dict__.update(module.__dict__)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+        self.__dict__[attr] = value
+
+    def __repr__(self):
+        return '<lazy module {!r}>'.format(self.__name)
+
+
+def lazy_import(name, package=None):
+    """Return the module `name` (relative to `package` if it starts with a
+    dot) if it is already imported, or a LazyModule importing it on first
+    use."""
+    module = _sys.modules.get(package + name if name.startswith('.')
+                              else name)
+    return module if module is not None else LazyModule(name, package)
@@ -0,0 +1,185 @@
+import time as _time
+import bisect as _bisect
+import threading as _threading
+import collections as _collections
+
+from .concurrency import _monotonic
+
+_clock = getattr(_time, 'perf_counter', _monotonic)
+
+# stages of a call, in the order they happen
+STAGES = ('backoff', 'limiter', 'nonce_lock', 'sign', 'http', 'decode')
+
+CallSample = _collections.namedtuple(
+    'CallSample', ['command', 'stages', 'total', 'bytes', 'status',
+                   'attempts', 'error'])
+
+
+class Histogram(object):
+
+    """Log-linear histogram of durations, HDR style: every power of two
+    from `lowest` to `highest` seconds is split in `sub_buckets` equal
+    buckets, which bounds the relative error whatever the magnitude.
+    Not thread safe, Metrics serializes the updates."""
+
+    def __init__(self, lowest=1e-5, highest=100.0, sub_buckets=4):
+        self.sub_buckets = sub_buckets
+        self.bounds = []
+        bound = lowest
+        while bound < highest:
+            self.bounds.extend(bound * (1 + float(i + 1) / sub_buckets)
+                               for i in range(sub_buckets))
+            bound *= 2
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, value):
+        self.counts[_bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q):
+        """Return the upper bound of the bucket holding the q-th percentile
+        (inf for values beyond `highest`), or None if empty."""
+        if not self.count:
+            return None
+        rank, seen = q / 100.0 * self.count, 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                break
+        return self.bounds[index] if index < len(self.bounds) else float('inf')
+
+    def cumulative(self, every=1):
+        """Yield (upper bound, count of values <= bound) for every `every`
+        bounds, ending with (inf, count)."""
+        seen = 0
+        for index, bound in enumerate(self.bounds):
+            seen += self.counts[index]
+            if (index + 1) % every == 0:
+                yield bound, seen
+        yield float('inf'), self.count
+
+
+class Metrics(object):
+
+    """Timing breakdown of the calls of the clients given it as their
+    `metrics` argument.
+
+    Every call is split in STAGES: backoff between retries, waiting for the
+    rate limiter, waiting for the nonce lock, signing, the HTTP round trip
+    and JSON decoding (which includes the object_hook, hence the casting
+    done by EagerAutoCastDict; the default AutoCastDict casts lazily, when
+    values are read). Each stage and the total get a Histogram per command;
+    bytes received, status codes and retries are counted. Every CallSample
+    is also passed to the `callbacks`. Clients without metrics skip all of
+    this at the cost of one test per stage."""
+
+    def __init__(self, callbacks=(), clock=_clock, histogram=Histogram):
+        self.callbacks = list(callbacks)
+        self.clock = clock
+        self._lock = _threading.Lock()
+        self._local = _threading.local()
+        self.histograms = _collections.defaultdict(histogram)
+        self.received = _collections.Counter()
+        self.statuses = _collections.Counter()
+        self.retries = _collections.Counter()
+        self.errors = _collections.Counter()
+
+    def begin(self, command):
+        """Start sampling a call in the current thread."""
+        now = self.clock()
+        self._local.sample = {'command': command, 'started': now, 'last': now,
+                              'stages': {}, 'bytes': 0, 'status': None,
+                              'attempts': 0}
+
+    def lap(self, stage):
+        """Charge the time since the previous lap to `stage`."""
+        sample = getattr(self._local, 'sample', None)
+        if sample is not None:
+            now = self.clock()
+            stages = sample['stages']
+            stages[stage] = stages.get(stage, 0.0) + now - sample['last']
+            sample['last'] = now
+
+    def attempt(self):
+        """Count an attempt of the call, charging the pause since the
+        previous one to 'backoff'."""
+        sample = getattr(self._local, 'sample', None)
+        if sample is not None:
+            sample['attempts'] += 1
+            if sample['attempts'] > 1:
+                self.lap('backoff')
+            else:
+                sample['last'] = self.clock()
+
+    def response(self, resp, streamed=False):
+        sample = getattr(self._local, 'sample', None)
+        if sample is not None:
+            # streamed bodies are not read yet, trust their headers
+            sample['bytes'] += (
+                int(resp.headers.get('Content-Length') or 0) if streamed
+                else len(resp.content or b''))
+            sample['status'] = resp.status_code
+
+    def end(self, error=None):
+        """Finish sampling the call of the current thread and record it."""
+        sample, self._local.sample = self._local.sample, None
+        command = sample['command']
+        call = CallSample(command, sample['stages'],
+                          self.clock() - sample['started'], sample['bytes'],
+                          sample['status'], sample['attempts'],
+                          None if error is None else type(error).__name__)
+        with self._lock:
+            for stage, seconds in call.stages.items():
+                self.histograms[(command, stage)].record(seconds)
+            self.histograms[(command, 'total')].record(call.total)
+            self.received[command] += call.bytes
+            if call.status is not None:
+                self.statuses[(command, call.status)] += 1
+            if call.attempts > 1:
+                self.retries[command] += call.attempts - 1
+            if call.error is not None:
+                self.errors[(command, call.error)] += 1
+        for callback in self.callbacks:
+            callback(call)
+        return call
+
+    def summary(self, percentiles=(50, 90, 99)):
+        """Return {(command, stage): (count, mean, percentiles...)}."""
+        with self._lock:
+            return dict(
+                (key, (h.count, h.sum / h.count) +
+                 tuple(h.percentile(q) for q in percentiles))
+                for key, h in self.histograms.items() if h.count)
+
+    def prometheus(self, prefix='poloniex'):
+        """Return the metrics in the Prometheus text exposition format,
+        with histogram buckets at every power of two."""
+        lines = ['# TYPE {}_seconds histogram'.format(prefix)]
+        with self._lock:
+            for (command, stage), h in sorted(self.histograms.items()):
+                labels = 'command="{}",stage="{}"'.format(command, stage)
+                for bound, count in h.cumulative(h.sub_buckets):
+                    bound = '+Inf' if bound == float('inf') else '{:g}'.format(
+                        bound)
+                    lines.append('{}_seconds_bucket{{{},le="{}"}} {}'.format(
+                        prefix, labels, bound, count))
+                lines.append('{}_seconds_sum{{{}}} {!r}'.format(
+                    prefix, labels, h.sum))
+                lines.append('{}_seconds_count{{{}}} {}'.format(
+                    prefix, labels, h.count))
+            for name, counter, labels in (
+                    ('received_bytes', self.received, ('command',)),
+                    ('responses', self.statuses, ('command', 'status')),
+                    ('retries', self.retries, ('command',)),
+                    ('errors', self.errors, ('command', 'error'))):
+                lines.append('# TYPE {}_{}_total counter'.format(prefix, name))
+                for key, value in sorted(counter.items()):
+                    key = key if isinstance(key, tuple) else (key,)
+                    lines.append('{}_{}_total{{{}}} {}'.format(
+                        prefix, name, ','.join('{}="{}"'.format(*label)
+                                               for label in zip(labels, key)),
+                        value))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,190 @@
+import bisect as _bisect
+import itertools as _itertools
+import threading as _threading
+
+import six as _six
+
+from .exceptions import PoloniexSequenceException
+
+ASK, BID = 0, 1             # side identifiers used by the Push API
+
+_SIDES = {ASK: ASK, BID: BID, 'ask': ASK, 'asks': ASK, 'sell': ASK,
+          'bid': BID, 'bids': BID, 'buy': BID}
+
+
+class _BookSide(object):
+
+    """Price levels of one side of the book: a price -> amount map plus the
+    ascending list of its prices, so lookups are O(1) and the best level
+    and walks are found by bisection."""
+
+    def __init__(self, best_is_lowest):
+        self.levels = {}
+        self.prices = []
+        self.best_is_lowest = best_is_lowest
+
+    def set(self, price, amount):
+        if amount > 0:
+            if price not in self.levels:
+                _bisect.insort(self.prices, price)
+            self.levels[price] = amount
+        elif self.levels.pop(price, None) is not None:
+            del self.prices[_bisect.bisect_left(self.prices, price)]
+
+    def best(self):
+        if not self.prices:
+            return None
+        price = self.prices[0 if self.best_is_lowest else -1]
+        return price, self.levels[price]
+
+    def walk(self):
+        """Iterate over the (price, amount) levels from the best one."""
+        prices = self.prices if self.best_is_lowest else reversed(self.prices)
+        return ((price, self.levels[price]) for price in prices)
+
+
+class OrderBook(object):
+
+    """Local order book of a market, seeded from returnOrderBook and kept
+    current by applying the incremental updates of the Push API in sequence
+    order.
+
+    Updates arriving early are held back until the missing ones show up; if
+    more than `max_pending` are waiting the gap is considered permanent and
+    the book is reloaded through `client.returnOrderBook`."""
+
+    def __init__(self, currencyPair=None, client=None, depth='all',
+                 max_pending=16, parse=float):
+        self.currencyPair = currencyPair
+        self.client = client
+        self.depth = depth
+        self.max_pending = max_pending
+        self.parse = parse
+        self.seq = None
+        self.isFrozen = False
+        self.lock = _threading.RLock()
+        self._sides = (_BookSide(True), _BookSide(False))
+        self._pending = {}
+
+    @classmethod
+    def from_snapshot(cls, snapshot, currencyPair=None, **kwargs):
+        """Build a book from a returnOrderBook response."""
+        book = cls(currencyPair, **kwargs)
+        book.load(snapshot)
+        return book
+
+    def load(self, snapshot, seq=None):
+        """Replace the content of the book with a returnOrderBook response,
+        or with the [asks, bids] maps of a Push API initial message."""
+        with self.lock:
+            if isinstance(snapshot, (list, tuple)):
+                self._fill([_six.iteritems(side) for side in snapshot])
+            else:
+                self._fill([snapshot['asks'], snapshot['bids']])
+                self.isFrozen = bool(int(snapshot.get('isFrozen', 0)))
+                seq = snapshot.get('seq', seq)
+            self.seq = None if seq is None else int(seq)
+            self._pending = dict((pseq, deltas) for pseq, deltas
+                                 in _six.iteritems(self._pending)
+                                 if self.seq is None or pseq > self.seq)
+            self._drain()
+
+    def _fill(self, levels):
+        self._sides = (_BookSide(True), _BookSide(False))
+        for side, entries in zip(self._sides, levels):
+            for price, amount in entries:
+                side.set(self.parse(price), self.parse(amount))
+
+    def resync(self):
+        """Reload the whole book from the REST API."""
+        if self.client is None or self.currencyPair is None:
+            raise PoloniexSequenceException(
+                'gap in the updates of {} after seq {}'.format(
+                    self.currencyPair, self.seq))
+        self.load(self.client.returnOrderBook(self.currencyPair, self.depth))
+
+    def update(self, side, price, amount):
+        """Set the amount available at a price level, 0 removes the level."""
+        with self.lock:
+            self._sides[_SIDES[side]].set(self.parse(price), self.parse(amount))
+
+    def apply(self, seq, deltas):
+        """Apply the updates with sequence number `seq`. Deltas are
+        (side, price, amount) triples or Push API entries: ['o', side, price,
+        amount] updates, ['i', {...}] snapshots, anything else is ignored.
+        Return whether the book moved forward."""
+        with self.lock:
+            if self.seq is not None and seq <= self.seq:
+                return False                        # stale or duplicate
+            self._pending[seq] = deltas
+            before = self.seq
+            self._drain()
+            if len(self._pending) > self.max_pending:
+                self.resync()
+            return self.seq != before
+
+    def _drain(self):
+        pending = self._pending
+        while pending:
+            if self.seq is None:
+                seq = min(pending)
+            else:
+                seq = self.seq + 1
+                if seq not in pending:
+                    return
+            for delta in pending.pop(seq):
+                self._apply_delta(delta)
+            self.seq = seq
+
+    def _apply_delta(self, delta):
+        if len(delta) == 3:
+            self.update(*delta)
+        elif delta[0] == 'o':
+            self.update(delta[1], delta[2], delta[3])
+        elif delta[0] == 'i':
+            self._fill([_six.iteritems(side)
+                        for side in delta[1]['orderBook']])
+
+    def best_ask(self):
+        """Return the (price, amount) of the lowest ask, or None."""
+        return self._sides[ASK].best()
+
+    def best_bid(self):
+        """Return the (price, amount) of the highest bid, or None."""
+        return self._sides[BID].best()
+
+    def spread(self):
+        ask, bid = self.best_ask(), self.best_bid()
+        return None if ask is None or bid is None else ask[0] - bid[0]
+
+    def depth_at(self, side, price):
+        """Return the amount available at exactly `price` on `side`."""
+        return self._sides[_SIDES[side]].levels.get(self.parse(price), 0)
+
+    def levels(self, side, count=None):
+        """Return up to `count` (price, amount) levels of `side`, best first."""
+        walk = self._sides[_SIDES[side]].walk()
+        return list(walk if count is None else _itertools.islice(walk, count))
+
+    def vwap(self, side, size):
+        """Return the volume weighted average price of taking `size` from
+        `side` (the asks for a buy, the bids for a sell), or None when the
+        book is not deep enough."""
+        if size <= 0:
+            raise ValueError('vwap size must be > 0, got {!r}'.format(size))
+        remaining, cost = size, 0
+        with self.lock:
+            for price, amount in self._sides[_SIDES[side]].walk():
+                taken = min(amount, remaining)
+                cost += taken * price
+                remaining -= taken
+                if remaining <= 0:
+                    return cost / size
+        return None
+
+    def __len__(self):
+        return sum(len(side.prices) for side in self._sides)
+
+    def __repr__(self):
+        return '<OrderBook {} seq={} bid={} ask={}>'.format(
+            self.currencyPair, self.seq, self.best_bid(), self.best_ask())
@@ -0,0 +1,284 @@
+import threading as _threading
+import collections as _collections
+
+import six as _six
+
+from .lazy import lazy_import as _lazy_import
+from .utils import NUMERIC_PARSE as _NUMERIC_PARSE
+from .concurrency import shared_scheduler
+
+_futures = _lazy_import('concurrent.futures')
+
+Order = _collections.namedtuple(
+    'Order', ['orderNumber', 'currencyPair', 'type', 'rate', 'amount'])
+
+Reconciliation = _collections.namedtuple(
+    'Reconciliation', ['added', 'removed', 'changed'])
+
+
+def _number(value, parse):
+    """A number of a response, already cast by the client unless raw."""
+    return parse(value) if isinstance(value, _six.string_types) else value
+
+
+def _filled(trades, currencyPair, parse):
+    """Total amount of the resultingTrades of an order response, given as
+    a list, or by market as moveOrder does."""
+    if hasattr(trades, 'get'):
+        trades = trades.get(currencyPair, ())
+    return sum(_number(trade['amount'], parse) for trade in trades or ())
+
+
+class OrderManager(object):
+
+    """Local view of the open orders of a Poloniex client.
+
+    Orders placed, moved and cancelled through the manager update the view
+    from the responses; reconcile() (every `interval` seconds once started)
+    brings it in line with returnOpenOrders('all'), so orders filled or
+    changed elsewhere are picked up too. Orders are indexed by number, by
+    market and by (market, type, rate), so every lookup is O(1). Rates and
+    amounts follow the numeric mode of the client, as floats, Decimals or
+    fixed-point integers, the ones given by the caller being parsed
+    accordingly (or by `parse`). Bulk operations run on `workers` threads,
+    the client's limiter and nonce handling keeping them in order."""
+
+    def __init__(self, client, parse=None, workers=8, interval=None,
+                 scheduler=None):
+        self.client = client
+        self.parse = parse or _NUMERIC_PARSE[getattr(client, 'numeric',
+                                                     'float')]
+        self.workers = workers
+        self.interval = interval
+        self.scheduler = scheduler
+        self._lock = _threading.RLock()
+        self._orders = {}
+        self._by_pair = _collections.defaultdict(dict)
+        self._by_level = _collections.defaultdict(dict)
+        # local changes are stamped so that reconcile() never undoes one
+        # made while its snapshot was in flight
+        self._version = 0
+        self._stamps = {}
+        self._pool = None
+        self._job = None
+        self._reconciling = _threading.Lock()
+        self.last_error = None
+
+    # views
+
+    def get(self, orderNumber):
+        """Return the open order with this number, or None."""
+        return self._orders.get(int(orderNumber))
+
+    def __len__(self):
+        return len(self._orders)
+
+    def __contains__(self, orderNumber):
+        return int(orderNumber) in self._orders
+
+    def open_orders(self, currencyPair=None, type=None):
+        """Return the open orders, of a market and of a type if given."""
+        with self._lock:
+            orders = (self._orders if currencyPair is None else
+                      self._by_pair.get(currencyPair, {}))
+            return [order for order in orders.values()
+                    if type is None or order.type == type]
+
+    def at(self, currencyPair, type, rate):
+        """Return the open orders of a type at a rate of a market."""
+        with self._lock:
+            return list(self._by_level.get(
+                (currencyPair, type, self.parse(rate)), {}).values())
+
+    # index maintenance
+
+    def _stamp(self, orderNumber):
+        self._version += 1
+        self._stamps[orderNumber] = self._version
+
+    def _add(self, order):
+        self._discard(order.orderNumber)
+        self._orders[order.orderNumber] = order
+        self._by_pair[order.currencyPair][order.orderNumber] = order
+        self._by_level[(order.currencyPair, order.type, order.rate)][
+            order.orderNumber] = order
+
+    def _discard(self, orderNumber):
+        order = self._orders.pop(orderNumber, None)
+        if order is None:
+            return None
+        pair = self._by_pair[order.currencyPair]
+        del pair[orderNumber]
+        if not pair:
+            del self._by_pair[order.currencyPair]
+        level = (order.currencyPair, order.type, order.rate)
+        del self._by_level[level][orderNumber]
+        if not self._by_level[level]:
+            del self._by_level[level]
+        return order
+
+    def _placed(self, currencyPair, type, rate, amount, response):
+        # rate and amount are parsed already
+        orderNumber = int(response['orderNumber'])
+        amount -= _filled(response.get('resultingTrades'), currencyPair,
+                          self.parse)
+        order = Order(orderNumber, currencyPair, type, rate, amount)
+        with self._lock:
+            self._stamp(orderNumber)
+            if amount > 0:
+                self._add(order)
+        return order
+
+    # single orders
+
+    def place(self, currencyPair, type, rate, amount, **flags):
+        """Place a 'buy' or 'sell' limit order, accepting the flags of
+        Poloniex.buy, and return its Order with the amount left open."""
+        response = getattr(self.client, type)(currencyPair, rate, amount,
+                                              **flags)
+        return self._placed(currencyPair, type, self.parse(rate),
+                            self.parse(amount), response)
+
+    def buy(self, currencyPair, rate, amount, **flags):
+        return self.place(currencyPair, 'buy', rate, amount, **flags)
+
+    def sell(self, currencyPair, rate, amount, **flags):
+        return self.place(currencyPair, 'sell', rate, amount, **flags)
+
+    def cancel(self, orderNumber):
+        """Cancel an order and drop it from the view."""
+        orderNumber = int(orderNumber)
+        response = self.client.cancelOrder(orderNumber)
+        with self._lock:
+            self._stamp(orderNumber)
+            self._discard(orderNumber)
+        return response
+
+    def replace(self, orderNumber, rate, amount=None, **flags):
+        """Move an order to a new rate (and amount) with moveOrder, and
+        return the Order replacing it."""
+        orderNumber = int(orderNumber)
+        old = self.get(orderNumber)
+        response = self.client.moveOrder(orderNumber, rate, amount, **flags)
+        with self._lock:
+            self._stamp(orderNumber)
+            self._discard(orderNumber)
+        if old is None:                 # unknown order, reconcile() adds it
+            return None
+        return self._placed(old.currencyPair, old.type, self.parse(rate),
+                            old.amount if amount is None
+                            else self.parse(amount), response)
+
+    # bulk operations
+
+    def _map(self, fn, items):
+        """Run fn(*item) for every item concurrently, returning
+        {item: result or exception}."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = _futures.ThreadPoolExecutor(self.workers)
+        submitted = dict((self._pool.submit(fn, *item), item)
+                         for item in items)
+        results = {}
+        for future in _futures.as_completed(submitted):
+            error = future.exception()
+            results[submitted[future]] = (error if error is not None
+                                          else future.result())
+        return results
+
+    def cancel_all(self, currencyPair=None, type=None):
+        """Cancel every open order, of a market and of a type if given.
+        Return {orderNumber: response or exception}."""
+        results = self._map(self.cancel, [
+            (order.orderNumber,)
+            for order in self.open_orders(currencyPair, type)])
+        return dict((item[0], result) for item, result in results.items())
+
+    def replace_all(self, moves):
+        """Move many orders at once, `moves` being (orderNumber, rate) or
+        (orderNumber, rate, amount) tuples. Return {orderNumber: new Order
+        or exception}."""
+        results = self._map(self.replace, [tuple(move) for move in moves])
+        return dict((item[0], result) for item, result in results.items())
+
+    # reconciliation
+
+    def reconcile(self):
+        """Diff the view against returnOpenOrders('all') and apply the
+        differences, except for orders changed locally meanwhile. Return
+        the Reconciliation."""
+        with self._lock:
+            version = self._version
+        snapshot = self.client.returnOpenOrders('all')
+        remote = {}
+        for currencyPair, orders in _six.iteritems(snapshot):
+            for order in orders:
+                orderNumber = int(order['orderNumber'])
+                remote[orderNumber] = Order(
+                    orderNumber, currencyPair, order['type'],
+                    _number(order['rate'], self.parse),
+                    _number(order['amount'], self.parse))
+        added, removed, changed = [], [], []
+        with self._lock:
+            def untouched(orderNumber):
+                return self._stamps.get(orderNumber, 0) <= version
+            for orderNumber in list(self._orders):
+                if orderNumber not in remote and untouched(orderNumber):
+                    removed.append(self._discard(orderNumber))
+            for orderNumber, order in _six.iteritems(remote):
+                if not untouched(orderNumber):
+                    continue
+                local = self._orders.get(orderNumber)
+                if local is None:
+                    added.append(order)
+                elif local != order:
+                    changed.append(order)
+                else:
+                    continue
+                self._add(order)
+            # stamps older than this snapshot can no longer matter
+            self._stamps = dict((number, stamp) for number, stamp
+                                in _six.iteritems(self._stamps)
+                                if stamp > version)
+        return Reconciliation(added, removed, changed)
+
+    def start(self, interval=None):
+        """Reconcile every `interval` seconds on the worker threads, timed
+        by the `scheduler` (the shared one by default)."""
+        self.interval = interval or self.interval or 5.0
+        if self.scheduler is None:
+            self.scheduler = shared_scheduler()
+        self._job = self.scheduler.schedule(self.interval, self._tick)
+        return self
+
+    def _tick(self):
+        # never block the scheduler thread with a round trip
+        with self._lock:
+            if self._pool is None:
+                self._pool = _futures.ThreadPoolExecutor(self.workers)
+        self._pool.submit(self._reconcile)
+
+    def _reconcile(self):
+        if not self._reconciling.acquire(False):
+            return                      # the previous one is still running
+        try:
+            self.reconcile()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e         # try again at the next tick
+        finally:
+            self._reconciling.release()
+
+    def stop(self):
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -1,45 +1,73 @@
+import re as _re
 import six as _six
-import hmac as _hmac
 import time as _time
-import atexit as _atexit
-import hashlib as _hashlib
-import datetime as _datetime
-import requests as _requests
+import weakref as _weakref
 import itertools as _itertools
 import threading as _threading
 
-from .concurrency import RecurrentTimer, Semaphore
+from . import batch as _batch
+from . import stream as _stream
+from . import encoding as _encoding
+from .lazy import lazy_import as _lazy_import
+from .concurrency import (RecurrentTimer, Semaphore, Scheduler,
+                          shared_scheduler)
 from .utils import AutoCastDict as _AutoCastDict
+from .utils import NUMERIC_MODES as _NUMERIC_MODES
+from .utils import NUMERIC_PARSE as _NUMERIC_PARSE
+from .signing import Signer as _Signer
 from .exceptions import (PoloniexCredentialsException,
-                         PoloniexCommandException)
+                         PoloniexCommandException,
+                         PoloniexNonceException)
+
+# loaded on first use, a short-lived process may not need them at all
+_requests = _lazy_import('requests')
+_columnar = _lazy_import('.columnar', __package__)
 
 _PUBLIC_URL = 'https://poloniex.com/public'
 _PRIVATE_URL = 'https://poloniex.com/tradingApi'
 
+_NONCE_ERROR = _re.compile(r'[Nn]once must be greater than (\d+)')
+
+
+_FORM = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+_sanitize = _encoding.encode_params
+
 
 def _api_wrapper(fn):
     """API function decorator that performs rate limiting and error checking."""
 
-    def _convert(value):
-        if isinstance(value, _datetime.date):
-            return value.strftime('%s')
-        return value
-
-    @_six.wraps(fn)
-    def _fn(self, command, **params):
-        # sanitize the params by removing the None values
-        with self.startup_lock:
-            if self.timer.ident is None:
-                self.timer.setDaemon(True)
-                self.timer.start()
-        params = dict((key, _convert(value))
-                      for key, value in _six.iteritems(params)
-                      if value is not None)
-
-        self.semaphore.acquire()
-        resp = fn(self, command, **params)
+    private = fn.__name__ == '_private'
+
+    def _request(self, command, _object_hook, _stream, params):
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.attempt()
+        acquire_for = getattr(self.semaphore, 'acquire_for', None)
+        if acquire_for is None:
+            self.semaphore.acquire()
+        else:
+            acquire_for(command, private)
+        if metrics is not None:
+            metrics.lap('limiter')
+        if _stream is None:
+            resp = fn(self, command, **params)
+        else:
+            resp = fn(self, command, _stream=True, **params)
+        if metrics is not None:
+            metrics.lap('http')
+            metrics.response(resp, _stream is not None)
+        if _stream is not None and resp.ok:
+            # the body is decoded as the caller iterates over it
+            return _stream(resp)
         try:
-            respdata = resp.json(object_hook=_AutoCastDict)
+            if _object_hook is None:
+                respdata = resp.json(object_hook=self.object_hook,
+                                     parse_float=self.parse_float)
+            else:
+                respdata = resp.json(object_hook=_object_hook)
+            if metrics is not None:
+                metrics.lap('decode')
         except:
             # use more specific error if available or fallback to ValueError
             resp.raise_for_status()
@@ -47,40 +75,186 @@ def _api_wrapper(fn):
 
         # check for 'error' then check for status due to Poloniex inconsistency
         if 'error' in respdata:
-            raise PoloniexCommandException(respdata['error'])
+            # a stale nonce is not acted upon, the next attempt will use a
+            # fresh one
+            if private and self._skip_nonces(resp.request, respdata['error']):
+                error = PoloniexNonceException(respdata['error'])
+            else:
+                error = PoloniexCommandException(respdata['error'])
+            # throttling and outages may come as errors too
+            error.response, error.status_code = resp, resp.status_code
+            raise error
 
         resp.raise_for_status()
         return respdata
 
+    def _call(self, command, _object_hook, _stream, params):
+        if self.retry is not None:
+            return self.retry.call(command, lambda: _request(
+                self, command, _object_hook, _stream, params))
+        for attempt in _itertools.count():
+            try:
+                return _request(self, command, _object_hook, _stream, params)
+            except PoloniexNonceException:
+                if attempt >= self.nonce_retries:
+                    raise
+
+    def _dispatch(self, command, _object_hook, _stream, params):
+        # only public responses with the default decoding are ever cached
+        if (not private and self.cache is not None and _object_hook is None
+                and _stream is None and self.cache.caches(command)):
+            return self.cache.get(command, params, lambda: _call(
+                self, command, None, None, params),
+                (self.object_hook, self.parse_float))
+        return _call(self, command, _object_hook, _stream, params)
+
+    @_six.wraps(fn)
+    def _fn(self, command, _object_hook=None, _stream=None, **params):
+        if self._idle:
+            self._start()
+        # sanitize the params by removing the None values
+        params = _sanitize(params)
+        metrics = self.metrics
+        if metrics is None:
+            return _dispatch(self, command, _object_hook, _stream, params)
+        metrics.begin(command)
+        try:
+            result = _dispatch(self, command, _object_hook, _stream, params)
+        except Exception as e:
+            metrics.end(e)
+            raise
+        metrics.end()
+        return result
+
     return _fn
 
 
+def _refiller(client):
+    """Return the job refilling the semaphore of a client every second. It
+    only holds the client weakly, so dropping the client ends it too."""
+    ref = _weakref.ref(client)
+
+    def refill():
+        client = ref()
+        if client is None:
+            return Scheduler.CANCEL
+        client.semaphore.clear()
+    return refill
+
+
 class PoloniexPublic(object):
 
-    """Client to connect to Poloniex public APIs"""
+    """Client to connect to Poloniex public APIs
+
+    Calls are rate limited by `semaphore`, a Semaphore reset every second by
+    a job of `scheduler`, the Scheduler shared by all clients by default (or
+    by a running `timer` thread, started by the first call if need be and
+    only ever stopped by whoever created it), unless it refills itself (e.g.
+    a TokenBucket or a RateLimiter). The job starts with the first call and
+    ends when the client is closed, or dropped; clients are also context
+    managers. The `session`, a `session_class` (requests.Session by
+    default) unless one is given, is only created then too, so creating a
+    client costs next to nothing.
+    Slow-changing public responses may be served from a `cache`, such as a
+    TTLCache; private commands never are. Transient failures are retried
+    according to the `retry` RetryPolicy, if any. A `metrics` Metrics
+    records the timing breakdown of every call. Traffic can be recorded
+    and replayed offline through the sessions of poloniex.replay.
+    Numbers are decoded as floats, or with `numeric` set to 'decimal' or
+    'fixed', as exact Decimals or as integers scaled by 1e8 (see
+    poloniex.utils.FixedPointAutoCastDict); this replaces `object_hook`."""
 
     def __init__(self, public_url=_PUBLIC_URL, limit=6,
-                 session_class=_requests.Session,
+                 session_class=None,
                  session=None, startup_lock=None,
-                 semaphore=None, timer=None):
+                 semaphore=None, timer=None,
+                 object_hook=_AutoCastDict, cache=None, retry=None,
+                 metrics=None, numeric=None, scheduler=None):
         """Initialize Poloniex client."""
         self._public_url = public_url
+        self.numeric = numeric or 'float'
+        self.parse_float = None
+        if numeric is not None:
+            object_hook, self.parse_float = _NUMERIC_MODES[numeric]
+        self.object_hook = object_hook
+        self.cache = cache
+        self.retry = retry
+        self.metrics = metrics
         self.startup_lock = startup_lock or _threading.RLock()
         self.semaphore = semaphore or Semaphore(limit)
-        self.timer = timer or RecurrentTimer(1.0, self.semaphore.clear)
-        self.session = session or session_class()
-        _atexit.register(self.__del__)
+        self.timer = timer
+        self.scheduler = scheduler
+        self._job = None
+        self._idle = True
+        self.session_class = session_class
+        self._session = session
+
+    @property
+    def session(self):
+        """The session of the client, a `session_class` (requests.Session
+        by default) created on first use unless one was given."""
+        session = self._session
+        if session is None:
+            with self.startup_lock:
+                if self._session is None:
+                    self._session = (self.session_class or
+                                     _requests.Session)()
+                session = self._session
+        return session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    def _start(self):
+        """Start refilling the semaphore, on the first call."""
+        with self.startup_lock:
+            if not self._idle:
+                return
+            timer = self.timer
+            if timer is not None and timer.ident is None:
+                timer.daemon = True
+                timer.start()
+            elif timer is not None and timer.is_alive():
+                pass                    # refilled by a timer, maybe shared
+            elif not getattr(self.semaphore, 'self_refilling', False):
+                # a timer cannot run twice: once stopped by its owner, the
+                # client falls back to a job of the scheduler
+                if self.scheduler is None:
+                    self.scheduler = shared_scheduler()
+                self._job = self.scheduler.schedule(1.0, _refiller(self))
+            self._idle = False
+
+    def _stop(self):
+        # only the job is the client's own, a timer is left to its owner
+        job, self._job = getattr(self, '_job', None), None
+        if job is not None:
+            job.cancel()
+
+    def close(self):
+        """Stop refilling the semaphore and close the session. The client
+        starts over if it is called again."""
+        with self.startup_lock:
+            self._stop()
+            self._idle = True
+        if self._session is not None:
+            self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def __del__(self):
-        self.timer.cancel()
-        if self.timer.ident is not None:  # timer was started
-            self.timer.join()
+        self._stop()
 
     @_api_wrapper
-    def _public(self, command, **params):
+    def _public(self, command, _stream=False, **params):
         """Invoke the 'command' public API with optional params."""
-        params['command'] = command
-        response = self.session.get(self._public_url, params=params)
+        response = self.session.get(
+            self._public_url, stream=_stream,
+            params=_encoding.form(params, _encoding.command(command)))
         return response
 
     def returnTicker(self):
@@ -100,21 +274,85 @@ class PoloniexPublic(object):
         return self._public('returnOrderBook', currencyPair=currencyPair,
                             depth=depth)
 
-    def returnTradeHistory(self, currencyPair, start=None, end=None):
+    def returnTradeHistory(self, currencyPair, start=None, end=None,
+                           columnar=False, fixed_point=None):
         """Returns the past 200 trades for a given market, or up to 50,000
         trades between a range specified in UNIX timestamps by the "start"
-        and "end" GET parameters."""
-        return self._public('returnTradeHistory', currencyPair=currencyPair,
-                            start=start, end=end)
-
-    def returnChartData(self, currencyPair, period, start=0, end=2**32-1):
+        and "end" GET parameters.
+        Set "columnar" to decode the trades straight into column arrays
+        (see poloniex.columnar), with prices as 1e-8 fixed-point integers if
+        "fixed_point" is also set, as it is by default in the 'fixed'
+        numeric mode."""
+        return self._columns(columnar and _columnar.TRADE_FIELDS, fixed_point,
+                             'returnTradeHistory', currencyPair=currencyPair,
+                             start=start, end=end)
+
+    def returnChartData(self, currencyPair, period, start=0, end=2**32-1,
+                        columnar=False, fixed_point=None):
         """Returns candlestick chart data. Required GET parameters are
         "currencyPair", "period" (candlestick period in seconds; valid values
         are 300, 900, 1800, 7200, 14400, and 86400), "start", and "end".
         "Start" and "end" are given in UNIX timestamp format and used to
-        specify the date range for the data returned."""
-        return self._public('returnChartData', currencyPair=currencyPair,
-                            period=period, start=start, end=end)
+        specify the date range for the data returned.
+        "columnar" and "fixed_point" work as in returnTradeHistory."""
+        return self._columns(columnar and _columnar.CHART_FIELDS, fixed_point,
+                             'returnChartData', currencyPair=currencyPair,
+                             period=period, start=start, end=end)
+
+    def _columns(self, fields, fixed_point, command, **params):
+        """Invoke a public command returning a list of rows, decoding them
+        into columns when fields are given."""
+        if not fields:
+            return self._public(command, **params)
+        if fixed_point is None:
+            fixed_point = self.numeric == 'fixed'
+        decoder = _columnar.ColumnDecoder(fields, fixed_point)
+        self._public(command, _object_hook=decoder, **params)
+        return decoder.result()
+
+    def streamOrderBook(self, currencyPair='all', depth='50', parse=None,
+                        chunk_size=None):
+        """Like returnOrderBook, but yields a BookLevel(currencyPair, side,
+        price, amount) for each level as the response is read, `side` being
+        ASK or BID and prices and amounts parsed by `parse` (by default as
+        the numeric mode of the client does); in lists of up to
+        `chunk_size` levels if given. Use returnOrderBook for the sequence
+        numbers."""
+        levels = _stream.book_levels(
+            self._public('returnOrderBook', _stream=self._streamer(
+                3 if currencyPair == 'all' else 2),
+                currencyPair=currencyPair, depth=depth),
+            currencyPair, parse or _NUMERIC_PARSE[self.numeric])
+        return levels if chunk_size is None else _stream.chunked(
+            levels, chunk_size)
+
+    def streamTradeHistory(self, currencyPair, start=None, end=None,
+                           chunk_size=None):
+        """Like returnTradeHistory, but yields the trades one at a time as
+        the response is read, or in lists of up to `chunk_size` trades, so
+        memory stays bounded whatever the size of the answer."""
+        return self._rows(chunk_size, 'returnTradeHistory',
+                          currencyPair=currencyPair, start=start, end=end)
+
+    def streamChartData(self, currencyPair, period, start=0, end=2**32-1,
+                        chunk_size=None):
+        """Like returnChartData, but yields the candles as the response is
+        read, as streamTradeHistory does."""
+        return self._rows(chunk_size, 'returnChartData',
+                          currencyPair=currencyPair, period=period,
+                          start=start, end=end)
+
+    def _streamer(self, depth):
+        return lambda response: _stream.iter_response(
+            response, depth, self.object_hook, self.parse_float)
+
+    def _rows(self, chunk_size, command, **params):
+        """Invoke a public command returning a list of rows, streaming
+        them."""
+        rows = (row for _, row in self._public(
+            command, _stream=self._streamer(1), **params))
+        return rows if chunk_size is None else _stream.chunked(rows,
+                                                               chunk_size)
 
     def returnCurrencies(self):
         """Returns information about currencies."""
@@ -125,58 +363,136 @@ class PoloniexPublic(object):
         specified by the "currency" GET parameter."""
         return self._public('returnLoanOrders', currency=currency)
 
+    def batch(self, calls, workers=8, deadline=None, collapse=3):
+        """Run a list of (method name, kwargs) calls concurrently, yielding
+        a BatchResult for each of them as it completes (see
+        poloniex.batch.Batch)."""
+        return _batch.Batch(self, calls, workers, deadline, collapse)
+
 
 class Poloniex(PoloniexPublic):
 
     """Client to connect to Poloniex private APIs."""
 
-    class _PoloniexAuth(_requests.auth.AuthBase):
+    class _PoloniexAuth(object):
 
         """Poloniex Request Authentication."""
 
         def __init__(self, apikey, secret):
-            self._apikey, self._secret = apikey, secret
+            self.signer = _Signer(apikey, secret)
 
         def __call__(self, request):
-            signature = _hmac.new(
-                str.encode(self._secret, 'utf-8'),
-                str.encode(request.body, 'utf-8'),
-                _hashlib.sha512
-            )
-            request.headers.update({"Key": self._apikey,
-                                    "Sign": signature.hexdigest()})
+            signer = self.signer
+            request.headers['Key'] = signer.apikey
+            request.headers['Sign'] = signer.sign(request.body)
             return request
 
+    class _ApiKey(object):
+
+        """API key pair with its own nonce sequence."""
+
+        def __init__(self, apikey, secret, nonce_iter=None, nonce_lock=None):
+            self.apikey, self.secret = apikey, secret
+            self.auth = Poloniex._PoloniexAuth(apikey, secret)
+            self.signer = self.auth.signer
+            self.nonce_lock = nonce_lock or _threading.RLock()
+            self.nonce_iter = nonce_iter or _itertools.count(
+                int(_time.time() * 1000))
+
+        def skip_to(self, nonce):
+            """Restart the nonce sequence after the given nonce, unless it
+            is already past it (errors of concurrent calls may come back
+            out of order)."""
+            with self.nonce_lock:
+                self.nonce_iter = _itertools.count(
+                    max(nonce + 1, next(self.nonce_iter)))
+
     def __init__(self, apikey=None, secret=None,
                  public_url=_PUBLIC_URL,
                  private_url=_PRIVATE_URL,
-                 limit=6, session_class=_requests.Session,
+                 limit=6, session_class=None,
                  session=None, startup_lock=None,
                  semaphore=None, timer=None,
-                 nonce_iter=None, nonce_lock=None):
-        """Initialize the Poloniex private client."""
+                 nonce_iter=None, nonce_lock=None,
+                 object_hook=_AutoCastDict,
+                 keys=None, nonce_retries=3, cache=None, retry=None,
+                 metrics=None, numeric=None, scheduler=None):
+        """Initialize the Poloniex private client. Additional (apikey,
+        secret) pairs may be given as `keys`: calls rotate through all of
+        them, each key having its own nonce sequence. The calls of one key
+        reach the exchange one at a time, in nonce order, while those of
+        different keys run concurrently."""
         super(Poloniex, self).__init__(public_url, limit,
                                        session_class,
                                        session, startup_lock,
-                                       semaphore, timer)
+                                       semaphore, timer,
+                                       object_hook, cache, retry, metrics,
+                                       numeric, scheduler)
         self._private_url = private_url
-        self._apikey = apikey
-        self._secret = secret
-        self.nonce_lock = nonce_lock or _threading.RLock()
-        self.nonce_iter = nonce_iter or _itertools.count(int(_time.time() * 1000))
+        self._init_keys(apikey, secret, keys, nonce_iter, nonce_lock)
+        self.nonce_retries = nonce_retries
+
+    def _init_keys(self, apikey, secret, keys, nonce_iter, nonce_lock):
+        pairs = list(keys or ())
+        if apikey or secret or not pairs:
+            pairs.insert(0, (apikey, secret))
+        self.keys = [Poloniex._ApiKey(*pair) for pair in pairs]
+        self.keys[0].nonce_lock = nonce_lock or self.keys[0].nonce_lock
+        self.keys[0].nonce_iter = nonce_iter or self.keys[0].nonce_iter
+        self._key_cycle = _itertools.cycle(self.keys)
+
+    @property
+    def nonce_lock(self):
+        return self.keys[0].nonce_lock
+
+    @property
+    def nonce_iter(self):
+        return self.keys[0].nonce_iter
+
+    @nonce_iter.setter
+    def nonce_iter(self, nonce_iter):
+        self.keys[0].nonce_iter = nonce_iter
 
     @_api_wrapper
     def _private(self, command, **params):
-        """Invoke the 'command' public API with optional params."""
-        if not self._apikey or not self._secret:
+        """Invoke the 'command' private API with optional params."""
+        key = next(self._key_cycle)
+        if not key.apikey or not key.secret:
             raise PoloniexCredentialsException('missing apikey/secret')
 
-        with self.nonce_lock:
-            params.update({'command': command, 'nonce': next(self.nonce_iter)})
-            response = self.session.post(
-                self._private_url, data=params,
-                auth=Poloniex._PoloniexAuth(self._apikey, self._secret))
-            return response
+        # the parameters are encoded upfront; the nonce is allocated and the
+        # request sent under the lock of the key, since requests sent side
+        # by side may reach the exchange out of order. Calls signed with
+        # different keys run concurrently.
+        metrics = self.metrics
+        body = _encoding.form(params)
+        command = _encoding.command(command)
+        session = self.session
+        with key.nonce_lock:
+            if metrics is not None:
+                metrics.lap('nonce_lock')
+            body = '{}&nonce={}{}'.format(command, next(key.nonce_iter),
+                                          body and '&' + body)
+            request = session.prepare_request(_requests.Request(
+                'POST', self._private_url, data=body, headers=_FORM,
+                auth=key.auth))
+            if metrics is not None:
+                metrics.lap('sign')
+            settings = session.merge_environment_settings(
+                request.url, {}, None, None, None)
+            return session.send(request, **settings)
+
+    def _skip_nonces(self, request, error):
+        """Move the nonce sequence of the key that signed the request past
+        the nonce reported in a "nonce must be greater than" error. Return
+        whether the error was such an error."""
+        stale = _NONCE_ERROR.search(error)
+        if stale is None:
+            return False
+        for key in self.keys:
+            if key.apikey == request.headers.get('Key'):
+                key.skip_to(int(stale.group(1)))
+        return True
 
     def returnBalances(self):
         """Returns all of your available balances."""
@@ -234,11 +550,13 @@ class Poloniex(PoloniexPublic):
         return self._private('returnTradeHistory', currencyPair=currencyPair,
                              start=start, end=end, limit=limit)
 
-    def returnTradeHistoryPublic(self, currencyPair, start=None, end=None):
+    def returnTradeHistoryPublic(self, currencyPair, start=None, end=None,
+                                 columnar=False, fixed_point=None):
         """Returns the past 200 trades for a given market, or up to 50,000
         trades between a range specified in UNIX timestamps by the "start"
         and "end" GET parameters."""
-        return super(Poloniex, self).returnTradeHistory(currencyPair, start, end)
+        return super(Poloniex, self).returnTradeHistory(
+            currencyPair, start, end, columnar, fixed_point)
 
     def returnOrderTrades(self, orderNumber):
         """Returns all trades involving a given order, specified by the
@@ -0,0 +1,241 @@
+import json as _json
+import time as _time
+import logging as _logging
+import threading as _threading
+import collections as _collections
+
+from six.moves import queue as _queue
+
+try:
+    import websocket as _websocket
+except ImportError:                                   # websocket-client is optional
+    _websocket = None
+
+from .signing import Signer as _Signer
+from .orderbook import OrderBook
+from .exceptions import PoloniexSequenceException
+
+_log = _logging.getLogger(__name__)
+
+_PUSH_URL = 'wss://api2.poloniex.com'
+
+ACCOUNT, TICKER, VOLUME, HEARTBEAT = 1000, 1002, 1003, 1010
+_CHANNELS = {'account': ACCOUNT, 'ticker': TICKER, 'volume': VOLUME}
+
+Ticker = _collections.namedtuple('Ticker', [
+    'currencyPair', 'last', 'lowestAsk', 'highestBid', 'percentChange',
+    'baseVolume', 'quoteVolume', 'isFrozen', 'high24hr', 'low24hr'])
+Trade = _collections.namedtuple('Trade', [
+    'currencyPair', 'tradeID', 'type', 'rate', 'amount', 'date'])
+BookUpdate = _collections.namedtuple('BookUpdate', [
+    'currencyPair', 'seq', 'deltas'])
+AccountEvent = _collections.namedtuple('AccountEvent', ['kind', 'fields'])
+
+_STOP = object()
+
+
+class PoloniexPush(object):
+
+    """Streaming client for the Poloniex Push API.
+
+    A background thread reads the subscribed channels ('ticker', 'account',
+    or a currency pair for its book and trades) and turns every message into
+    Ticker, Trade, BookUpdate and AccountEvent tuples, handed to `callback`
+    or queued for iteration. The queue holds at most `maxsize` events: when
+    it is full the reader either blocks, pushing back on the socket, or with
+    `overflow='drop'` discards the oldest event. The local OrderBook of each
+    subscribed pair is kept current in `books`. Lost connections are reopened
+    with exponential backoff and every channel is subscribed again.
+    Errors are logged and kept in `last_error`: a failing callback or a
+    message that cannot be read only loses that event or message, the
+    connection is only reopened when it fails or a book loses its
+    sequence."""
+
+    def __init__(self, url=_PUSH_URL, apikey=None, secret=None,
+                 callback=None, maxsize=10000, overflow='block',
+                 pairs=None, reconnect_delay=1.0, max_reconnect_delay=60.0,
+                 connect=None, timeout=30):
+        if connect is None and _websocket is None:
+            raise ImportError('the push client requires websocket-client')
+        if overflow not in ('block', 'drop'):
+            raise ValueError("overflow must be 'block' or 'drop'")
+        self.url = url
+        self._apikey, self._secret = apikey, secret
+        self.callback = callback
+        self.queue = _queue.Queue(maxsize)
+        self.overflow = overflow
+        self.dropped = 0
+        self.last_error = None
+        # ticker messages only carry the numeric id of the market
+        self.pairs = dict(pairs or {})
+        self.books = {}
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.timeout = timeout
+        self._connect = connect or _websocket.create_connection
+        self._channels = []
+        self._book_channels = {}
+        self._ws = None
+        self._stopped = _threading.Event()
+        self._thread = None
+
+    @classmethod
+    def pairs_from_ticker(cls, ticker):
+        """Build the id -> currency pair map from a returnTicker response."""
+        return dict((int(data['id']), pair) for pair, data in ticker.items())
+
+    def subscribe(self, channel):
+        """Subscribe to 'ticker', 'volume', 'account' or a currency pair.
+        May be called before or after start()."""
+        channel = _CHANNELS.get(channel, channel)
+        self._channels.append(channel)
+        if self._ws is not None:
+            self._send_subscribe(self._ws, channel)
+
+    def _send_subscribe(self, ws, channel):
+        message = {'command': 'subscribe', 'channel': channel}
+        if channel == ACCOUNT:
+            payload = 'nonce={}'.format(int(_time.time() * 1000))
+            message.update(key=self._apikey, payload=payload,
+                           sign=_Signer(self._apikey, self._secret).sign(
+                               payload))
+        ws.send(_json.dumps(message))
+
+    def start(self):
+        """Start reading in a background daemon thread."""
+        self._stopped.clear()
+        self._thread = _threading.Thread(target=self._run, name='PoloniexPush')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Close the connection and end the iteration of the events."""
+        self._stopped.set()
+        ws = self._ws
+        if ws is not None:
+            ws.close()
+        if self._thread is not None:
+            self._thread.join()
+        self._put_dropping(_STOP)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, t, v, tb):
+        self.stop()
+
+    def events(self, timeout=None):
+        """Yield the queued events until stop() is called, or until no
+        event arrives for `timeout` seconds."""
+        while True:
+            try:
+                event = self.queue.get(timeout=timeout)
+            except _queue.Empty:
+                return
+            if event is _STOP:
+                return
+            yield event
+
+    __iter__ = events
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stopped.is_set():
+            try:
+                self._ws = ws = self._connect(self.url, timeout=self.timeout)
+                for channel in self._channels:
+                    self._send_subscribe(ws, channel)
+                delay = self.reconnect_delay
+                while not self._stopped.is_set():
+                    message = ws.recv()
+                    if not message:
+                        break
+                    self._handle(message)
+            except Exception as e:
+                if self._stopped.is_set():
+                    break
+                self.last_error = e
+                _log.warning('push connection to %s lost, reconnecting in '
+                             '%.3gs', self.url, delay, exc_info=True)
+            finally:
+                if self._ws is not None:
+                    self._ws.close()
+                    self._ws = None
+            self._stopped.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _handle(self, message):
+        try:
+            self._dispatch(_json.loads(message))
+        except PoloniexSequenceException:
+            raise                   # resubscribe for a fresh book snapshot
+        except Exception as e:
+            self.last_error = e
+            _log.exception('push message skipped: %.200s', message)
+
+    def _emit(self, event):
+        if self.callback is not None:
+            try:
+                self.callback(event)
+            except Exception as e:
+                self.last_error = e
+                _log.exception('push callback failed on %r', event)
+        elif self.overflow == 'drop':
+            self._put_dropping(event)
+        else:
+            # wait for room, but give up when stopped so stop() can join
+            while not self._stopped.is_set():
+                try:
+                    self.queue.put(event, timeout=0.1)
+                    return
+                except _queue.Full:
+                    pass
+
+    def _put_dropping(self, event):
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except _queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except _queue.Empty:
+                    pass
+
+    def _dispatch(self, message):
+        channel = message[0]
+        if channel == HEARTBEAT or len(message) < 3:
+            return                              # heartbeat or subscription ack
+        if channel == TICKER:
+            data = message[2]
+            last, ask, bid, change, base, quote, frozen, high, low = data[1:10]
+            self._emit(Ticker(self.pairs.get(data[0], data[0]), float(last),
+                              float(ask), float(bid), float(change),
+                              float(base), float(quote), int(frozen),
+                              float(high), float(low)))
+        elif channel == ACCOUNT:
+            for entry in message[2]:
+                self._emit(AccountEvent(entry[0], entry[1:]))
+        else:
+            self._book_message(channel, message[1], message[2])
+
+    def _book_message(self, channel, seq, deltas):
+        # a sequence gap raises in apply() and drops the connection: the
+        # new subscription starts over with a fresh snapshot
+        initial = [delta[1] for delta in deltas if delta[0] == 'i']
+        if initial:
+            pair = self._book_channels[channel] = initial[0]['currencyPair']
+            self.books[pair] = OrderBook(pair)
+            self.books[pair].load(initial[0]['orderBook'], seq)
+        pair = self._book_channels.get(channel, channel)
+        book = self.books.get(pair)
+        if book is not None and not initial:
+            book.apply(seq, deltas)
+        self._emit(BookUpdate(pair, seq, deltas))
+        for delta in deltas:
+            if delta[0] == 't':
+                self._emit(Trade(pair, int(delta[1]),
+                                 'buy' if delta[2] == 1 else 'sell',
+                                 float(delta[3]), float(delta[4]), delta[5]))
@@ -0,0 +1,291 @@
+import os as _os
+import zlib as _zlib
+import mmap as _mmap
+import time as _time
+import struct as _struct
+import hashlib as _hashlib
+import datetime as _datetime
+import threading as _threading
+
+import requests as _requests
+
+from requests.adapters import BaseAdapter as _BaseAdapter
+from requests.adapters import HTTPAdapter as _HTTPAdapter
+from requests.structures import CaseInsensitiveDict as _CaseInsensitiveDict
+from six.moves.urllib.parse import urlsplit as _urlsplit
+from six.moves.urllib.parse import parse_qsl as _parse_qsl
+from six.moves.urllib.parse import urlencode as _urlencode
+from six.moves.http_client import responses as _REASONS
+
+from .exceptions import PoloniexReplayException
+
+_MAGIC = b'PLXR'
+# magic, format version
+_HEADER = _struct.Struct('<4sH2x')
+# request key, seconds since the start of the recording, round trip,
+# status, compressed flag, request and body lengths
+_RECORD = _struct.Struct('<20sddH?xII')
+
+_COMPRESSED_ABOVE = 256
+
+# parameters that differ on every run of the same private call
+_VOLATILE = frozenset(['nonce'])
+
+
+def _text(data):
+    if data is None:
+        return ''
+    return data.decode('utf-8') if isinstance(data, bytes) else data
+
+
+def request_key(method, url, body=None):
+    """Return the canonical form of a request, and its SHA-1 under which
+    its responses are recorded: the method, the URL without its query and
+    the sorted query and form parameters, nonces excepted."""
+    parts = _urlsplit(url)
+    params = _parse_qsl(parts.query, True) + _parse_qsl(_text(body), True)
+    canonical = '{} {}://{}{}?{}'.format(
+        method, parts.scheme, parts.netloc, parts.path,
+        _urlencode(sorted(item for item in params
+                          if item[0] not in _VOLATILE)))
+    return canonical, _hashlib.sha1(canonical.encode('utf-8')).digest()
+
+
+class Entry(object):
+
+    """Location of a recorded response in the log."""
+
+    __slots__ = ('at', 'elapsed', 'status', 'compressed', 'offset', 'size')
+
+    def __init__(self, at, elapsed, status, compressed, offset, size):
+        self.at = at
+        self.elapsed = elapsed
+        self.status = status
+        self.compressed = compressed
+        self.offset = offset
+        self.size = size
+
+
+class TrafficLog(object):
+
+    """Append-only file of recorded responses: a fixed-width header per
+    record (the SHA-1 of its request_key, timing and status), followed by
+    the canonical request and the body, deflated when large. Opening it
+    indexes the records by request key, reading the headers only; bodies
+    are read from a memory map when replayed."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = _threading.Lock()
+        self._file = None
+        self._map = None
+        self._started = None
+        self.index = {}
+        self._open()
+
+    def _open(self):
+        header = _HEADER.pack(_MAGIC, 1)
+        if not _os.path.exists(self.path) or not _os.path.getsize(self.path):
+            directory = _os.path.dirname(self.path)
+            if directory and not _os.path.isdir(directory):
+                _os.makedirs(directory)
+            with open(self.path, 'wb') as f:
+                f.write(header)
+        end = _os.path.getsize(self.path)
+        with open(self.path, 'rb') as f:
+            if f.read(_HEADER.size) != header:
+                raise ValueError('{} is not a traffic log'.format(self.path))
+            whole = _HEADER.size
+            while True:
+                head = f.read(_RECORD.size)
+                if len(head) < _RECORD.size:
+                    break
+                key, at, elapsed, status, compressed, request, size = \
+                    _RECORD.unpack(head)
+                offset = whole + _RECORD.size + request
+                if offset + size > end:
+                    break                   # cut short while being written
+                self._index(key, Entry(at, elapsed, status, compressed,
+                                       offset, size))
+                whole = offset + size
+                f.seek(whole)
+        if whole < end:
+            # drop the torn record, or the next append would follow it and
+            # be lost with it when the log is opened again
+            with open(self.path, 'rb+') as f:
+                f.truncate(whole)
+
+    def _index(self, key, entry):
+        self.index.setdefault(key, []).append(entry)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.index.values())
+
+    def append(self, canonical, key, started, elapsed, status, body):
+        """Record a response received `elapsed` seconds after it was sent
+        at time `started`."""
+        request = canonical.encode('utf-8')
+        compressed = len(body) > _COMPRESSED_ABOVE
+        if compressed:
+            body = _zlib.compress(body)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'ab')
+            if self._started is None:
+                self._started = started
+            at = started - self._started
+            offset = self._file.tell() + _RECORD.size + len(request)
+            self._file.write(_RECORD.pack(key, at, elapsed, status,
+                                          compressed, len(request),
+                                          len(body)) + request + body)
+            self._file.flush()
+            self._index(key, Entry(at, elapsed, status, compressed, offset,
+                                   len(body)))
+
+    def body(self, entry):
+        """Return the body of a recorded response."""
+        with self._lock:
+            size = _os.path.getsize(self.path)
+            if self._map is None or len(self._map) != size:
+                with open(self.path, 'rb') as f:
+                    self._map = _mmap.mmap(f.fileno(), size,
+                                           access=_mmap.ACCESS_READ)
+            data = self._map[entry.offset:entry.offset + entry.size]
+        return _zlib.decompress(data) if entry.compressed else data
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _log(log):
+    return log if isinstance(log, TrafficLog) else TrafficLog(log)
+
+
+class RecordingAdapter(_BaseAdapter):
+
+    """Transport adapter sending the requests with `adapter` (a fresh
+    HTTPAdapter by default) and appending every response to a TrafficLog,
+    or to the log at this path."""
+
+    def __init__(self, log, adapter=None, clock=_time.time):
+        super(RecordingAdapter, self).__init__()
+        self.log = _log(log)
+        self.adapter = adapter or _HTTPAdapter()
+        self._clock = clock
+
+    def send(self, request, **kwargs):
+        started = self._clock()
+        response = self.adapter.send(request, **kwargs)
+        body = response.content            # streamed bodies are read here
+        canonical, key = request_key(request.method, request.url,
+                                     request.body)
+        self.log.append(canonical, key, started, self._clock() - started,
+                        response.status_code, body)
+        return response
+
+    def close(self):
+        self.adapter.close()
+        self.log.close()
+
+
+class ReplayAdapter(_BaseAdapter):
+
+    """Transport adapter answering requests from a TrafficLog, or from the
+    log at this path, without touching the network.
+
+    Responses are looked up by the SHA-1 of the request_key, so the nonce
+    of private calls does not matter; the recorded responses of a request
+    are replayed in order, over again if `loop` is set. With a `speed`
+    (1 for the original timing), responses come at the pace of the
+    recording divided by `speed`, counted from the first replayed one:
+    each is held back until the time it was received at, relative to the
+    first, and at least for its round trip. Without one, responses come
+    at once. A request never recorded raises a PoloniexReplayException."""
+
+    def __init__(self, log, speed=None, loop=True, sleep=_time.sleep,
+                 clock=_time.time):
+        super(ReplayAdapter, self).__init__()
+        self.log = _log(log)
+        self.speed = speed
+        self.loop = loop
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = _threading.Lock()
+        self._cursors = {}
+        # (time, offset in the recording) of the first replayed response
+        self._origin = None
+
+    def _next(self, key, canonical):
+        entries = self.log.index.get(key)
+        with self._lock:
+            cursor = self._cursors.get(key, 0)
+            if entries and cursor >= len(entries) and self.loop:
+                cursor = 0
+            if not entries or cursor >= len(entries):
+                raise PoloniexReplayException(
+                    'no recorded response for ' + canonical)
+            self._cursors[key] = cursor + 1
+        return entries[cursor]
+
+    def send(self, request, **kwargs):
+        canonical, key = request_key(request.method, request.url,
+                                     request.body)
+        entry = self._next(key, canonical)
+        if self.speed:
+            self._sleep(self._delay(entry))
+        response = _requests.Response()
+        response.status_code = entry.status
+        response.reason = _REASONS.get(entry.status, '')
+        response.headers = _CaseInsensitiveDict(
+            {'Content-Type': 'application/json'})
+        response._content = self.log.body(entry)
+        response._content_consumed = True
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.elapsed = _datetime.timedelta(seconds=entry.elapsed)
+        return response
+
+    def _delay(self, entry):
+        now = self._clock()
+        with self._lock:
+            if self._origin is None or entry.at < self._origin[1]:
+                self._origin = (now, entry.at)     # started, or looped over
+            started, at = self._origin
+        due = started + (entry.at - at + entry.elapsed) / self.speed
+        return max(due - now, entry.elapsed / self.speed)
+
+    def rewind(self):
+        """Replay every request from its first recorded response again."""
+        with self._lock:
+            self._cursors.clear()
+            self._origin = None
+
+    def close(self):
+        self.log.close()
+
+
+def _session(adapter, session):
+    session = session or _requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def recording_session(log, session=None, adapter=None):
+    """Return a session, the given one or a new one, recording its traffic
+    to `log`; pass it as the session of a client."""
+    return _session(RecordingAdapter(log, adapter), session)
+
+
+def replay_session(log, speed=None, loop=True, session=None):
+    """Return a session, the given one or a new one, replaying the traffic
+    recorded in `log` (see ReplayAdapter). It ignores the proxy settings
+    of the environment: nothing goes out, and looking them up would cost
+    more than the replay itself."""
+    session = _session(ReplayAdapter(log, speed, loop), session)
+    session.trust_env = False
+    return session
@@ -0,0 +1,170 @@
+import time as _time
+import random as _random
+import threading as _threading
+import collections as _collections
+
+from .lazy import lazy_import as _lazy_import
+from .concurrency import _monotonic
+from .exceptions import (PoloniexCommandException, PoloniexNonceException,
+                         PoloniexCircuitOpenException)
+
+_requests = _lazy_import('requests')
+
+# commands whose repetition could place, move or withdraw twice
+NON_IDEMPOTENT = frozenset([
+    'buy', 'sell', 'moveOrder', 'withdraw', 'transferBalance', 'marginBuy',
+    'marginSell', 'closeMarginPosition', 'createLoanOffer', 'toggleAutoRenew',
+    'generateNewAddress'])
+
+# errors meaning the exchange rejected the request without acting on it
+_REJECTED = frozenset(['nonce', 'throttled'])
+
+
+def classify(error):
+    """Return the kind of a transient error ('timeout', 'connection',
+    'server', 'throttled' or 'nonce'), or None if retrying is pointless."""
+    if isinstance(error, PoloniexNonceException):
+        return 'nonce'
+    if isinstance(error, _requests.exceptions.Timeout):
+        return 'timeout'
+    if isinstance(error, _requests.exceptions.ConnectionError):
+        return 'connection'
+    if isinstance(error, PoloniexCommandException):
+        # an {"error": ...} answer, throttled or failed as its status says
+        status = error.status_code or 0
+    elif isinstance(error, _requests.exceptions.HTTPError):
+        status = getattr(error.response, 'status_code', None) or 0
+    else:
+        return None
+    if status == 429:
+        return 'throttled'
+    if status >= 500:
+        return 'server'
+    return None
+
+
+class CircuitBreaker(object):
+
+    """Stop sending a command after `threshold` consecutive transient
+    failures; after `reset_timeout` seconds a single trial call is let
+    through and closes the circuit again if it succeeds."""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, threshold=5, reset_timeout=30.0, clock=_monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = _threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    def allow(self):
+        """Return whether a call may be attempted now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if (self.state == self.OPEN and
+                    self._clock() - self.opened_at >= self.reset_timeout):
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state, self.failures = self.CLOSED, 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state, self.opened_at = self.OPEN, self._clock()
+
+
+class RetryPolicy(object):
+
+    """Resilience policy of the clients, given as their `retry` argument.
+
+    Transient errors (see classify) are retried up to `retries` times with
+    exponential backoff and full jitter, honouring Retry-After on 429s,
+    as long as the call stays within `budget` seconds overall. Commands in
+    NON_IDEMPOTENT are only retried when the exchange certainly rejected
+    them (stale nonce, 429), unless `retry_non_idempotent` is set. Each
+    command has its own CircuitBreaker; pass `threshold=None` to disable
+    them. Counters are kept in `stats`."""
+
+    def __init__(self, retries=3, backoff=0.25, max_backoff=8.0, budget=None,
+                 retry_non_idempotent=False, threshold=5, reset_timeout=30.0,
+                 clock=_monotonic, sleep=_time.sleep):
+        self.retries = retries
+        self.backoff, self.max_backoff = backoff, max_backoff
+        self.budget = budget
+        self.retry_non_idempotent = retry_non_idempotent
+        self.threshold, self.reset_timeout = threshold, reset_timeout
+        self._clock, self._sleep = clock, sleep
+        self._lock = _threading.Lock()
+        self._breakers = {}
+        self.stats = _collections.Counter()
+
+    def breaker(self, command):
+        with self._lock:
+            if command not in self._breakers:
+                self._breakers[command] = CircuitBreaker(
+                    self.threshold, self.reset_timeout, self._clock)
+            return self._breakers[command]
+
+    def breaker_states(self):
+        """Return the state of the breaker of every command seen so far."""
+        with self._lock:
+            return dict((command, breaker.state)
+                        for command, breaker in self._breakers.items())
+
+    def delay(self, attempt, error):
+        retry_after = getattr(getattr(error, 'response', None), 'headers',
+                              None) or {}
+        retry_after = retry_after.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return _random.uniform(0, min(self.max_backoff,
+                                      self.backoff * 2 ** attempt))
+
+    def call(self, command, request):
+        """Run `request()` for the command under this policy."""
+        breaker = None if self.threshold is None else self.breaker(command)
+        if breaker is not None and not breaker.allow():
+            self._count('rejected')
+            raise PoloniexCircuitOpenException(
+                'circuit open for {}'.format(command))
+        started = self._clock()
+        for attempt in range(self.retries + 1):
+            try:
+                result = request()
+            except Exception as e:
+                kind = classify(e)
+                if kind is None:
+                    if breaker is not None:
+                        breaker.success()       # the exchange did answer
+                    raise
+                if breaker is not None and kind not in _REJECTED:
+                    breaker.failure()
+                delay = self.delay(attempt, e)
+                if (attempt == self.retries or
+                        (breaker is not None and not breaker.allow()) or
+                        (command in NON_IDEMPOTENT and kind not in _REJECTED
+                         and not self.retry_non_idempotent) or
+                        (self.budget is not None and self._clock() + delay
+                         - started > self.budget)):
+                    self._count('gave_up')
+                    raise
+                self._count('retries', 'retries_' + kind)
+                self._sleep(delay)
+            else:
+                if breaker is not None:
+                    breaker.success()
+                return result
+
+    def _count(self, *keys):
+        with self._lock:
+            for key in keys:
+                self.stats[key] += 1
@@ -0,0 +1,36 @@
+import six as _six
+
+from .lazy import lazy_import as _lazy_import
+
+# only private clients sign anything
+_hmac = _lazy_import('hmac')
+_hashlib = _lazy_import('hashlib')
+
+
+class Signer(object):
+
+    """HMAC-SHA512 signer of the request bodies of one API key.
+
+    The secret is encoded and keyed once; every signature works on a copy
+    of the keyed state, which is never modified, so a Signer can be shared
+    by any number of threads or coroutines."""
+
+    __slots__ = ('apikey', '_keyed')
+
+    def __init__(self, apikey, secret):
+        self.apikey = apikey
+        if isinstance(secret, _six.text_type):
+            secret = secret.encode('utf-8')
+        self._keyed = _hmac.new(secret or b'', digestmod=_hashlib.sha512)
+
+    def sign(self, body):
+        """Return the hex signature of a body, given as bytes or text."""
+        if isinstance(body, _six.text_type):
+            body = body.encode('utf-8')
+        mac = self._keyed.copy()
+        mac.update(body)
+        return mac.hexdigest()
+
+    def headers(self, body):
+        """Return the authentication headers of a body."""
+        return {'Key': self.apikey, 'Sign': self.sign(body)}
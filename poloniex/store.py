@@ -0,0 +1,231 @@
+import os as _os
+import mmap as _mmap
+import bisect as _bisect
+import struct as _struct
+import threading as _threading
+
+from . import columnar as _columnar
+from .backfill import backfill_trades as _backfill_trades
+
+try:
+    import numpy as _np
+except ImportError:                                   # numpy is optional
+    _np = None
+
+_MAGIC = b'PLNX'
+# magic, format version, record size, fixed point flag
+_HEADER = _struct.Struct('<4sHHI4x')
+
+
+def _disk_codes(fields, fixed_point):
+    """Every field takes 8 bytes on disk so that records stay aligned."""
+    return ['d' if code == 'd' else 'q'
+            for _, code in _columnar.dtype(fields, fixed_point)]
+
+
+class RecordFile(object):
+
+    """Append-only file of fixed-width little-endian records ordered by
+    their `date` field, read through a memory map.
+
+    range() binary searches the dates and returns a zero-copy view of the
+    mapped records: a NumPy structured array, or a memoryview of the raw
+    records when NumPy is missing. Only one process should append at a
+    time; any number may read. A partial record left at the end by an
+    interrupted append is ignored, and cut off by the next append."""
+
+    def __init__(self, path, fields, fixed_point=False):
+        self.path = path
+        self.fields = fields
+        self.fixed_point = fixed_point
+        self.names = [name for name, _ in fields]
+        codes = _disk_codes(fields, fixed_point)
+        self.record = _struct.Struct('<' + ''.join(codes))
+        self.dtype = None if _np is None else _np.dtype(
+            [(name, '<' + ('f8' if code == 'd' else 'i8'))
+             for name, code in zip(self.names, codes)])
+        self._date = self.names.index('date')
+        self._lock = _threading.Lock()
+        self._map = None
+        self._open()
+
+    def _open(self):
+        header = _HEADER.pack(_MAGIC, 1, self.record.size, self.fixed_point)
+        if not _os.path.exists(self.path) or not _os.path.getsize(self.path):
+            directory = _os.path.dirname(self.path)
+            if directory and not _os.path.isdir(directory):
+                _os.makedirs(directory)
+            with open(self.path, 'wb') as f:
+                f.write(header)
+        with open(self.path, 'rb') as f:
+            if f.read(_HEADER.size) != header:
+                raise ValueError('{} does not hold records of this format'
+                                 .format(self.path))
+
+    def _mapped(self):
+        """Return the memory map, remapping it when the file has grown.
+        Stale maps are left to the garbage collector since views handed
+        out by range() may still point into them."""
+        size = _os.path.getsize(self.path)
+        if self._map is None or len(self._map) != size:
+            with open(self.path, 'rb') as f:
+                self._map = _mmap.mmap(f.fileno(), size,
+                                       access=_mmap.ACCESS_READ)
+        return self._map
+
+    def __len__(self):
+        return (_os.path.getsize(self.path) - _HEADER.size) // self.record.size
+
+    def _date_at(self, mapped, index):
+        offset = _HEADER.size + index * self.record.size
+        return self.record.unpack_from(mapped, offset)[self._date]
+
+    def last_date(self):
+        """Return the date of the last record, or None if empty."""
+        count = len(self)
+        return self._date_at(self._mapped(), count - 1) if count else None
+
+    def _truncate_partial(self):
+        """Cut off a partial record, so appended ones stay aligned."""
+        size = _os.path.getsize(self.path)
+        partial = (size - _HEADER.size) % self.record.size
+        if partial:
+            with open(self.path, 'r+b') as f:
+                f.truncate(size - partial)
+
+    def _new_rows(self, columns, unique):
+        """Return the indexes of the rows to append: those newer than the
+        last record, and with `unique` those of the same date as the last
+        record whose `unique` field is not stored yet."""
+        last = self.last_date()
+        dates = columns['date']
+        if last is None:
+            return range(len(dates))
+        newer = _bisect.bisect_right(dates, last)
+        if unique is None:
+            return range(newer, len(dates))
+        field = self.names.index(unique)
+        stored = set(row[field] for row in self.rows(last, last + 1))
+        ids = columns[unique]
+        return [index for index in range(_bisect.bisect_left(dates, last),
+                                         newer)
+                if ids[index] not in stored] + list(range(newer, len(dates)))
+
+    def append(self, columns, unique=None):
+        """Append the rows newer than the last record. `columns` maps every
+        field to its column: a ColumnDecoder result or a structured array.
+        Rows dated like the last record are appended too when their
+        `unique` field, if given, is not stored yet, so that records
+        sharing a date may be appended in several goes.
+        Return the number of records written."""
+        with self._lock:
+            self._truncate_partial()
+            rows = self._new_rows(columns, unique)
+            count = len(rows)
+            if count <= 0:
+                return 0
+            if self.dtype is not None:
+                records = _np.empty(count, self.dtype)
+                for name in self.names:
+                    records[name] = _np.asarray(columns[name])[list(rows)]
+                data = records.tobytes()
+            else:
+                data = b''.join(self.record.pack(*[columns[name][index]
+                                                   for name in self.names])
+                                for index in rows)
+            with open(self.path, 'ab') as f:
+                f.write(data)
+            return count
+
+    def _bisect(self, mapped, date, count):
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._date_at(mapped, mid) < date:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def range(self, start=0, end=2**63 - 1):
+        """Return the records with start <= date < end without copying."""
+        mapped, count = self._mapped(), len(self)
+        if self.dtype is not None:
+            records = _np.frombuffer(mapped, self.dtype, count, _HEADER.size)
+            dates = records['date']
+            return records[dates.searchsorted(start):dates.searchsorted(end)]
+        first = self._bisect(mapped, start, count)
+        last = self._bisect(mapped, end, count)
+        return memoryview(mapped)[_HEADER.size + first * self.record.size:
+                                  _HEADER.size + last * self.record.size]
+
+    def rows(self, start=0, end=2**63 - 1):
+        """Iterate over the records with start <= date < end as tuples."""
+        data = self.range(start, end)
+        if self.dtype is not None:
+            data = memoryview(data.tobytes())
+        for offset in range(0, len(data), self.record.size):
+            yield self.record.unpack_from(data, offset)
+
+
+class MarketStore(object):
+
+    """Local store of candles and trades, one RecordFile per pair and
+    period under `root`. sync() and sync_trades() only fetch what is newer
+    than the last stored record, so loading stored history never touches
+    the network."""
+
+    def __init__(self, root, fixed_point=False):
+        self.root = root
+        self.fixed_point = fixed_point
+        self._files = {}
+        self._lock = _threading.Lock()
+
+    def _file(self, name, fields):
+        with self._lock:
+            if name not in self._files:
+                self._files[name] = RecordFile(_os.path.join(self.root, name),
+                                               fields, self.fixed_point)
+            return self._files[name]
+
+    def candles(self, currencyPair, period):
+        return self._file('{}.{}.candles'.format(currencyPair, period),
+                          _columnar.CHART_FIELDS)
+
+    def trades(self, currencyPair):
+        return self._file('{}.trades'.format(currencyPair),
+                          _columnar.TRADE_FIELDS)
+
+    def sync(self, client, currencyPair, period, start=0, end=2**32-1):
+        """Fetch and store the candles after the last stored one.
+        Return the number of new candles."""
+        store = self.candles(currencyPair, period)
+        last = store.last_date()
+        if last is not None:
+            start = max(start, last + period)
+        columns = client.returnChartData(currencyPair, period, start, end,
+                                         columnar=True,
+                                         fixed_point=self.fixed_point)
+        if not len(columns['date']) or columns['date'][0] == 0:
+            return 0                        # no candle in the range
+        return store.append(columns)
+
+    def sync_trades(self, client, currencyPair, start, end, **kwargs):
+        """Backfill and store the public trades after the last stored one,
+        starting at `start` on the first sync. Return the number of new
+        trades."""
+        store = self.trades(currencyPair)
+        last = store.last_date()
+        if last is not None:
+            # the last second may have had more trades since
+            start = max(start, last)
+        decoder = _columnar.ColumnDecoder(_columnar.TRADE_FIELDS,
+                                          self.fixed_point)
+        for trade in _backfill_trades(client, currencyPair, start, end,
+                                      **kwargs):
+            decoder(trade)
+        return store.append(decoder.result(), unique='globalTradeID')
+
+    def load(self, currencyPair, period, start=0, end=2**63 - 1):
+        """Return the stored candles with start <= date < end."""
+        return self.candles(currencyPair, period).range(start, end)
@@ -0,0 +1,154 @@
+import re as _re
+import json as _json
+import codecs as _codecs
+import itertools as _itertools
+import collections as _collections
+
+from .orderbook import ASK, BID
+from .exceptions import PoloniexCommandException
+
+_SPACE = _re.compile(r'[ \t\n\r]*')
+
+# bytes read from the response at a time
+CHUNK_SIZE = 64 * 1024
+
+BookLevel = _collections.namedtuple(
+    'BookLevel', ['currencyPair', 'side', 'price', 'amount'])
+
+_SIDES = {'asks': ASK, 'bids': BID}
+
+
+class _Reader(object):
+
+    """Text buffer over an iterable of byte chunks, dropping what has been
+    consumed so that only the value being decoded is held in memory."""
+
+    def __init__(self, chunks, decoder):
+        self._chunks = iter(chunks)
+        self._utf8 = _codecs.getincrementaldecoder('utf-8')()
+        self._decoder = decoder
+        self.buffer, self.pos, self.eof = '', 0, False
+
+    def _more(self, wanted):
+        """Read until `wanted` characters are pending. Return False at EOF."""
+        if self.eof:
+            return False
+        pending = [self.buffer[self.pos:]]
+        size = len(pending[0])
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk)
+            pending.append(text)
+            size += len(text)
+            if size >= wanted:
+                break
+        else:
+            self.eof = True
+            pending.append(self._utf8.decode(b'', True))
+        self.buffer, self.pos = ''.join(pending), 0
+        return True
+
+    def peek(self):
+        """Return the next non-blank character, or '' at the end."""
+        while True:
+            self.pos = _SPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._more(1):
+                return ''
+
+    def expect(self, characters):
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError('expected {!r} at offset {} of the buffer, got '
+                             '{!r}'.format(characters, self.pos, character))
+        self.pos += 1
+        return character
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if not self._more(2 * (len(self.buffer) - self.pos) + 1):
+                    raise
+                continue
+            # a number may go on in the next chunk
+            if end < len(self.buffer) or not self._more(
+                    len(self.buffer) - self.pos + 1):
+                self.pos = end
+                return value
+
+
+def _walk(reader, depth, path):
+    if depth == 0 or reader.peek() not in ('[', '{'):
+        yield path, reader.value()
+        return
+    closing = ']' if reader.expect('[{') == '[' else '}'
+    if reader.peek() == closing:
+        reader.expect(closing)
+        return
+    for index in _itertools.count():
+        key = index
+        if closing == '}':
+            key = reader.value()
+            reader.expect(':')
+        for item in _walk(reader, depth - 1, path + (key,)):
+            yield item
+        if reader.expect(',' + closing) == closing:
+            return
+
+
+def iter_values(chunks, depth=1, object_hook=None, parse_float=None):
+    """Incrementally decode a JSON document read as byte chunks, yielding
+    (path, value) for every value `depth` arrays or objects deep, the path
+    being the keys and indexes leading to it; scalars found higher up are
+    yielded as well. Only one such value is held in memory at a time.
+
+    An {"error": ...} answer raises a PoloniexCommandException."""
+    decoder = _json.JSONDecoder(object_hook=object_hook,
+                                parse_float=parse_float)
+    for path, value in _walk(_Reader(chunks, decoder), depth, ()):
+        if path == ('error',):
+            raise PoloniexCommandException(value)
+        yield path, value
+
+
+def iter_response(response, depth=1, object_hook=None, parse_float=None,
+                  chunk_size=CHUNK_SIZE):
+    """iter_values over the body of a streamed requests response, closing
+    it once done."""
+    try:
+        for item in iter_values(response.iter_content(chunk_size), depth,
+                                object_hook, parse_float):
+            yield item
+    finally:
+        response.close()
+
+
+def book_levels(items, currencyPair, parse=float):
+    """Turn the (path, value) items of a streamed order book into
+    BookLevel, `currencyPair` being 'all' for the books of every market."""
+    for path, value in items:
+        if currencyPair == 'all':
+            if len(path) != 3:
+                continue
+            pair, side, _ = path
+        elif len(path) == 2:
+            pair, (side, _) = currencyPair, path
+        else:
+            continue
+        if side in _SIDES:
+            yield BookLevel(pair, _SIDES[side], parse(value[0]),
+                            parse(value[1]))
+
+
+def chunked(iterable, size):
+    """Group the items of an iterable in lists of up to `size` items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(_itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
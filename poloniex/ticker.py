@@ -0,0 +1,267 @@
+import time as _time
+import threading as _threading
+import collections as _collections
+
+import six as _six
+
+from .lazy import lazy_import as _lazy_import
+from .concurrency import shared_scheduler
+
+_futures = _lazy_import('concurrent.futures')
+
+Change = _collections.namedtuple(
+    'Change', ['currencyPair', 'kind', 'fields', 'row'])
+
+ADDED, CHANGED, REMOVED = 'added', 'changed', 'removed'
+
+# field of the rows made of a single value, like the totals of return24hVolume
+VALUE = 'value'
+_VALUE_FIELDS = (VALUE,)
+
+
+class Snapshot(object):
+
+    """Raw values of a polled response of returnTicker or return24hVolume,
+    kept as parallel arrays: the markets in `pairs`, the field names and
+    raw values of their row in `fields` and `rows`, and `index` mapping
+    each market to its row. Rows with the same field names share one tuple
+    of them."""
+
+    __slots__ = ('time', 'pairs', 'index', 'fields', 'rows')
+
+    def __init__(self, data, time=None):
+        self.time = time
+        pairs, fields, rows, shared = [], [], [], {}
+        for pair, row in _six.iteritems(data):
+            if isinstance(row, dict):
+                names = tuple(row)
+                names = shared.setdefault(names, names)
+                values = tuple(row.values())
+            else:
+                names, values = _VALUE_FIELDS, (row,)
+            pairs.append(pair)
+            fields.append(names)
+            rows.append(values)
+        self.pairs = tuple(pairs)
+        self.index = dict((pair, i) for i, pair in enumerate(pairs))
+        self.fields = fields
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def __contains__(self, currencyPair):
+        return currencyPair in self.index
+
+    def raw(self, currencyPair):
+        """Return the raw values of a market as a dict."""
+        i = self.index[currencyPair]
+        return dict(zip(self.fields[i], self.rows[i]))
+
+
+def _changed_fields(old_fields, old, new_fields, new):
+    """Return the names of the fields that differ between two rows."""
+    if old_fields is new_fields or old_fields == new_fields:
+        return [name for name, a, b in zip(new_fields, old, new) if a != b]
+    before, after = dict(zip(old_fields, old)), dict(zip(new_fields, new))
+    return [name for name in set(before) | set(after)
+            if before.get(name) != after.get(name)]
+
+
+def diff(previous, current, cast=None):
+    """Compare two Snapshots and return a Change for every market added,
+    changed or removed; unchanged markets cost a comparison of their raw
+    values. Only the values of the changed markets are cast, by calling
+    `cast` (e.g. the object_hook of a client) on their raw dict.
+
+    `fields` maps the name of each changed field to its (old, new) value,
+    None standing for a missing one, and `row` is the new market, None
+    once removed."""
+    cast = cast or dict
+    changes = []
+
+    def change(pair, kind, names, old, new):
+        old_row = cast(old) if old is not None else {}
+        new_row = cast(new) if new is not None else None
+        changes.append(Change(pair, kind, dict(
+            (name, (old_row.get(name), (new_row or {}).get(name)))
+            for name in names), new_row))
+
+    if previous.pairs == current.pairs:
+        # the common case, the same markets in the same order
+        for i, (old, new) in enumerate(zip(previous.rows, current.rows)):
+            if old != new or previous.fields[i] != current.fields[i]:
+                names = _changed_fields(previous.fields[i], old,
+                                        current.fields[i], new)
+                pair = current.pairs[i]
+                change(pair, CHANGED, names, previous.raw(pair),
+                       current.raw(pair))
+        return changes
+    for i, pair in enumerate(current.pairs):
+        j = previous.index.get(pair)
+        if j is None:
+            change(pair, ADDED, current.fields[i], None, current.raw(pair))
+        elif (previous.rows[j] != current.rows[i]
+                or previous.fields[j] != current.fields[i]):
+            names = _changed_fields(previous.fields[j], previous.rows[j],
+                                    current.fields[i], current.rows[i])
+            change(pair, CHANGED, names, previous.raw(pair),
+                   current.raw(pair))
+    for j, pair in enumerate(previous.pairs):
+        if pair not in current.index:
+            change(pair, REMOVED, previous.fields[j], previous.raw(pair),
+                   None)
+    return changes
+
+
+class AdaptiveInterval(object):
+
+    """Polling interval following how fast the data changes: it aims at
+    `target` changed markets per poll from a moving average of the rate of
+    changes, within [minimum, maximum]. It grows at most `growth` times
+    per poll, so a quiet spell is not mistaken for a quiet market."""
+
+    def __init__(self, minimum=1.0, maximum=60.0, target=5, smoothing=0.3,
+                 growth=2.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target = target
+        self.smoothing = smoothing
+        self.growth = growth
+        self.interval = minimum
+        self.rate = None
+
+    def update(self, changes, elapsed):
+        """Account for `changes` changed markets over `elapsed` seconds and
+        return the next interval."""
+        if elapsed <= 0:
+            return self.interval
+        rate = changes / float(elapsed)
+        if self.rate is None:
+            self.rate = rate
+        else:
+            self.rate += self.smoothing * (rate - self.rate)
+        interval = (self.target / self.rate if self.rate > 0
+                    else self.maximum)
+        interval = min(interval, self.interval * self.growth)
+        self.interval = max(self.minimum, min(self.maximum, interval))
+        return self.interval
+
+
+class TickerFeed(object):
+
+    """Change feed of a polled public command, returnTicker by default or
+    return24hVolume.
+
+    Each poll decodes the response without casting anything and keeps it
+    as a Snapshot, diffed against the previous one; only the Changes of
+    the markets that moved come out, cast by the object_hook of the client
+    (or by `cast`). The first poll only sets the baseline, unless
+    `initial` is set, in which case every market comes out as added.
+    Iterating over the feed polls at the pace of `interval`, an
+    AdaptiveInterval by default, and yields the changes; start() instead
+    calls `callback` with the list of changes of every poll, timed by the
+    `scheduler` (the shared one by default)."""
+
+    def __init__(self, client, command='returnTicker', interval=None,
+                 cast=None, initial=False, scheduler=None, clock=_time.time,
+                 sleep=_time.sleep):
+        self.client = client
+        self.command = command
+        self.interval = interval or AdaptiveInterval()
+        self.cast = cast or client.object_hook
+        self.initial = initial
+        self.scheduler = scheduler
+        self.snapshot = None
+        self.polls = 0
+        self.changes = 0
+        self.last_error = None
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = _threading.Lock()
+        self._pool = None
+        self._job = None
+        self._callback = None
+
+    def poll(self):
+        """Fetch the command once and return the list of Changes since the
+        previous poll."""
+        data = self.client._public(self.command, _object_hook=dict)
+        with self._lock:
+            now = self._clock()
+            current = Snapshot(data, now)
+            previous, self.snapshot = self.snapshot, current
+            self.polls += 1
+            if previous is None:
+                if not self.initial:
+                    return []
+                previous = Snapshot({}, now)
+            changes = diff(previous, current, self.cast)
+            self.changes += len(changes)
+            if previous.time is not None and previous.pairs:
+                self.interval.update(len(changes), now - previous.time)
+            return changes
+
+    def __iter__(self):
+        while True:
+            started = self._clock()
+            for change in self.poll():
+                yield change
+            wait = self.interval.interval - (self._clock() - started)
+            if wait > 0:
+                self._sleep(wait)
+
+    def stats(self):
+        """Return the polls made, the changes found and the current
+        interval."""
+        return {'polls': self.polls, 'changes': self.changes,
+                'changes_per_poll': (float(self.changes) / self.polls
+                                     if self.polls else None),
+                'interval': self.interval.interval}
+
+    def start(self, callback):
+        """Poll in the background, passing the changes of every poll to
+        callback(changes)."""
+        self._callback = callback
+        if self.scheduler is None:
+            self.scheduler = shared_scheduler()
+        if self._pool is None:
+            self._pool = _futures.ThreadPoolExecutor(1)
+        self._schedule(0)
+        return self
+
+    def _schedule(self, delay):
+        self._job = self.scheduler.schedule(delay, self._tick, repeat=False)
+
+    def _tick(self):
+        # never block the scheduler thread with a round trip
+        pool = self._pool
+        if pool is not None:
+            pool.submit(self._run)
+
+    def _run(self):
+        started = self._clock()
+        try:
+            changes = self.poll()
+            self.last_error = None
+        except Exception as e:
+            changes, self.last_error = None, e  # try again at the next tick
+        if changes:
+            self._callback(changes)
+        if self._job is not None:
+            self._schedule(max(0, self.interval.interval
+                               - (self._clock() - started)))
+
+    def stop(self):
+        job, self._job = self._job, None
+        if job is not None:
+            job.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
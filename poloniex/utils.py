@@ -1,25 +1,72 @@
-import ast as _ast
+import re as _re
 import six as _six
+import decimal as _decimal
+
+from .lazy import lazy_import as _lazy_import
 
 try:
     import collections.abc as _collections_abc       # only works on python 3.3+
 except ImportError:
     import collections as _collections_abc
 
+# only needed for values that are not plain numbers
+_ast = _lazy_import('ast')
+
+
+# plain decimal literals that can be cast without going through the Python
+# parser; leading zeros are excluded on integers since literal_eval rejects them
+_INT_RE = _re.compile(r'-?(?:0|[1-9][0-9]*)\Z')
+_FLOAT_RE = _re.compile(r'-?(?:[0-9]+\.[0-9]*|\.[0-9]+|[0-9]+(?=[eE]))'
+                        r'(?:[eE][-+]?[0-9]+)?\Z')
+
+
+def autocast(value, parse_float=float, parse_int=int):
+    """Cast a raw value the same way ast.literal_eval would, taking a fast
+    path for plain integer and decimal strings."""
+    if not isinstance(value, _six.string_types):
+        return value
+    if _INT_RE.match(value):
+        return parse_int(value)
+    if _FLOAT_RE.match(value):
+        return parse_float(value)
+    try:
+        return _ast.literal_eval(value)
+    except (ValueError, SyntaxError, TypeError):
+        return value
+
 
 class AutoCastDict(_collections_abc.Mapping):
 
-    """Dictionary that automatically cast strings."""
+    """Dictionary that automatically cast strings.
+
+    Values are cast on first access and cached, so every field is parsed
+    at most once. Subclasses may set `_eager` to cast everything upfront."""
+
+    __slots__ = ('__dict', '__cache')
+
+    _cast = staticmethod(autocast)
+    _eager = False
 
     def __init__(self, *args, **kwargs):
-        self.__dict = dict(*args, **kwargs)
+        if self._eager:
+            # the raw values are not needed anymore, keep a single dict
+            self.__dict = self.__cache = self._cast_items(
+                _six.iteritems(dict(*args, **kwargs)))
+        else:
+            self.__dict = dict(*args, **kwargs)
+            self.__cache = {}
+
+    @classmethod
+    def _cast_items(cls, items):
+        cast = cls._cast
+        return dict((key, cast(value)) for key, value in items)
 
     def __getitem__(self, key):
-        value = self.__dict[key]
-        try:
-            return _ast.literal_eval(value)
-        except (ValueError, SyntaxError, TypeError):
-            return value
+        cache = self.__cache
+        if key in cache:
+            return cache[key]
+        value = cache[key] = self._cast(self.__dict[key])
+        return value
 
     def __str__(self):
         items = ('{!r}: {!r}'.format(*it) for it in _six.iteritems(self))
@@ -32,3 +79,114 @@ class AutoCastDict(_collections_abc.Mapping):
 
     def __len__(self):
         return len(self.__dict)
+
+    def __contains__(self, key):
+        return key in self.__dict
+
+
+class EagerAutoCastDict(AutoCastDict):
+
+    """AutoCastDict that casts all of its values when it is built."""
+
+    __slots__ = ()
+
+    _eager = True
+
+
+# number of fractional digits used by the exchange for rates and amounts
+FIXED_POINT_DIGITS = 8
+FIXED_POINT_SCALE = 10 ** FIXED_POINT_DIGITS
+
+
+def to_fixed(value):
+    """Convert a decimal string or number into an integer scaled by
+    FIXED_POINT_SCALE, without going through binary floating point.
+    Digits past the eighth decimal place are truncated."""
+    if isinstance(value, float):
+        value = repr(value)
+    elif isinstance(value, _decimal.Decimal):
+        scaled = value.scaleb(FIXED_POINT_DIGITS)
+        return int(scaled.to_integral_value(_decimal.ROUND_DOWN))
+    elif not isinstance(value, _six.string_types):
+        return int(value) * FIXED_POINT_SCALE
+    if 'e' in value or 'E' in value:
+        scaled = _decimal.Decimal(value).scaleb(FIXED_POINT_DIGITS)
+        return int(scaled.to_integral_value(_decimal.ROUND_DOWN))
+    whole, _, frac = value.partition('.')
+    negative = whole.startswith('-')
+    frac = (frac + '0' * FIXED_POINT_DIGITS)[:FIXED_POINT_DIGITS]
+    fixed = int(whole.lstrip('+-') or '0') * FIXED_POINT_SCALE + int(frac)
+    return -fixed if negative else fixed
+
+
+def _nested(cast):
+    """Extend a cast to the items of lists, such as order book levels."""
+    def nested(value):
+        if isinstance(value, list):
+            return [nested(item) for item in value]
+        return cast(value)
+    return nested
+
+
+class DecimalAutoCastDict(EagerAutoCastDict):
+
+    """EagerAutoCastDict reading decimal strings as exact Decimals, in
+    lists as well."""
+
+    __slots__ = ()
+
+    _cast = staticmethod(_nested(
+        lambda value: autocast(value, parse_float=_decimal.Decimal)))
+
+
+# fields holding ids, sequence numbers, timestamps, flags or counts rather
+# than rates and amounts, never scaled in the fixed-point mode
+UNSCALED_FIELDS = frozenset([
+    'id', 'globalTradeID', 'tradeID', 'orderNumber', 'clientOrderId',
+    'depositNumber', 'withdrawalNumber', 'txid', 'address', 'paymentID',
+    'seq', 'date', 'timestamp', 'confirmations', 'isFrozen', 'postOnly',
+    'margin', 'success', 'minConf', 'disabled', 'delisted', 'frozen',
+    'duration', 'rangeMin', 'rangeMax', 'autoRenew'])
+
+# rates standing for "none" as -1, a sentinel kept as it is
+SENTINEL_FIELDS = frozenset(['liquidationPrice'])
+
+
+def _scaled(value):
+    if isinstance(value, _six.string_types):
+        return autocast(value, parse_float=to_fixed, parse_int=to_fixed)
+    if isinstance(value, bool) or not isinstance(
+            value, _six.integer_types + (float, _decimal.Decimal)):
+        return value
+    return to_fixed(value)
+
+
+class FixedPointAutoCastDict(EagerAutoCastDict):
+
+    """EagerAutoCastDict reading every number, string or not and in lists
+    as well, as an integer scaled by FIXED_POINT_SCALE (see to_fixed), so
+    that all rates and amounts share one unit. The fields of
+    UNSCALED_FIELDS, such as ids, counts and timestamps, are cast as they
+    are, and so is the -1 of the fields of SENTINEL_FIELDS."""
+
+    __slots__ = ()
+
+    _cast = staticmethod(_nested(_scaled))
+
+    @classmethod
+    def _cast_items(cls, items):
+        cast = cls._cast
+        return dict((key, autocast(value) if key in UNSCALED_FIELDS
+                     or key in SENTINEL_FIELDS and autocast(value) == -1
+                     else cast(value)) for key, value in items)
+
+
+# numeric mode -> (object_hook, parse_float for the JSON numbers); in the
+# fixed-point mode, JSON numbers are read exactly and scaled by the hook
+NUMERIC_MODES = {'float': (AutoCastDict, None),
+                 'decimal': (DecimalAutoCastDict, _decimal.Decimal),
+                 'fixed': (FixedPointAutoCastDict, _decimal.Decimal)}
+
+# numeric mode -> parse of a single rate or amount
+NUMERIC_PARSE = {'float': float, 'decimal': _decimal.Decimal,
+                 'fixed': to_fixed}
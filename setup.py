@@ -20,7 +20,8 @@ setup(name='poloniex',
       license='MIT',
       packages=['poloniex'],
       setup_requires=[pytest_runner],
-      install_requires=['requests', 'six'],
+      install_requires=['requests', 'six', 'futures; python_version < "3"'],
+      extras_require={'async': ['aiohttp'], 'push': ['websocket-client']},
       tests_require=['pytest', 'responses'],
       keywords='poloniex cryptocurrency cryptocurrencies api client bitcoin'
       )
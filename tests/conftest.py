@@ -0,0 +1,20 @@
+import pytest
+
+
+class FakeClock(object):
+
+    """Clock standing still until moved, by setting `now` or sleeping."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import hmac
+import random
+import pytest
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from poloniex.aio import AsyncPoloniex, AsyncPoloniexPublic, AsyncTokenBucket
+from poloniex.exceptions import PoloniexCommandException
+
+TICKER = {'BTC_LTC': {'last': '0.0251', 'quoteVolume': '245.82513926'}}
+
+
+class StubExchange(object):
+
+    def __init__(self):
+        self.in_flight = self.max_in_flight = 0
+        self.last_nonce = 0
+        self.jitter = 0                 # of the private calls, in seconds
+        self.app = web.Application()
+        self.app.router.add_get('/public', self.public)
+        self.app.router.add_post('/tradingApi', self.private)
+
+    async def public(self, request):
+        command = request.query['command']
+        if command == 'returnTicker':
+            return web.json_response(TICKER)
+        if command == 'returnOrderBook':
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.05)
+            self.in_flight -= 1
+            return web.json_response({'asks': [['0.0252', 1]], 'bids': [],
+                                      'isFrozen': '0', 'seq': 7})
+        return web.json_response({'error': 'Invalid command.'})
+
+    async def private(self, request):
+        body = await request.read()
+        sign = hmac.new(b'secret', body, hashlib.sha512).hexdigest()
+        assert request.headers['Key'] == 'key' and request.headers['Sign'] == sign
+        form = await request.post()
+        if self.jitter:
+            await asyncio.sleep(random.random() * self.jitter)
+        nonce = int(form['nonce'])
+        if nonce <= self.last_nonce:
+            return web.json_response({'error': 'Nonce must be greater than {}.'
+                                      ' You provided {}.'.format(self.last_nonce, nonce)})
+        self.last_nonce = nonce
+        return web.json_response({'BTC': '0.59098578', 'LTC': '3.31117268'})
+
+
+def run(coroutine_function):
+    async def main():
+        exchange = StubExchange()
+        async with TestServer(exchange.app) as server:
+            await coroutine_function(exchange, str(server.make_url('')))
+    asyncio.run(main())
+
+
+def test_async_public_concurrent_requests():
+    async def scenario(exchange, url):
+        async with AsyncPoloniexPublic(url + '/public', limit=1000) as polo:
+            ticker = await polo.returnTicker()
+            books = await asyncio.gather(*[polo.returnOrderBook('BTC_LTC')
+                                           for _ in range(20)])
+            with pytest.raises(PoloniexCommandException):
+                await polo._public('bogus')
+        assert ticker['BTC_LTC']['last'] == 0.0251
+        assert all(book['seq'] == 7 for book in books)
+        assert exchange.max_in_flight > 1
+    run(scenario)
+
+
+def test_async_private_retries_stale_nonce():
+    async def scenario(exchange, url):
+        exchange.last_nonce = 10**15
+        async with AsyncPoloniex('key', 'secret', url + '/public',
+                                 url + '/tradingApi', limit=1000,
+                                 nonce_iter=iter(range(1, 10**6))) as polo:
+            balances = await polo.returnBalances()
+        assert balances['BTC'] == 0.59098578
+        assert exchange.last_nonce == 10**15 + 1
+    run(scenario)
+
+
+def test_async_private_calls_of_a_key_keep_nonce_order():
+    async def scenario(exchange, url):
+        exchange.jitter = 0.005
+        async with AsyncPoloniex('key', 'secret', url + '/public',
+                                 url + '/tradingApi', limit=1000,
+                                 nonce_retries=0) as polo:
+            balances = await asyncio.gather(*[polo.returnBalances()
+                                              for _ in range(20)])
+        assert [b['BTC'] for b in balances] == [0.59098578] * 20
+    run(scenario)
+
+
+def test_async_token_bucket_delays_over_budget():
+    async def scenario():
+        bucket = AsyncTokenBucket(limit=100, capacity=1)
+        for _ in range(3):
+            await bucket.acquire()
+        return bucket.stats
+    stats = asyncio.run(scenario())
+    assert stats.acquired == 3 and stats.delayed >= 1
+
+
+def test_async_clients_reject_sync_only_methods():
+    polo = AsyncPoloniexPublic()
+    for call in (lambda: polo.streamOrderBook('BTC_LTC'),
+                 lambda: polo.streamTradeHistory('BTC_LTC'),
+                 lambda: polo.streamChartData('BTC_LTC', 300),
+                 lambda: polo.batch([('returnTicker', {})])):
+        with pytest.raises(TypeError, match='asyncio'):
+            call()
+    with pytest.raises(TypeError, match='async with'):
+        with polo:
+            pass
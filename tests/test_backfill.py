@@ -0,0 +1,57 @@
+from poloniex.backfill import Backfill, backfill_trades
+import datetime
+import threading
+
+EPOCH = datetime.datetime(2017, 1, 1)
+START = 1483228800                          # 2017-01-01 00:00:00 UTC
+
+
+class FakeClient(object):
+    """Client returning one trade every 10 seconds, newest first."""
+
+    def __init__(self, fail_once=()):
+        self.calls = []
+        self.fail_once = set(fail_once)
+        self.lock = threading.Lock()
+
+    def returnTradeHistory(self, currencyPair, start, end, limit):
+        with self.lock:
+            self.calls.append((start, end))
+            if start in self.fail_once:
+                self.fail_once.discard(start)
+                raise IOError('connection reset')
+        trades = [{'tradeID': (t - START) // 10, 'type': 'buy',
+                   'date': (EPOCH + datetime.timedelta(seconds=t - START)
+                            ).strftime('%Y-%m-%d %H:%M:%S')}
+                  for t in range(start + (-start) % 10, end + 1, 10)]
+        return trades[::-1][:limit]
+
+
+def test_backfill_trades_splits_capped_chunks():
+    client = FakeClient(fail_once=[START])
+    trades = list(backfill_trades(client, 'BTC_LTC', START, START + 1000,
+                                  chunk=500, private=True, limit=30,
+                                  workers=3, backoff=0))
+
+    assert [trade['tradeID'] for trade in trades] == list(range(100))
+    assert all(end - start < 300 for start, end in client.calls[-4:])
+
+
+def test_backfill_resumes_from_checkpoint(tmpdir):
+    checkpoint = str(tmpdir.join('checkpoint.json'))
+    fetched = []
+
+    def fetch(start, end):
+        fetched.append(start)
+        return [{'date': t} for t in range(start, end + 1)]
+
+    backfill = Backfill(fetch, 0, 100, 25, key=lambda row: row['date'],
+                        when=lambda row: row['date'], workers=1,
+                        checkpoint=checkpoint)
+    rows = iter(backfill)
+    assert [next(rows)['date'] for _ in range(30)] == list(range(30))
+    rows.close()                            # crash after the first chunk
+
+    resumed = [row['date'] for row in backfill]
+    assert resumed == list(range(25, 100))
+    assert backfill.resume_point() == 100
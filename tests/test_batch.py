@@ -0,0 +1,80 @@
+from poloniex import PoloniexPublic, Poloniex
+from poloniex.exceptions import PoloniexCommandException
+from concurrent import futures
+import threading
+import json
+import time
+import responses
+
+release = threading.Event()
+
+BOOK = {'asks': [['0.0252', 1]], 'bids': [], 'isFrozen': '0', 'seq': 1}
+
+
+def _public(request):
+    params = request.params
+    if params['command'] == 'returnOrderBook':
+        if params['currencyPair'] == 'all':
+            return 200, {}, json.dumps({'BTC_LTC': BOOK, 'BTC_ETH': BOOK, 'BTC_XMR': BOOK})
+        return 200, {}, json.dumps(BOOK)
+    if params['command'] == 'returnLoanOrders':
+        release.wait(5)
+    if params['command'] == 'returnCurrencies':
+        return 200, {}, json.dumps({'error': 'Maintenance.'})
+    return 200, {}, '{"BTC_LTC": {"last": "0.0251"}}'
+
+
+@responses.activate
+def test_batch_collapses_into_all_variants():
+    responses.add_callback(responses.GET, 'https://poloniex.com/public', callback=_public)
+    polo = PoloniexPublic(limit=100)
+    calls = [('returnOrderBook', {'currencyPair': pair})
+             for pair in ('BTC_LTC', 'BTC_ETH', 'BTC_XMR', 'BTC_BOGUS')]
+    calls += [('returnTicker', {}), ('returnTicker', {}), ('returnCurrencies', {})]
+
+    results = polo.batch(calls).results()
+
+    assert len(responses.calls) == 3
+    assert [result.result['seq'] for result in results[:3]] == [1, 1, 1]
+    assert isinstance(results[3].error, PoloniexCommandException)
+    assert results[4].result['BTC_LTC']['last'] == results[5].result['BTC_LTC']['last'] == 0.0251
+    assert isinstance(results[6].error, PoloniexCommandException)
+
+
+@responses.activate
+def test_batch_deadline():
+    responses.add_callback(responses.GET, 'https://poloniex.com/public', callback=_public)
+    polo = PoloniexPublic(limit=100)
+    batch = polo.batch([('returnTicker', {}), ('returnLoanOrders', {'currency': 'BTC'})],
+                       deadline=0.2)
+
+    results = list(batch)
+
+    assert [result.index for result in results] == [0, 1]
+    assert results[0].error is None
+    assert isinstance(results[1].error, futures.TimeoutError)
+    release.set()                           # let the late call finish
+    while len(responses.calls) < 2:
+        time.sleep(0.01)
+
+
+@responses.activate
+def test_batch_serves_per_market_calls_from_an_explicit_all_call():
+    responses.add(responses.POST, 'https://poloniex.com/tradingApi',
+                  body=json.dumps({'BTC_LTC': [], 'BTC_ETH': [], 'BTC_XMR': []}))
+    polo = Poloniex('key', 'secret', limit=100)
+    calls = [('returnOpenOrders', {})]
+    calls += [('returnOpenOrders', {'currencyPair': pair})
+              for pair in ('BTC_LTC', 'BTC_ETH', 'BTC_XMR')]
+
+    results = polo.batch(calls).results()
+
+    assert [result.index for result in results] == [0, 1, 2, 3]
+    assert sorted(results[0].result) == ['BTC_ETH', 'BTC_LTC', 'BTC_XMR']
+    assert [result.result for result in results[1:]] == [[], [], []]
+    assert len(responses.calls) == 1
+
+    calls = [('returnOpenOrders', {'currencyPair': 'all'}),
+             ('returnOpenOrders', {'currencyPair': 'BTC_LTC'})]
+    assert [result.result for result in polo.batch(calls).results()][1] == []
+    assert len(responses.calls) == 2
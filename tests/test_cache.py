@@ -0,0 +1,103 @@
+from poloniex import PoloniexPublic, Poloniex, TTLCache
+import threading
+import time
+import responses
+
+
+@responses.activate
+def test_concurrent_callers_share_one_request():
+    def slow_ticker(request):
+        time.sleep(0.2)
+        return 200, {}, '{"BTC_LTC": {"last": "0.0251"}}'
+
+    responses.add_callback(responses.GET, 'https://poloniex.com/public',
+                           callback=slow_ticker)
+    cache = TTLCache()
+    polo = PoloniexPublic(cache=cache)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(polo.returnTicker()))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(responses.calls) == 1
+    assert [ticker['BTC_LTC']['last'] for ticker in results] == [0.0251] * 8
+    assert (cache.misses, cache.coalesced + cache.hits) == (1, 7)
+
+
+@responses.activate
+def test_ttl_expiry_and_lru_eviction(clock):
+    responses.add(responses.GET, 'https://poloniex.com/public', body='{"BTC": {}}')
+    cache = TTLCache({'returnTicker': 1.0, 'returnLoanOrders': 10.0}, maxsize=2,
+                     clock=clock)
+    polo = PoloniexPublic(cache=cache)
+
+    polo.returnTicker()
+    polo.returnTicker()
+    clock.now = 1.5
+    polo.returnTicker()
+    assert len(responses.calls) == 2 and cache.hits == 1
+
+    for currency in ('BTC', 'LTC', 'BTC', 'ETH'):
+        polo.returnLoanOrders(currency)
+    assert len(cache) == 2 and len(responses.calls) == 5
+    polo.returnCurrencies()                 # no ttl, never cached
+    polo.returnCurrencies()
+    assert len(responses.calls) == 7
+
+
+def test_interrupted_loads_are_not_cached():
+    cache = TTLCache()
+    started, release = threading.Event(), threading.Event()
+    outcomes = []
+
+    def interrupted():
+        started.set()
+        release.wait(5)
+        raise KeyboardInterrupt()
+
+    def call(load):
+        try:
+            outcomes.append(cache.get('returnTicker', {}, load))
+        except KeyboardInterrupt as e:
+            outcomes.append(e)
+
+    leader = threading.Thread(target=call, args=(interrupted,))
+    leader.start()
+    assert started.wait(5)
+    waiter = threading.Thread(target=call, args=(lambda: 'unused',))
+    waiter.start()
+    while not cache.coalesced:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    waiter.join()
+
+    assert [type(outcome) for outcome in outcomes] == [KeyboardInterrupt] * 2
+    assert len(cache) == 0
+    assert cache.get('returnTicker', {}, lambda: 'fresh') == 'fresh'
+
+
+@responses.activate
+def test_private_commands_are_never_cached():
+    responses.add(responses.POST, 'https://poloniex.com/tradingApi', body='{"BTC": "1"}')
+    polo = Poloniex('key', 'secret', cache=TTLCache({'returnBalances': 60}))
+    polo.returnBalances()
+    polo.returnBalances()
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_clients_decoding_differently_share_a_cache_safely():
+    responses.add(responses.GET, 'https://poloniex.com/public',
+                  body='{"BTC_LTC": {"last": "0.0251"}}')
+    cache = TTLCache()
+    floats = PoloniexPublic(cache=cache)
+    fixed = PoloniexPublic(cache=cache, numeric='fixed')
+
+    assert floats.returnTicker()['BTC_LTC']['last'] == 0.0251
+    assert fixed.returnTicker()['BTC_LTC']['last'] == 2510000
+    assert PoloniexPublic(cache=cache).returnTicker()['BTC_LTC']['last'] == 0.0251
+    assert len(responses.calls) == 2
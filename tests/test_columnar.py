@@ -0,0 +1,59 @@
+from poloniex import PoloniexPublic
+from poloniex.columnar import ColumnDecoder, TRADE_FIELDS, BUY, SELL
+import responses
+import pytest
+
+CHART = ('[{"date":1500000000,"high":0.0252,"low":0.0249,"open":0.025,'
+         '"close":0.0251,"volume":12.5,"quoteVolume":500,"weightedAverage":0.025},'
+         ' {"date":1500000300,"high":0.0253,"low":0.025,"open":0.0251,'
+         '"close":0.0252,"volume":1.25,"quoteVolume":50,"weightedAverage":0.0251}]')
+
+TRADES = ('[{"globalTradeID":25129732,"tradeID":6325758,"date":"2016-04-05 08:08:40",'
+          '"type":"sell","rate":"0.02565498","amount":"0.10000000","total":"0.00256549"},'
+          ' {"globalTradeID":25129714,"tradeID":6325757,"date":"2016-04-05 08:08:08",'
+          '"type":"buy","rate":"0.02565498","amount":"0.00000001","total":"0.00000000"}]')
+
+
+@responses.activate
+def test_returnChartData_columnar():
+    np = pytest.importorskip('numpy')
+    responses.add(responses.GET, 'https://poloniex.com/public', body=CHART)
+
+    candles = PoloniexPublic().returnChartData('BTC_LTC', 300, columnar=True)
+
+    assert candles.dtype['date'] == np.int64 and candles.dtype['close'] == np.float64
+    assert list(candles['date']) == [1500000000, 1500000300]
+    assert list(candles['close']) == [0.0251, 0.0252]
+
+
+@responses.activate
+def test_returnTradeHistory_columnar_fixed_point():
+    responses.add(responses.GET, 'https://poloniex.com/public', body=TRADES)
+
+    trades = PoloniexPublic().returnTradeHistory(
+        'BTC_LTC', columnar=True, fixed_point=True)
+
+    assert list(trades['date']) == [1459843720, 1459843688]
+    assert list(trades['type']) == [SELL, BUY]
+    assert list(trades['rate']) == [2565498, 2565498]
+    assert list(trades['amount']) == [10000000, 1]
+
+
+def test_column_decoder_without_numpy():
+    decoder = ColumnDecoder(TRADE_FIELDS)
+    assert decoder({'error': 'Invalid currency pair.'}) == {'error': 'Invalid currency pair.'}
+    decoder({'tradeID': 1, 'date': '1970-01-01 00:00:10', 'type': 'buy',
+             'rate': '0.5', 'amount': '2', 'total': '1'})
+
+    columns = decoder.result(use_numpy=False)
+    assert columns['date'].typecode == 'q' and list(columns['date']) == [10]
+    assert list(columns['rate']) == [0.5] and list(columns['globalTradeID']) == [0]
+
+
+@responses.activate
+def test_fixed_point_follows_the_numeric_mode():
+    pytest.importorskip('numpy')
+    responses.add(responses.GET, 'https://poloniex.com/public', body=TRADES)
+    columns = PoloniexPublic(numeric='fixed').returnTradeHistory(
+        'BTC_LTC', columnar=True)
+    assert columns['rate'].dtype.kind == 'i'
@@ -0,0 +1,149 @@
+from poloniex import PoloniexPublic
+from poloniex.concurrency import (TokenBucket, RateLimiter, SharedTokenBucket,
+                                  Scheduler)
+import poloniex.concurrency
+import multiprocessing
+import threading
+import gc
+import responses
+import pytest
+import time
+
+
+def test_token_bucket_refills_smoothly(monkeypatch, clock):
+    monkeypatch.setattr(poloniex.concurrency.time, 'sleep', clock.sleep)
+    bucket = TokenBucket(limit=6, clock=clock)
+
+    for _ in range(6):
+        assert bucket.acquire()
+    assert clock.now == 0.0                      # the burst did not wait
+    assert not bucket.acquire(blocking=False)
+    assert not bucket.acquire(timeout=0.1)
+
+    bucket.acquire()                             # waits for a single token
+    assert abs(clock.now - 1.0 / 6) < 1e-9
+    clock.now += 0.5                             # three tokens refilled
+    assert all(bucket.acquire(blocking=False) for _ in range(3))
+    assert not bucket.acquire(blocking=False)
+
+    stats = bucket.stats
+    assert (stats.acquired, stats.delayed, stats.rejected) == (10, 1, 3)
+    assert abs(stats.max_wait - 1.0 / 6) < 1e-9
+
+
+def test_rate_limiter_budgets_and_costs(monkeypatch, clock):
+    monkeypatch.setattr(poloniex.concurrency.time, 'sleep', clock.sleep)
+    limiter = RateLimiter(limit=6, private_limit=2,
+                          costs={'returnOrderBook': 3}, clock=clock)
+
+    assert limiter.acquire_for('returnOrderBook')
+    assert limiter.acquire_for('returnOrderBook')
+    assert not limiter.acquire_for('returnTicker', blocking=False)
+    assert limiter.acquire_for('buy', private=True, blocking=False)
+    assert limiter.acquire_for('sell', private=True, blocking=False)
+    assert not limiter.acquire_for('sell', private=True, blocking=False)
+
+
+@responses.activate
+def test_client_with_rate_limiter_has_no_timer():
+    responses.add(responses.GET, 'https://poloniex.com/public', body='{}')
+    limiter = RateLimiter(costs={'returnTicker': 2})
+    polo = PoloniexPublic(semaphore=limiter)
+
+    assert polo.timer is None
+    polo.returnTicker()
+    assert limiter.public.stats.acquired == 1
+    assert limiter.public._tokens < 5
+    assert polo._job is None
+
+
+def test_scheduler_jobs():
+    scheduler = Scheduler()
+    ticks, once = [], threading.Event()
+    job = scheduler.schedule(0.01, lambda: ticks.append(1))
+    scheduler.schedule(0.01, once.set, repeat=False)
+    scheduler.schedule(0.01, lambda: Scheduler.CANCEL)
+    assert once.wait(1)
+    time.sleep(0.1)
+    job.cancel()
+    count = len(ticks)
+    time.sleep(0.05)
+    assert 3 <= count == len(ticks) and len(scheduler) == 0
+
+
+@responses.activate
+def test_clients_share_one_scheduler_thread():
+    responses.add(responses.GET, 'https://poloniex.com/public', body='{}')
+    scheduler = Scheduler()
+    threads = threading.active_count()
+    clients = [PoloniexPublic(scheduler=scheduler) for _ in range(50)]
+    for polo in clients:
+        polo.returnTicker()
+    assert threading.active_count() <= threads + 1
+    assert len(scheduler) == 50
+
+    with clients.pop() as polo:
+        polo.returnTicker()
+    del clients[:], polo
+    gc.collect()
+    time.sleep(1.1)                 # dropped clients end their jobs
+    assert len(scheduler) == 0
+
+
+@responses.activate
+def test_clients_leave_a_shared_timer_to_its_owner():
+    responses.add(responses.GET, 'https://poloniex.com/public', body='{}')
+    scheduler, semaphore = Scheduler(), poloniex.concurrency.Semaphore(6)
+    timer = poloniex.concurrency.RecurrentTimer(1.0, semaphore.clear)
+    clients = [PoloniexPublic(scheduler=scheduler, semaphore=semaphore,
+                              timer=timer) for _ in range(2)]
+    for polo in clients:
+        polo.returnTicker()
+    assert timer.is_alive() and len(scheduler) == 0
+
+    polo = clients.pop()
+    polo.close()
+    del clients[:]
+    gc.collect()
+    assert timer.is_alive()
+
+    timer.cancel()                      # stopped by its owner
+    timer.join()
+    polo.returnTicker()
+    assert polo._job is not None and len(scheduler) == 1
+    polo.close()
+    assert polo._job is None
+
+
+def _drain(bucket, count):
+    for _ in range(count):
+        bucket.acquire()
+
+
+def test_shared_token_bucket_across_processes(tmpdir):
+    if poloniex.concurrency.fcntl is None:
+        pytest.skip('fcntl is not available')
+
+    path = str(tmpdir.join('budget'))
+    bucket = SharedTokenBucket(path, limit=40, capacity=1)
+    start = time.time()
+    workers = [multiprocessing.Process(target=_drain, args=(bucket, 5))
+               for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    _drain(bucket, 5)
+    for worker in workers:
+        worker.join()
+
+    # 20 tokens at 40/s with no burst take at least 19 intervals
+    assert time.time() - start >= 19 / 40.0
+    assert SharedTokenBucket(path).total == 20
+
+
+def test_shared_token_bucket_state_is_in_wall_clock_time(tmpdir):
+    if poloniex.concurrency.fcntl is None:
+        pytest.skip('fcntl is not available')
+    bucket = SharedTokenBucket(str(tmpdir.join('bucket')), limit=10)
+    bucket.acquire()
+    tat = SharedTokenBucket._STATE.unpack_from(bucket._map)[0]
+    assert abs(tat - time.time()) < 1
@@ -0,0 +1,61 @@
+from poloniex import Poloniex, PoloniexPublic
+from poloniex.encoding import encode, form
+from decimal import Decimal
+import datetime
+import pytest
+import responses
+
+
+class UTCPlus2(datetime.tzinfo):
+
+    def utcoffset(self, dt):
+        return datetime.timedelta(hours=2)
+
+    def dst(self, dt):
+        return datetime.timedelta(0)
+
+
+def test_encode_values():
+    assert encode(datetime.datetime(2017, 1, 1)) == '1483228800'
+    assert encode(datetime.datetime(2017, 1, 1, 2, tzinfo=UTCPlus2())) == \
+        '1483228800'
+    assert encode(datetime.date(2017, 1, 1)) == '1483228800'
+    assert encode(0.1) == '0.1'
+    assert encode(1e-05) == '0.00001'
+    assert encode(1.5e16) == '15000000000000000'
+    assert encode(Decimal('1E-8')) == '0.00000001'
+    assert encode(True) == '1' and encode(False) == '0'
+    assert encode(12) == '12' and encode('BTC_LTC') == 'BTC_LTC'
+    with pytest.raises(ValueError):
+        encode(float('nan'))
+
+
+def test_encode_numpy_scalars():
+    numpy = pytest.importorskip('numpy')
+    assert encode(numpy.float64(2.5e-7)) == '0.00000025'
+    assert encode(numpy.int64(7)) == '7'
+
+
+def test_form_quotes_only_unsafe_values():
+    assert form({'address': 'a b&c', 'rate': '0.1'}, 'command=withdraw') == \
+        'command=withdraw&address=a+b%26c&rate=0.1'
+
+
+@responses.activate
+def test_requests_carry_encoded_params():
+    responses.add(responses.GET, 'https://poloniex.com/public', body='[]')
+    responses.add(responses.POST, 'https://poloniex.com/tradingApi',
+                  body='{"orderNumber": "1"}')
+    PoloniexPublic().returnTradeHistory(
+        'BTC_LTC', datetime.datetime(2017, 1, 1), end=1483232400)
+    assert responses.calls[0].request.url.endswith(
+        '?command=returnTradeHistory&currencyPair=BTC_LTC&start=1483228800'
+        '&end=1483232400')
+
+    Poloniex('key', 'secret', nonce_iter=iter([42])).buy(
+        'BTC_LTC', Decimal('0.00001'), 1e-05, postOnly=True)
+    request = responses.calls[1].request
+    assert request.body == ('command=buy&nonce=42&currencyPair=BTC_LTC'
+                            '&rate=0.00001&amount=0.00001&postOnly=1')
+    assert request.headers['Content-Type'] == \
+        'application/x-www-form-urlencoded'
@@ -0,0 +1,58 @@
+from poloniex import PoloniexPublic
+from poloniex.lazy import LazyModule, lazy_import
+import sys
+import subprocess
+import requests
+import responses
+import pytest
+
+
+def test_lazy_import_loads_on_first_use():
+    assert lazy_import('json') is sys.modules['json']
+    sys.modules.pop('colorsys', None)
+    module = lazy_import('colorsys')
+    assert isinstance(module, LazyModule) and 'colorsys' not in sys.modules
+    assert module.rgb_to_hsv(1, 0, 0) == (0, 1, 1)
+    assert module.__dict__['rgb_to_hsv'] is \
+        sys.modules['colorsys'].rgb_to_hsv
+    assert lazy_import('.columnar', 'poloniex').__name__ == \
+        'poloniex.columnar'
+
+
+def test_package_import_leaves_heavy_modules_alone():
+    loaded = subprocess.check_output([sys.executable, '-c', (
+        'import sys, poloniex\n'
+        'poloniex.Poloniex("key", "secret")\n'
+        'print(" ".join(sorted(sys.modules)))')]).decode().split()
+    for module in ('requests', 'numpy', 'concurrent.futures', 'ast',
+                   'datetime', 'calendar', 'poloniex.cache', 'poloniex.retry',
+                   'poloniex.metrics', 'poloniex.orders', 'poloniex.ticker'):
+        assert module not in loaded
+
+
+def test_helpers_are_exported_on_first_access():
+    import poloniex
+    from poloniex.retry import RetryPolicy
+    assert poloniex.RetryPolicy is RetryPolicy
+    assert 'OrderManager' in poloniex.__all__
+    with pytest.raises(AttributeError):
+        poloniex.NoSuchThing
+
+
+@responses.activate
+def test_session_is_created_by_the_first_call():
+    responses.add(responses.GET, 'https://poloniex.com/public', body='{}')
+    created = []
+
+    class Session(requests.Session):
+        def __init__(self):
+            created.append(self)
+            super(Session, self).__init__()
+
+    polo = PoloniexPublic(session_class=Session)
+    assert created == []
+    polo.returnTicker()
+    polo.returnTicker()
+    assert created == [polo.session]
+    polo.close()
+    assert PoloniexPublic()._session is None
@@ -0,0 +1,54 @@
+from poloniex import PoloniexPublic, Poloniex, Metrics, Histogram, RetryPolicy
+import pytest
+import responses
+
+
+def test_histogram_percentiles():
+    histogram = Histogram(lowest=0.001, highest=1.0, sub_buckets=4)
+    for value in [0.002] * 90 + [0.1] * 10:
+        histogram.record(value)
+    assert 0.002 <= histogram.percentile(50) < 0.002 * 1.25
+    assert 0.1 <= histogram.percentile(99) < 0.1 * 1.25
+    histogram.record(10.0)
+    assert histogram.percentile(100) == float('inf')
+    assert list(histogram.cumulative())[-1] == (float('inf'), 101)
+
+
+@responses.activate
+def test_public_calls_are_broken_down():
+    responses.add(responses.GET, 'https://poloniex.com/public', status=503)
+    responses.add(responses.GET, 'https://poloniex.com/public',
+                  body='{"BTC_LTC": {"last": "0.0251"}}')
+    samples = []
+    metrics = Metrics([samples.append])
+    polo = PoloniexPublic(metrics=metrics,
+                          retry=RetryPolicy(sleep=lambda s: None))
+    polo.returnTicker()
+
+    sample, = samples
+    assert sample.command == 'returnTicker' and sample.error is None
+    assert set(sample.stages) == {'backoff', 'limiter', 'http', 'decode'}
+    assert sample.attempts == 2 and sample.status == 200
+    assert sample.bytes == len('{"BTC_LTC": {"last": "0.0251"}}')
+    assert sample.total >= sum(sample.stages.values())
+    assert metrics.retries['returnTicker'] == 1
+    assert metrics.summary()[('returnTicker', 'total')][0] == 1
+
+    text = metrics.prometheus()
+    assert ('poloniex_seconds_count{command="returnTicker",stage="http"} 1'
+            in text)
+    assert 'poloniex_responses_total{command="returnTicker",status="200"} 1' \
+        in text
+
+
+@responses.activate
+def test_private_calls_record_signing_and_errors():
+    responses.add(responses.POST, 'https://poloniex.com/tradingApi',
+                  body='{"error": "Invalid command."}')
+    metrics = Metrics()
+    polo = Poloniex('key', 'secret', metrics=metrics)
+    with pytest.raises(Exception):
+        polo.returnBalances()
+    assert metrics.errors[('returnBalances', 'PoloniexCommandException')] == 1
+    assert ('returnBalances', 'nonce_lock') in metrics.histograms
+    assert ('returnBalances', 'sign') in metrics.histograms
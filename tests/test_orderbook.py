@@ -0,0 +1,62 @@
+from poloniex.orderbook import OrderBook, ASK, BID
+from poloniex.exceptions import PoloniexSequenceException
+import pytest
+
+SNAPSHOT = {'asks': [['0.0260', 2.0], ['0.0261', 5.0], ['0.0265', 10.0]],
+            'bids': [['0.0255', 1.0], ['0.0250', 4.0]],
+            'isFrozen': '0', 'seq': 100}
+
+# Push API book messages recorded as [channel, seq, deltas], with a
+# duplicate (101) and an out of order delivery (104 before 103)
+STREAM = [
+    [148, 101, [['o', 1, '0.0256', '3.00000000']]],
+    [148, 102, [['o', 0, '0.0260', '0.00000000'],
+                ['t', '1234', 1, '0.0260', '2.00000000', 1500000000]]],
+    [148, 101, [['o', 1, '0.0256', '3.00000000']]],
+    [148, 104, [['o', 0, '0.0259', '1.50000000']]],
+    [148, 103, [['o', 1, '0.0255', '0.00000000'], ['o', 0, '0.0261', '4.5']]],
+]
+
+
+class FakeClient(object):
+
+    def __init__(self, snapshot):
+        self.snapshot, self.calls = snapshot, 0
+
+    def returnOrderBook(self, currencyPair, depth):
+        self.calls += 1
+        return self.snapshot
+
+
+def test_replay_delta_stream():
+    book = OrderBook.from_snapshot(SNAPSHOT, 'BTC_LTC')
+    for _, seq, deltas in STREAM:
+        book.apply(seq, deltas)
+
+    assert book.seq == 104
+    assert book.best_bid() == (0.0256, 3.0)
+    assert book.best_ask() == (0.0259, 1.5)
+    assert book.depth_at('ask', '0.0261') == 4.5
+    assert book.depth_at(BID, '0.0255') == 0
+    assert book.levels(ASK, 2) == [(0.0259, 1.5), (0.0261, 4.5)]
+    assert book.vwap('ask', 3.0) == pytest.approx((1.5 * 0.0259 + 1.5 * 0.0261) / 3)
+    assert book.vwap('bid', 100) is None
+    with pytest.raises(ValueError):
+        book.vwap('ask', 0)
+
+
+def test_gap_triggers_resync():
+    client = FakeClient(dict(SNAPSHOT, seq=110, asks=[['0.03', 1.0]]))
+    book = OrderBook.from_snapshot(SNAPSHOT, 'BTC_LTC', client=client,
+                                   max_pending=2)
+    for seq in (105, 111, 112):            # 101-104 never arrive
+        book.apply(seq, [['o', 0, '0.031', '1']])
+
+    assert client.calls == 1
+    assert book.seq == 112 and book.levels(ASK) == [(0.03, 1.0), (0.031, 1.0)]
+
+
+def test_gap_without_client_raises():
+    book = OrderBook.from_snapshot(SNAPSHOT, max_pending=0)
+    with pytest.raises(PoloniexSequenceException):
+        book.apply(102, [])
@@ -0,0 +1,132 @@
+from poloniex import Poloniex
+from poloniex import OrderManager
+from poloniex.orders import Order
+from six.moves.urllib.parse import parse_qs
+from decimal import Decimal
+import json
+import threading
+import responses
+import pytest
+
+URL = 'https://poloniex.com/tradingApi'
+
+
+class Exchange(object):
+
+    """Answers the order commands of a single market."""
+
+    def __init__(self, fill=None):
+        self.next_number = 100
+        self.lock = threading.Lock()
+        self.open = {}
+        self.fill = fill                # amount filled right away, if any
+
+    def __call__(self, request):
+        params = dict((k, v[0]) for k, v in parse_qs(request.body).items())
+        command = params['command']
+        with self.lock:
+            if command in ('buy', 'sell'):
+                self.next_number += 1
+                number = self.next_number
+                amount, trades = params['amount'], []
+                if self.fill is not None:
+                    amount = str(Decimal(amount) - Decimal(self.fill))
+                    trades.append({'amount': self.fill,
+                                   'rate': params['rate']})
+                self.open[number] = {'orderNumber': str(number),
+                                     'type': command, 'rate': params['rate'],
+                                     'amount': amount}
+                return 200, {}, json.dumps({'orderNumber': str(number),
+                                            'resultingTrades': trades})
+            if command == 'cancelOrder':
+                del self.open[int(params['orderNumber'])]
+                return 200, {}, '{"success": 1}'
+            if command == 'moveOrder':
+                order = self.open.pop(int(params['orderNumber']))
+                self.next_number += 1
+                order.update(orderNumber=str(self.next_number),
+                             rate=params['rate'])
+                self.open[self.next_number] = order
+                return 200, {}, json.dumps({
+                    'success': 1, 'orderNumber': str(self.next_number),
+                    'resultingTrades': {'BTC_LTC': []}})
+            if command == 'returnOpenOrders':
+                return 200, {}, json.dumps({'BTC_LTC': list(self.open.values()),
+                                            'BTC_ETH': []})
+
+
+@responses.activate
+def test_view_follows_orders_placed_through_the_manager():
+    exchange = Exchange()
+    responses.add_callback(responses.POST, URL, callback=exchange)
+    orders = OrderManager(Poloniex('key', 'secret'))
+    first = orders.buy('BTC_LTC', '0.01', 2)
+    orders.buy('BTC_LTC', 0.01, 1)
+    orders.sell('BTC_LTC', 0.02, 1)
+    assert first == Order(101, 'BTC_LTC', 'buy', 0.01, 2.0)
+    assert len(orders.at('BTC_LTC', 'buy', '0.01')) == 2
+    assert len(orders.open_orders('BTC_LTC', 'sell')) == 1
+
+    moved = orders.replace(101, 0.009)
+    assert moved.orderNumber == 104 and 101 not in orders
+    assert orders.get(104).rate == 0.009
+
+    results = orders.cancel_all('BTC_LTC', 'buy')
+    assert sorted(results) == [102, 104] and len(orders) == 1
+    assert orders.reconcile() == ([], [], [])
+    orders.stop()
+
+
+@responses.activate
+def test_reconcile_picks_up_outside_changes():
+    exchange = Exchange()
+    responses.add_callback(responses.POST, URL, callback=exchange)
+    orders = OrderManager(Poloniex('key', 'secret'))
+    orders.buy('BTC_LTC', 0.01, 2)
+    orders.buy('BTC_LTC', 0.01, 3)
+    exchange.open[200] = {'orderNumber': '200', 'type': 'sell',
+                          'rate': '0.03', 'amount': '1'}
+    del exchange.open[101]
+    exchange.open[102]['amount'] = '1.5'
+
+    added, removed, changed = orders.reconcile()
+    assert [order.orderNumber for order in added] == [200]
+    assert [order.orderNumber for order in removed] == [101]
+    assert changed == [Order(102, 'BTC_LTC', 'buy', 0.01, 1.5)]
+    assert sorted(order.orderNumber for order in orders.open_orders()) == \
+        [102, 200]
+
+
+@pytest.mark.parametrize('numeric, rate, amounts', [
+    ('decimal', Decimal('0.01'), [Decimal('1.5'), Decimal('1.25')]),
+    ('fixed', 1000000, [150000000, 125000000])])
+@responses.activate
+def test_rates_and_amounts_follow_the_numeric_mode(numeric, rate, amounts):
+    exchange = Exchange(fill='0.5')
+    responses.add_callback(responses.POST, URL, callback=exchange)
+    orders = OrderManager(Poloniex('key', 'secret', numeric=numeric))
+    assert orders.buy('BTC_LTC', '0.01', 2) == \
+        Order(101, 'BTC_LTC', 'buy', rate, amounts[0])
+    assert len(orders.at('BTC_LTC', 'buy', '0.01')) == 1
+    assert orders.reconcile() == ([], [], [])
+
+    exchange.open[101]['amount'] = '1.25'
+    assert orders.reconcile().changed == \
+        [Order(101, 'BTC_LTC', 'buy', rate, amounts[1])]
+    assert orders.replace(101, '0.01').amount == amounts[1]
+
+
+def test_partially_filled_orders_keep_what_is_left():
+    class Client(object):
+        def buy(self, currencyPair, rate, amount, **flags):
+            return {'orderNumber': 7, 'resultingTrades': [
+                {'amount': '0.5', 'rate': rate}]}
+
+        def sell(self, currencyPair, rate, amount, **flags):
+            return {'orderNumber': 8, 'resultingTrades': [
+                {'amount': amount, 'rate': rate}]}
+
+    orders = OrderManager(Client())
+    assert orders.buy('BTC_LTC', 0.01, 2).amount == 1.5
+    assert orders.sell('BTC_LTC', 0.02, 1).amount == 0
+    assert 7 in orders and 8 not in orders
@@ -0,0 +1,96 @@
+from poloniex import Poloniex
+from six.moves.urllib.parse import parse_qs
+import threading
+import time
+import hashlib
+import hmac
+import json
+import responses
+
+URL = 'https://poloniex.com/tradingApi'
+SECRETS = {'key1': b'secret1', 'key2': b'secret2'}
+
+
+def _balances(request):
+    sign = hmac.new(SECRETS[request.headers['Key']],
+                    request.body.encode('utf-8'), hashlib.sha512)
+    assert request.headers['Sign'] == sign.hexdigest()
+    return 200, {}, json.dumps({'BTC': '0.59098578'})
+
+
+@responses.activate
+def test_calls_of_different_keys_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def callback(request):
+        barrier.wait()          # both calls must be in flight at once
+        return _balances(request)
+
+    responses.add_callback(responses.POST, URL, callback=callback)
+    polo = Poloniex('key1', 'secret1', keys=[('key2', 'secret2')])
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(polo.returnBalances()))
+               for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [balances['BTC'] for balances in results] == [0.59098578] * 2
+
+
+@responses.activate
+def test_calls_of_one_key_reach_the_exchange_in_nonce_order():
+    nonces, in_flight = [], []
+
+    def callback(request):
+        in_flight.append(request)
+        assert len(in_flight) == 1
+        nonces.append(int(parse_qs(request.body)['nonce'][0]))
+        time.sleep(0.001)
+        in_flight.pop()
+        return _balances(request)
+
+    responses.add_callback(responses.POST, URL, callback=callback)
+    polo = Poloniex('key1', 'secret1', limit=100, nonce_retries=0)
+
+    def work():
+        for _ in range(10):
+            polo.returnBalances()
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(nonces) == 80 and nonces == sorted(set(nonces))
+
+
+@responses.activate
+def test_private_retries_stale_nonce_and_rotates_keys():
+    seen = []
+
+    def callback(request):
+        params = parse_qs(request.body)
+        seen.append((request.headers['Key'], int(params['nonce'][0])))
+        if len(seen) == 1:
+            return 200, {}, json.dumps(
+                {'error': 'Nonce must be greater than 500. You provided 1.'})
+        return _balances(request)
+
+    responses.add_callback(responses.POST, URL, callback=callback)
+    polo = Poloniex('key1', 'secret1', keys=[('key2', 'secret2')],
+                    nonce_iter=iter(range(1, 100)))
+
+    assert polo.returnBalances()['BTC'] == 0.59098578
+    assert polo.returnBalances()['BTC'] == 0.59098578
+    assert seen[:2] == [('key1', 1), ('key2', seen[1][1])]
+    assert seen[2] == ('key1', 501)
+
+
+def test_stale_nonce_error_never_moves_the_sequence_back():
+    key = Poloniex._ApiKey('key', 'secret', nonce_iter=iter(range(1000, 2000)))
+    key.skip_to(500)                    # an error older than the last nonce
+    assert next(key.nonce_iter) == 1000
+    key.skip_to(5000)
+    assert next(key.nonce_iter) == 5001
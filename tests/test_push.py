@@ -0,0 +1,122 @@
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+import pytest
+
+pytest.importorskip('websocket')
+from poloniex.push import PoloniexPush, Ticker, Trade, BookUpdate
+from poloniex.exceptions import PoloniexSequenceException
+
+GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+SESSIONS = [
+    [[1010],
+     [1002, 1],
+     [1002, None, [148, '0.0251', '0.0252', '0.0250', '0.01', '6.1', '245.8',
+                   0, '0.026', '0.024']],
+     [148, 500, [['i', {'currencyPair': 'BTC_LTC', 'orderBook': [
+         {'0.0252': '1.0', '0.0253': '2.0'}, {'0.0250': '3.0'}]}]]],
+     [148, 501, [['o', 1, '0.0251', '1.5'],
+                 ['t', '42706057', 1, '0.0252', '0.5', 1522877119]]]],
+    # the server drops the connection, the client resubscribes
+    [[148, 900, [['i', {'currencyPair': 'BTC_LTC', 'orderBook': [
+        {'0.0260': '1.0'}, {'0.0255': '1.0'}]}]]],
+     [148, 901, [['o', 0, '0.0260', '0.0']]]],
+]
+
+
+class StandInServer(object):
+    """Minimal WebSocket server replaying one session per connection."""
+
+    def __init__(self, sessions):
+        self.sessions = list(sessions)
+        self.subscriptions = []
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(5)
+        self.url = 'ws://127.0.0.1:{}/'.format(self.sock.getsockname()[1])
+        thread = threading.Thread(target=self.serve)
+        thread.daemon = True
+        thread.start()
+
+    def serve(self):
+        for messages in self.sessions:
+            conn, _ = self.sock.accept()
+            request = b''
+            while b'\r\n\r\n' not in request:
+                request += conn.recv(4096)
+            key = [line.split(b':', 1)[1].strip() for line in request.split(b'\r\n')
+                   if line.lower().startswith(b'sec-websocket-key')][0]
+            accept = base64.b64encode(hashlib.sha1(key + GUID).digest())
+            conn.sendall(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n'
+                         b'Connection: Upgrade\r\nSec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+            self.subscriptions.append(json.loads(self.read_frame(conn)))
+            for message in messages:
+                payload = json.dumps(message).encode('utf-8')
+                conn.sendall(struct.pack('!BB', 0x81, 126) + struct.pack('!H', len(payload))
+                             + payload)
+            conn.close()
+
+    @staticmethod
+    def read_frame(conn):
+        header = conn.recv(2)
+        length = header[1] & 0x7f
+        if length == 126:
+            length = struct.unpack('!H', conn.recv(2))[0]
+        mask = conn.recv(4)
+        data = conn.recv(length)
+        return bytes(byte ^ mask[i % 4] for i, byte in enumerate(data)).decode('utf-8')
+
+
+def test_push_stream_with_reconnect():
+    server = StandInServer(SESSIONS)
+    push = PoloniexPush(server.url, pairs={148: 'BTC_LTC'}, reconnect_delay=0.01)
+    push.subscribe('BTC_LTC')
+
+    with push:
+        events = []
+        for event in push.events(timeout=5):
+            events.append(event)
+            if isinstance(event, BookUpdate) and event.seq == 901:
+                break
+
+    assert server.subscriptions == [{'command': 'subscribe', 'channel': 'BTC_LTC'}] * 2
+    ticker = [event for event in events if isinstance(event, Ticker)][0]
+    assert ticker.currencyPair == 'BTC_LTC' and ticker.last == 0.0251
+    trade = [event for event in events if isinstance(event, Trade)][0]
+    assert (trade.tradeID, trade.type, trade.amount) == (42706057, 'buy', 0.5)
+    assert [event.seq for event in events if isinstance(event, BookUpdate)] == [500, 501, 900, 901]
+
+    book = push.books['BTC_LTC']
+    assert book.seq == 901 and book.best_ask() is None
+    assert book.best_bid() == (0.0255, 1.0)
+
+
+def test_push_drops_oldest_when_full():
+    push = PoloniexPush('ws://unused', maxsize=2, overflow='drop',
+                        connect=lambda url, timeout: None)
+    for seq in range(5):
+        push._dispatch([148, seq, []])
+    assert push.dropped == 3
+    assert [event.seq for event in push.events(timeout=0)] == [3, 4]
+
+
+def test_push_errors_are_kept_without_dropping_the_connection(caplog):
+    def callback(event):
+        raise RuntimeError('bug in the callback')
+
+    push = PoloniexPush('ws://unused', callback=callback, pairs={148: 'BTC_LTC'},
+                        connect=lambda url, timeout: None)
+    push._handle(json.dumps(SESSIONS[0][2]))
+    assert str(push.last_error) == 'bug in the callback'
+    push._handle('[1002, null, [148, "0.0251"]]')   # too short to be a ticker
+    assert isinstance(push.last_error, ValueError)
+    assert len([r for r in caplog.records if r.levelname == 'ERROR']) == 2
+
+    push._handle(json.dumps(SESSIONS[0][3]))
+    push.books['BTC_LTC'].max_pending = 0
+    with pytest.raises(PoloniexSequenceException):
+        push._handle(json.dumps([148, 503, []]))
@@ -0,0 +1,133 @@
+from poloniex import Poloniex, PoloniexPublic, PoloniexReplayException
+from poloniex.replay import (TrafficLog, recording_session, replay_session,
+                             request_key)
+import json
+import responses
+import pytest
+
+PUBLIC = 'https://poloniex.com/public'
+PRIVATE = 'https://poloniex.com/tradingApi'
+
+TRADES = [{'tradeID': i, 'date': '2017-01-01 00:00:00', 'type': 'buy',
+           'rate': '0.0251', 'amount': '1.5', 'total': '0.03765'}
+          for i in range(100)]
+
+
+def test_request_key_ignores_nonces_and_parameter_order():
+    first = request_key('POST', PRIVATE,
+                        'command=buy&nonce=1&rate=0.1&currencyPair=BTC_LTC')
+    second = request_key('POST', PRIVATE,
+                         b'command=buy&currencyPair=BTC_LTC&rate=0.1&nonce=9')
+    assert first == second
+    assert first[0] == ('POST https://poloniex.com/tradingApi?'
+                        'command=buy&currencyPair=BTC_LTC&rate=0.1')
+    assert request_key('GET', PUBLIC + '?command=returnTicker')[1] != \
+        first[1]
+
+
+def record(path):
+    ticks = iter(['0.0251', '0.0252'])
+    with responses.RequestsMock() as mock:
+        mock.add_callback(responses.GET, PUBLIC, callback=lambda request: (
+            200, {}, json.dumps(
+                TRADES if 'TradeHistory' in request.url
+                else {'BTC_LTC': {'last': next(ticks)}})))
+        mock.add(responses.POST, PRIVATE, body='{"BTC": "1.5"}')
+        polo = Poloniex('key', 'secret', session=recording_session(path))
+        polo.returnTicker()
+        polo.returnTicker()
+        polo.returnTradeHistoryPublic('BTC_LTC', 0, 1)
+        polo.returnBalances()
+        polo.session.close()
+
+
+def test_replay_answers_without_the_network(tmpdir):
+    path = str(tmpdir.join('traffic.log'))
+    record(path)
+    log = TrafficLog(path)
+    assert len(log) == 4
+
+    polo = Poloniex('key', 'secret', session=replay_session(log))
+    with responses.RequestsMock():      # any request reaching it would fail
+        assert polo.returnTicker()['BTC_LTC']['last'] == 0.0251
+        assert polo.returnTicker()['BTC_LTC']['last'] == 0.0252
+        assert polo.returnTicker()['BTC_LTC']['last'] == 0.0251
+        assert polo.returnBalances() == {'BTC': 1.5}
+        assert polo.returnBalances() == {'BTC': 1.5}    # another nonce
+        assert len(list(polo.streamTradeHistory('BTC_LTC', 0, 1))) == 100
+        with pytest.raises(PoloniexReplayException):
+            polo.returnOrderBook('BTC_ETH')
+
+
+def test_replay_timing_and_end_of_recording(tmpdir):
+    path = str(tmpdir.join('traffic.log'))
+    log = TrafficLog(path)
+    canonical, key = request_key('GET', PUBLIC + '?command=returnTicker')
+    log.append(canonical, key, 100.0, 0.5, 200, b'{"BTC_LTC": {}}')
+    log.close()
+
+    slept = []
+    session = replay_session(path, speed=10, loop=False)
+    session.get_adapter(PUBLIC)._sleep = slept.append
+    polo = PoloniexPublic(session=session)
+    assert polo.returnTicker() == {'BTC_LTC': {}}
+    assert slept == [0.05]
+    with pytest.raises(PoloniexReplayException):
+        polo.returnTicker()
+    session.get_adapter(PUBLIC).rewind()
+    assert polo.returnTicker() == {'BTC_LTC': {}}
+
+
+def test_truncated_record_is_ignored(tmpdir):
+    path = str(tmpdir.join('traffic.log'))
+    log = TrafficLog(path)
+    for command in ('returnTicker', 'return24hVolume'):
+        canonical, key = request_key('GET', PUBLIC + '?command=' + command)
+        log.append(canonical, key, 0, 0, 200, b'{}')
+    log.close()
+    with open(path, 'rb+') as f:
+        f.truncate(len(f.read()) - 1)
+    assert len(TrafficLog(path)) == 1
+
+
+def test_appending_after_a_truncated_record(tmpdir):
+    path = str(tmpdir.join('traffic.log'))
+    log = TrafficLog(path)
+    canonical, key = request_key('GET', PUBLIC + '?command=returnTicker')
+    log.append(canonical, key, 0, 0, 200, b'{"BTC_LTC": {}}')
+    log.append(canonical, key, 0, 0, 200, b'{"BTC_ETH": {}}')
+    log.close()
+    with open(path, 'rb+') as f:
+        f.truncate(len(f.read()) - 3)
+    log = TrafficLog(path)
+    log.append(canonical, key, 0, 0, 200, b'{"BTC_XMR": {}}')
+    log.close()
+    log = TrafficLog(path)
+    assert [log.body(entry) for entry in log.index[key]] == \
+        [b'{"BTC_LTC": {}}', b'{"BTC_XMR": {}}']
+
+
+def test_replay_keeps_the_pace_of_the_recording(tmpdir):
+    path = str(tmpdir.join('traffic.log'))
+    log = TrafficLog(path)
+    canonical, key = request_key('GET', PUBLIC + '?command=returnTicker')
+    for started, elapsed in ((100.0, 0.1), (101.0, 0.1), (103.0, 0.2),
+                             (103.1, 0.4)):
+        log.append(canonical, key, started, elapsed, 200, b'{}')
+    log.close()
+
+    now, slept = [50.0], []
+
+    def sleep(seconds):
+        slept.append(round(seconds, 6))
+        now[0] += seconds
+
+    session = replay_session(path, speed=2)
+    adapter = session.get_adapter(PUBLIC)
+    adapter._sleep, adapter._clock = sleep, lambda: now[0]
+    polo = PoloniexPublic(session=session)
+    for _ in range(3):
+        polo.returnTicker()
+    now[0] += 5                         # the caller falls behind
+    polo.returnTicker()
+    assert slept == [0.05, 0.5, 1.05, 0.2]
@@ -0,0 +1,92 @@
+from poloniex import (Poloniex, PoloniexPublic, RetryPolicy,
+                      PoloniexCircuitOpenException, PoloniexCommandException)
+import pytest
+import requests
+import responses
+
+
+def _policy(clock=None, **kwargs):
+    return RetryPolicy(clock=clock or (lambda: 0.0), sleep=lambda s: None,
+                       **kwargs)
+
+
+@responses.activate
+def test_server_errors_are_retried():
+    responses.add(responses.GET, 'https://poloniex.com/public', status=502,
+                  body='<html>Bad Gateway</html>')
+    responses.add(responses.GET, 'https://poloniex.com/public', status=429,
+                  body='{}', headers={'Retry-After': '2'})
+    responses.add(responses.GET, 'https://poloniex.com/public',
+                  body='{"BTC_LTC": {"last": "0.0251"}}')
+    retry = _policy()
+    polo = PoloniexPublic(retry=retry)
+    assert polo.returnTicker()['BTC_LTC']['last'] == 0.0251
+    assert len(responses.calls) == 3
+    assert retry.stats['retries'] == 2 and retry.stats['retries_throttled'] == 1
+
+
+@responses.activate
+def test_throttling_errors_in_json_are_retried():
+    responses.add(responses.GET, 'https://poloniex.com/public', status=429,
+                  json={'error': 'Please do not make more than 6 API calls '
+                                 'per second.'}, headers={'Retry-After': '1'})
+    responses.add(responses.GET, 'https://poloniex.com/public', status=503,
+                  json={'error': 'Service unavailable.'})
+    responses.add(responses.GET, 'https://poloniex.com/public',
+                  body='{"BTC_LTC": {"last": "0.0251"}}')
+    retry = _policy(threshold=2)
+    polo = PoloniexPublic(retry=retry)
+    assert polo.returnTicker()['BTC_LTC']['last'] == 0.0251
+    assert len(responses.calls) == 3
+    assert retry.stats['retries_throttled'] == 1
+    assert retry.stats['retries_server'] == 1
+
+    responses.add(responses.GET, 'https://poloniex.com/public', status=503,
+                  json={'error': 'Service unavailable.'})
+    polo = PoloniexPublic(retry=_policy(retries=0))
+    with pytest.raises(PoloniexCommandException) as error:
+        polo.returnTicker()
+    assert error.value.status_code == 503
+    assert polo.retry.breaker('returnTicker').failures == 1
+
+
+@responses.activate
+def test_orders_are_not_resent_after_a_timeout():
+    responses.add(responses.POST, 'https://poloniex.com/tradingApi',
+                  body=requests.exceptions.ReadTimeout())
+    retry = _policy()
+    polo = Poloniex('key', 'secret', retry=retry)
+    with pytest.raises(requests.exceptions.Timeout):
+        polo.buy('BTC_LTC', 0.01, 1)
+    assert len(responses.calls) == 1 and retry.stats['gave_up'] == 1
+
+
+@responses.activate
+def test_command_errors_are_not_retried():
+    responses.add(responses.GET, 'https://poloniex.com/public',
+                  body='{"error": "Invalid currency pair."}')
+    polo = PoloniexPublic(retry=_policy())
+    with pytest.raises(Exception):
+        polo.returnOrderBook('BTC_XXX')
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_circuit_opens_and_recovers(clock):
+    responses.add(responses.GET, 'https://poloniex.com/public', status=503)
+    retry = _policy(clock, retries=1, threshold=3, reset_timeout=10)
+    polo = PoloniexPublic(retry=retry)
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.HTTPError):
+            polo.returnTicker()
+    assert retry.breaker_states() == {'returnTicker': 'open'}
+    assert len(responses.calls) == 3
+    with pytest.raises(PoloniexCircuitOpenException):
+        polo.returnTicker()
+    assert len(responses.calls) == 3
+
+    clock.now = 10
+    responses.replace(responses.GET, 'https://poloniex.com/public',
+                      body='{"BTC_LTC": {}}')
+    assert 'BTC_LTC' in polo.returnTicker()
+    assert retry.breaker_states() == {'returnTicker': 'closed'}
@@ -0,0 +1,15 @@
+from poloniex.signing import Signer
+from concurrent import futures
+import hashlib
+import hmac
+
+
+def test_signatures_match_a_fresh_hmac():
+    signer = Signer('key', u'secret')
+    bodies = ['command=buy&nonce={}'.format(n) for n in range(200)]
+    expected = [hmac.new(b'secret', body.encode('utf-8'),
+                         hashlib.sha512).hexdigest() for body in bodies]
+    with futures.ThreadPoolExecutor(8) as pool:
+        assert list(pool.map(signer.sign, bodies)) == expected
+    assert signer.sign(bodies[0].encode('utf-8')) == expected[0]
+    assert signer.headers(bodies[1]) == {'Key': 'key', 'Sign': expected[1]}
@@ -0,0 +1,99 @@
+from poloniex import PoloniexPublic
+from poloniex.store import MarketStore
+import poloniex.columnar
+import poloniex.store
+import json
+import responses
+import pytest
+
+
+def _candles(start, end):
+    return [{'date': t, 'high': 2.0, 'low': 0.5, 'open': 1.0, 'close': t / 300.0,
+             'volume': 10.0, 'quoteVolume': 5.0, 'weightedAverage': 1.5}
+            for t in range(start - start % 300, end + 1, 300) if t >= max(start, 1)]
+
+
+def _chart(request):
+    start, end = int(request.params['start']), int(request.params['end'])
+    return 200, {}, json.dumps(_candles(start, min(end, _chart.now)))
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(poloniex.store, '_np', None)
+        monkeypatch.setattr(poloniex.columnar, '_np', None)
+    return request.param
+
+
+@responses.activate
+def test_sync_fetches_only_new_candles(tmpdir, backend):
+    responses.add_callback(responses.GET, 'https://poloniex.com/public', callback=_chart)
+    polo = PoloniexPublic()
+    store = MarketStore(str(tmpdir))
+
+    _chart.now = 3000
+    assert store.sync(polo, 'BTC_LTC', 300) == 10
+    _chart.now = 4500
+    assert store.sync(polo, 'BTC_LTC', 300) == 5
+    assert store.sync(polo, 'BTC_LTC', 300) == 0
+    assert responses.calls[1].request.params['start'] == '3300'
+
+    reopened = MarketStore(str(tmpdir)).candles('BTC_LTC', 300)
+    assert len(reopened) == 15 and reopened.last_date() == 4500
+    rows = list(reopened.rows(600, 1500))
+    assert [row[0] for row in rows] == [600, 900, 1200]
+    assert [row[4] for row in rows] == [2.0, 3.0, 4.0]
+    if backend == 'numpy':
+        window = store.load('BTC_LTC', 300, 600, 1500)
+        assert list(window['date']) == [600, 900, 1200]
+        assert not window.flags['OWNDATA']      # a view of the mapped file
+
+
+def _trade(trade_id, date):
+    return {'globalTradeID': 1000 + trade_id, 'tradeID': trade_id,
+            'date': date, 'type': 'buy', 'rate': '0.01', 'amount': '1.0',
+            'total': '0.01'}
+
+
+@responses.activate
+def test_sync_trades_keeps_later_trades_of_the_last_second(tmpdir, backend):
+    trades = [_trade(1, '2017-01-01 00:00:00'), _trade(2, '2017-01-01 00:00:05')]
+
+    def history(request):
+        start, end = int(request.params['start']), int(request.params['end'])
+        return 200, {}, json.dumps([
+            trade for trade in reversed(trades)
+            if start <= poloniex.columnar.parse_time(trade['date']) <= end])
+
+    responses.add_callback(responses.GET, 'https://poloniex.com/public', callback=history)
+    polo = PoloniexPublic()
+    store = MarketStore(str(tmpdir))
+    start, end = 1483228800, 1483228800 + 3600
+
+    assert store.sync_trades(polo, 'BTC_LTC', start, end) == 2
+    trades.append(_trade(3, '2017-01-01 00:00:05'))     # same second as the last
+    assert store.sync_trades(polo, 'BTC_LTC', start, end) == 1
+    assert store.sync_trades(polo, 'BTC_LTC', start, end) == 0
+    assert [row[1] for row in store.trades('BTC_LTC').rows()] == [1, 2, 3]
+
+
+def test_partial_record_is_cut_off_before_appending(tmpdir, backend):
+    store = MarketStore(str(tmpdir))
+    candles = store.candles('BTC_LTC', 300)
+    decoder = poloniex.columnar.ColumnDecoder(poloniex.columnar.CHART_FIELDS)
+    for candle in _candles(300, 900):
+        decoder(candle)
+    candles.append(decoder.result())
+    with open(candles.path, 'ab') as f:
+        f.write(b'\x01' * 5)                    # an interrupted append
+    assert len(candles) == 3
+
+    decoder = poloniex.columnar.ColumnDecoder(poloniex.columnar.CHART_FIELDS)
+    for candle in _candles(1200, 1200):
+        decoder(candle)
+    assert candles.append(decoder.result()) == 1
+    reopened = MarketStore(str(tmpdir)).candles('BTC_LTC', 300)
+    assert [row[0] for row in reopened.rows()] == [300, 600, 900, 1200]
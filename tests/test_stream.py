@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from poloniex import PoloniexPublic, PoloniexCommandException
+from poloniex.orderbook import ASK, BID
+from poloniex.stream import iter_values, BookLevel
+import json
+import pytest
+import responses
+
+TRADES = [{'tradeID': i, 'rate': '0.0{}'.format(i), 'amount': 12345.5 + i,
+           'type': u'sell ✓'} for i in range(1, 200)]
+
+
+def test_values_split_across_chunks():
+    body = json.dumps({'trades': TRADES, 'seq': 123456789},
+                      ensure_ascii=False).encode('utf-8')
+    chunks = [body[i:i + 1] for i in range(len(body))]
+    items = list(iter_values(chunks, depth=2))
+    assert [value for _, value in items[:-1]] == TRADES
+    assert items[0][0] == ('trades', 0)
+    assert items[-1] == (('seq',), 123456789)
+
+
+def test_first_value_before_the_whole_body():
+    consumed = []
+
+    def chunks():
+        yield b'['
+        for trade in TRADES:
+            consumed.append(trade)
+            yield json.dumps(trade).encode('utf-8') + b', '
+        yield b'{}]'
+
+    values = iter_values(chunks())
+    next(values)
+    assert len(consumed) < 5
+    assert len(list(values)) == len(TRADES)
+
+
+@responses.activate
+def test_stream_trade_history_in_chunks():
+    responses.add(responses.GET, 'https://poloniex.com/public',
+                  body=json.dumps(TRADES))
+    polo = PoloniexPublic()
+    chunks = list(polo.streamTradeHistory('BTC_LTC', 0, 100, chunk_size=50))
+    assert [len(chunk) for chunk in chunks] == [50, 50, 50, 49]
+    assert chunks[0][0]['rate'] == 0.01
+    assert 'stream=' not in responses.calls[0].request.url
+
+
+@responses.activate
+def test_stream_order_books():
+    book = {'asks': [['0.2', 1]], 'bids': [['0.1', 2], ['0.09', 3]],
+            'isFrozen': '0', 'seq': 7}
+    responses.add(responses.GET, 'https://poloniex.com/public',
+                  body=json.dumps({'BTC_ETH': book, 'BTC_LTC': book}))
+    responses.add(responses.GET, 'https://poloniex.com/public',
+                  body=json.dumps(book))
+    polo = PoloniexPublic()
+    levels = list(polo.streamOrderBook())
+    assert len(levels) == 6
+    assert levels[0] == BookLevel('BTC_ETH', ASK, 0.2, 1.0)
+    assert list(polo.streamOrderBook('BTC_ETH', chunk_size=2)) == [
+        [BookLevel('BTC_ETH', ASK, 0.2, 1.0),
+         BookLevel('BTC_ETH', BID, 0.1, 2.0)],
+        [BookLevel('BTC_ETH', BID, 0.09, 3.0)]]
+
+
+@responses.activate
+def test_stream_error():
+    responses.add(responses.GET, 'https://poloniex.com/public',
+                  body='{"error": "Invalid currency pair."}')
+    polo = PoloniexPublic()
+    with pytest.raises(PoloniexCommandException):
+        list(polo.streamTradeHistory('BTC_XXX'))
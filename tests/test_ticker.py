@@ -0,0 +1,111 @@
+from poloniex import PoloniexPublic, TickerFeed, AdaptiveInterval
+from poloniex.ticker import Snapshot, diff, ADDED, CHANGED, REMOVED
+from poloniex.concurrency import Scheduler
+import json
+import threading
+import responses
+
+URL = 'https://poloniex.com/public'
+
+
+def ticker(**last):
+    return dict((pair, {'id': i, 'last': value, 'isFrozen': '0'})
+                for i, (pair, value) in enumerate(sorted(last.items())))
+
+
+def test_diff_only_reports_the_markets_that_moved():
+    before = Snapshot(ticker(BTC_LTC='0.0251', BTC_ETH='0.07'))
+    after = Snapshot(ticker(BTC_LTC='0.0252', BTC_ETH='0.07'))
+    changes = diff(before, after)
+    assert len(changes) == 1
+    pair, kind, fields, row = changes[0]
+    assert (pair, kind) == ('BTC_LTC', CHANGED)
+    assert fields == {'last': ('0.0251', '0.0252')}
+    assert row['last'] == '0.0252'
+    assert diff(after, Snapshot(ticker(BTC_LTC='0.0252',
+                                       BTC_ETH='0.07'))) == []
+
+
+def test_diff_markets_added_and_removed():
+    before = Snapshot({'BTC_LTC': {'last': '1'}, 'totalBTC': '10'})
+    after = Snapshot({'BTC_ETH': {'last': '2'}, 'totalBTC': '11'})
+    changes = dict((change.currencyPair, change)
+                   for change in diff(before, after, float_row))
+    assert changes['BTC_ETH'].kind == ADDED
+    assert changes['BTC_ETH'].fields == {'last': (None, 2.0)}
+    assert changes['BTC_LTC'].kind == REMOVED
+    assert changes['BTC_LTC'].row is None
+    assert changes['totalBTC'].fields == {'value': (10.0, 11.0)}
+
+
+def float_row(raw):
+    return dict((key, float(value)) for key, value in raw.items())
+
+
+def test_adaptive_interval_follows_the_rate_of_changes():
+    interval = AdaptiveInterval(minimum=1, maximum=60, target=5,
+                                smoothing=1)
+    assert interval.update(50, 1) == 1             # busy: poll at the minimum
+    assert interval.update(0, 1) == 2              # quiet: slow down gradually
+    assert interval.update(0, 2) == 4
+    assert interval.update(1, 4) == 8
+    assert interval.update(1, 8) == 16
+    assert interval.update(1, 16) == 32
+    assert interval.update(1, 32) == 60
+    assert interval.update(20, 60) == 15
+
+
+class Polled(object):
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+
+    def __call__(self, request):
+        answer = self.answers.pop(0) if len(self.answers) > 1 else \
+            self.answers[0]
+        return 200, {}, json.dumps(answer)
+
+
+@responses.activate
+def test_feed_yields_cast_changes_and_adapts():
+    responses.add_callback(responses.GET, URL, callback=Polled(
+        ticker(BTC_LTC='0.0251', BTC_ETH='0.07'),
+        ticker(BTC_LTC='0.0252', BTC_ETH='0.07'),
+        ticker(BTC_LTC='0.0252', BTC_ETH='0.071')))
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    feed = TickerFeed(PoloniexPublic(), clock=lambda: now[0], sleep=sleep,
+                      interval=AdaptiveInterval(1, 60, target=2))
+    changes = iter(feed)
+    first = next(changes)
+    assert first.currencyPair == 'BTC_LTC'
+    assert first.fields == {'last': (0.0251, 0.0252)}
+    assert first.row['id'] == 1 and first.row['last'] == 0.0252
+    assert next(changes).currencyPair == 'BTC_ETH'
+    assert sleeps == [1, 2]
+    assert feed.stats()['polls'] == 3 and feed.stats()['changes'] == 2
+
+
+@responses.activate
+def test_feed_in_the_background():
+    responses.add_callback(responses.GET, URL, callback=Polled(
+        ticker(BTC_LTC='1'), ticker(BTC_LTC='2')))
+    received = []
+    done = threading.Event()
+
+    def callback(changes):
+        received.extend(changes)
+        done.set()
+
+    scheduler = Scheduler()
+    with TickerFeed(PoloniexPublic(), initial=True, scheduler=scheduler,
+                    interval=AdaptiveInterval(0.01, 0.01)) as feed:
+        feed.start(callback)
+        assert done.wait(5)
+    assert received[0].kind == ADDED
+    assert feed._job is None
@@ -0,0 +1,123 @@
+from poloniex import PoloniexPublic, Poloniex
+from poloniex.utils import (AutoCastDict, EagerAutoCastDict, autocast,
+                            DecimalAutoCastDict, FixedPointAutoCastDict)
+from decimal import Decimal
+import ast
+import responses
+
+
+def _literal_eval(value):
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError, TypeError):
+        return value
+
+
+def test_autocast_matches_literal_eval():
+    values = ['0.0251', '9094', '-1', '007', '00.5', '1.', '.5', '1e-8',
+              '1_000', '0x10', 'inf', 'BTC_LTC', 'True', 'None', '', ' 5',
+              '2017-01-01 00:00:00', 42, 1.5, None, ['0.1', 2]]
+    for value in values:
+        expected, result = _literal_eval(value), autocast(value)
+        assert type(result) is type(expected) and result == expected
+
+
+def test_autocastdict_casts_once():
+    calls = []
+
+    class CountingDict(AutoCastDict):
+        __slots__ = ()
+        _cast = staticmethod(lambda value: calls.append(value) or autocast(value))
+
+    data = CountingDict(last='0.0251', isFrozen='0', pair='BTC_LTC')
+    assert data['last'] == 0.0251 and data['last'] == 0.0251
+    assert calls == ['0.0251']
+    assert dict(data) == {'last': 0.0251, 'isFrozen': 0, 'pair': 'BTC_LTC'}
+
+
+def test_eager_autocastdict():
+    data = EagerAutoCastDict(last='0.0251', quoteVolume='9094')
+    assert data == AutoCastDict(last='0.0251', quoteVolume='9094')
+    assert data['quoteVolume'] == 9094
+
+
+def test_decimal_and_fixed_point_dicts():
+    raw = {'rate': '0.00000001', 'amount': '1e-8', 'id': '7',
+           'levels': [['0.1', 2.5]]}
+    assert dict(DecimalAutoCastDict(raw)) == {
+        'rate': Decimal('0.00000001'), 'amount': Decimal('1E-8'), 'id': 7,
+        'levels': [[Decimal('0.1'), 2.5]]}
+    assert dict(FixedPointAutoCastDict(raw)) == {
+        'rate': 1, 'amount': 1, 'id': 7, 'levels': [[10000000, 250000000]]}
+    assert dict(FixedPointAutoCastDict({'amount': '2', 'total': 3})) == {
+        'amount': 200000000, 'total': 300000000}
+    assert FixedPointAutoCastDict(liquidationPrice='0.5')[
+        'liquidationPrice'] == 50000000
+
+
+@responses.activate
+def test_numeric_modes():
+    responses.add(responses.GET, 'https://poloniex.com/public',
+                  body='[{"date": 1405699200, "close": 0.00000003}]')
+    responses.add(responses.GET, 'https://poloniex.com/public',
+                  body='{"asks": [["0.10000001", 3]], "seq": 5}')
+    responses.add(responses.POST, 'https://poloniex.com/tradingApi',
+                  body='{"BTC": "0.30000000", "LTC": "0.10000000"}')
+
+    polo = PoloniexPublic(numeric='decimal')
+    candle, = polo.returnChartData('BTC_LTC', 300)
+    assert candle['close'] == Decimal('0.00000003')
+    assert polo.returnOrderBook('BTC_LTC')['asks'] == [[Decimal('0.10000001'), 3]]
+
+    balances = Poloniex('key', 'secret', numeric='fixed').returnBalances()
+    assert balances['BTC'] - balances['LTC'] == 20000000
+
+
+@responses.activate
+def test_fixed_point_mode_scales_every_number():
+    responses.add(responses.GET, 'https://poloniex.com/public',
+                  body='{"asks": [["0.10000001", 3], ["0.2", 3.5]], '
+                       '"bids": [], "seq": 5, "isFrozen": "0"}')
+    responses.add(responses.GET, 'https://poloniex.com/public',
+                  body='[{"date": 1405699200, "close": 0.00000003, '
+                       '"volume": 2}]')
+    responses.add(responses.GET, 'https://poloniex.com/public',
+                  body='{"asks": [["0.10000001", 3], ["0.2", 3.5]], '
+                       '"bids": [], "seq": 5}')
+
+    polo = PoloniexPublic(numeric='fixed')
+    book = polo.returnOrderBook('BTC_LTC')
+    assert book['asks'] == [[10000001, 300000000], [20000000, 350000000]]
+    assert (book['seq'], book['isFrozen']) == (5, 0)
+    candle, = polo.returnChartData('BTC_LTC', 300)
+    assert candle == {'date': 1405699200, 'close': 3, 'volume': 200000000}
+    levels = polo.streamOrderBook('BTC_LTC')
+    assert [(level.price, level.amount) for level in levels] == \
+        [(10000001, 300000000), (20000000, 350000000)]
+
+
+@responses.activate
+def test_fixed_point_mode_leaves_counts_ids_and_sentinels():
+    responses.add(responses.POST, 'https://poloniex.com/tradingApi', body=(
+        '{"deposits": [{"currency": "BTC", "address": "1N2i5n8DwTGzUq2Vmn9T",'
+        ' "amount": "0.01006132", "confirmations": 3, "txid": "17f819a91369a9'
+        'ff6c4a34216d434597cfc1b4a3d0489b46bd6f924137a47701", "timestamp": '
+        '1399305798, "status": "COMPLETE", "depositNumber": "12345"}], '
+        '"withdrawals": [{"withdrawalNumber": 134933, "currency": "BTC", '
+        '"amount": "5.00010000", "fee": "0.00010000", "timestamp": '
+        '1399267904, "status": "COMPLETE"}]}'))
+    responses.add(responses.POST, 'https://poloniex.com/tradingApi', body=(
+        '{"amount": "0", "total": "0", "basePrice": "0", '
+        '"liquidationPrice": -1, "pl": "0", "lendingFees": "0", '
+        '"type": "none"}'))
+
+    polo = Poloniex('key', 'secret', numeric='fixed')
+    history = polo.returnDepositsWithdrawals()
+    deposit, = history['deposits']
+    assert (deposit['amount'], deposit['confirmations'],
+            deposit['depositNumber'], deposit['timestamp']) == \
+        (1006132, 3, 12345, 1399305798)
+    withdrawal, = history['withdrawals']
+    assert (withdrawal['withdrawalNumber'], withdrawal['amount'],
+            withdrawal['fee']) == (134933, 500010000, 10000)
+    assert polo.getMarginPosition('BTC_LTC')['liquidationPrice'] == -1